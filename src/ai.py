@@ -0,0 +1,165 @@
+# File: ai.py
+# Project: 2023 Spring Semester SOS Project
+# Programmer: Ian Rowse <imrnnc@umsystem.edu>
+
+"""Computer players, looked up by the strategy name stored on a Player.
+
+Every agent has a choose_move(board) method that returns a board.Move for
+the player whose turn it is, or None when the game is over. Agents may keep
+state between turns, so make one per player and reuse it.
+"""
+
+import random
+
+try:
+    import board
+    import mcts
+    import parallel
+    import search
+    import tablebase
+except ImportError: # imported as part of the src package, e.g. by the tests
+    from src import board
+    from src import mcts
+    from src import parallel
+    from src import search
+    from src import tablebase
+
+
+class RandomPlayer:
+    """Plays any legal move."""
+
+    def __init__(self, seed: int = None) -> None:
+        self.rng = random.Random(seed)
+
+    def choose_move(self, test_board: board.Board) -> board.Move:
+        if test_board.end or not test_board.empty_cells:
+            return None
+        pos = test_board.positions[self.rng.choice(test_board.empty_cells)]
+        return board.Move(pos, self.rng.choice((board.Mark.S, board.Mark.O)))
+
+
+class GreedyPlayer(RandomPlayer):
+    """Makes the most SOSes it can right now, otherwise plays at random."""
+
+    def choose_move(self, test_board: board.Board) -> board.Move:
+        if test_board.end or not test_board.empty_cells:
+            return None
+        moves = list(test_board.scoring_moves())
+        if moves:
+            most = max(move.sos_count for move in moves)
+            return self.rng.choice([move for move in moves if move.sos_count == most])
+        return super().choose_move(test_board)
+
+
+STRATEGIES = {
+    "search"    : search.Searcher,
+    "parallel"  : parallel.ParallelSearcher,
+    "mcts"      : mcts.MCTSPlayer,
+    "tablebase" : tablebase.TablebasePlayer,
+    "random"    : RandomPlayer,
+    "greedy"    : GreedyPlayer,
+}
+
+# options used when make_agent is not given any
+DEFAULT_OPTIONS = {
+    "search"   : {"time_limit": 0.5},
+    "parallel" : {"depth": 2, "workers": None}, # a worker per CPU
+    "mcts"     : {"time_limit": 0.5, "widening": 2.0},
+}
+
+# options for agents made in a process pool's workers, like the server's and
+# the tournament's, where a pool of their own in every worker would start
+# workers * CPUs processes
+WORKER_OPTIONS = {
+    "parallel" : {"depth": 2, "workers": 1},
+}
+
+# the strategies the menu offers, and what it shows for each
+STRATEGY_NAMES = {
+    "search"    : "Computer",
+    "parallel"  : "Parallel",
+    "mcts"      : "MCTS",
+    "tablebase" : "Perfect",
+}
+
+
+def strategy_name(player: board.Player, test_board: board.Board) -> str:
+    """What the menu shows for a computer player about to play test_board,
+    which says so when a perfect player has no table and will only search."""
+    name = STRATEGY_NAMES[player.strategy]
+    if (player.strategy == "tablebase" and
+        not tablebase.has_table(tablebase.TABLEBASE_PATH, test_board.size, test_board.game_mode)):
+        name += " (no table)"
+    return name
+
+
+def make_agent(strategy: str, **options):
+    if strategy not in STRATEGIES:
+        raise ValueError(f"unknown strategy {strategy!r}")
+    if not options:
+        options = DEFAULT_OPTIONS.get(strategy, {})
+    return STRATEGIES[strategy](**options)
+
+
+def make_worker_agent(strategy: str):
+    """make_agent for running in a pool worker, with WORKER_OPTIONS if it has any."""
+    return make_agent(strategy, **WORKER_OPTIONS.get(strategy, {}))
+
+
+def close_agent(agent) -> None:
+    """Frees what an agent holds between turns, such as a process pool."""
+    close = getattr(agent, "close", None)
+    if close is not None:
+        close()
+
+
+# agents made by choose_replayed_move, by (seat, strategy), in whatever
+# process it runs in
+_replay_agents = {}
+
+def choose_replayed_move(size: tuple[int, int],
+                         game_mode: str,
+                         num_players: int,
+                         moves: list[tuple[int, int]],
+                         strategy: str,
+                         seat: int) -> tuple[int, int]:
+    """choose_move for seat after moves, as (cell, mark value) pairs.
+
+    For running in a worker: the game is replayed onto a new board, so
+    agents see its whole history, and they are kept per seat and strategy,
+    so a worker process keeps what they learn from turn to turn. Returns
+    (cell, mark value), or None if the game is over.
+    """
+    test_board = board.Board(list(size),
+                             [board.Player(f"Player {idx + 1}") for idx in range(num_players)])
+    test_board.game_mode = game_mode
+    test_board.replay(board.Move(test_board.positions[cell], board.MARKS[mark])
+                      for cell, mark in moves)
+
+    if (seat, strategy) not in _replay_agents:
+        _replay_agents[seat, strategy] = make_agent(strategy)
+    move = _replay_agents[seat, strategy].choose_move(test_board)
+    if move is None:
+        return None
+    return move.pos[1] * test_board.size[0] + move.pos[0], move.mark.value
+
+
+def close_replay_agents() -> None:
+    """Closes choose_replayed_move's agents, which a worker must do before it
+    can exit if any of them holds a process pool of its own."""
+    for agent in _replay_agents.values():
+        close_agent(agent)
+    _replay_agents.clear()
+
+
+def next_strategy(player: board.Player) -> None:
+    """Steps a player through human and then each menu strategy in turn."""
+    strategies = list(STRATEGY_NAMES)
+    if not player.computer:
+        player.computer = True
+        player.strategy = strategies[0]
+    elif player.strategy in strategies[:-1]:
+        player.strategy = strategies[strategies.index(player.strategy) + 1]
+    else:
+        player.computer = False
+        player.strategy = strategies[0]
@@ -0,0 +1,193 @@
+# File: batch.py
+# Project: 2023 Spring Semester SOS Project
+# Programmer: Ian Rowse <imrnnc@umsystem.edu>
+
+"""Plays many same-sized SOS games at once on numpy arrays.
+
+Every game lives in one slice of a (games, height, width) int8 array of Mark
+values, and each step makes one move in every unfinished game. Scores, turns,
+game ends and victors follow the same rules as board.Board, so any logged
+game can be replayed move for move on a Board.
+
+Policies, chosen per player:
+    random : any empty cell, either mark
+    greedy : the move that makes the most SOSes, ties broken at random
+    safe   : like greedy, but among equal gains prefers moves that do not
+             leave the next player an SOS to make
+"""
+
+from collections.abc import Sequence
+from typing import NamedTuple
+
+import numpy as np
+
+try:
+    import board
+    import vectorized
+except ImportError: # imported as part of the src package, e.g. by the tests
+    from src import board
+    from src import vectorized
+
+POLICIES = ("random", "greedy", "safe")
+
+
+class BatchResult(NamedTuple):
+    scores: np.ndarray    # (games, players) points per player
+    victors: np.ndarray   # (games, players) True for every victor, as in Board.victors
+    moves: np.ndarray     # (games,) number of moves made
+    cells: np.ndarray     # (games, cells) flat index of each move, -1 when unused
+    marks: np.ndarray     # (games, cells) Mark value of each move
+    gains: np.ndarray     # (games, cells) SOSes made by each move
+
+
+class BatchSimulator:
+    """Steps a batch of games with one policy per player."""
+
+    def __init__(self,
+                 num_games: int,
+                 size: Sequence[int] = (8, 8),
+                 game_mode: str = "general",
+                 policies: Sequence[str] = ("random", "random"),
+                 seed: int = None) -> None:
+
+        if size[0] < 3 or size[1] < 3:
+            raise ValueError("board dimensions must be greater than or equal to 3x3")
+        elif game_mode not in ("simple", "general"):
+            raise NotImplementedError(f"Game mode {game_mode} does not exist.")
+        elif not policies:
+            raise ValueError("must specify at least one player")
+
+        for policy in policies:
+            if policy not in POLICIES:
+                raise ValueError(f"unknown policy {policy!r}")
+
+        self.size = (size[0], size[1])
+        self.game_mode = game_mode
+        self.policies = tuple(policies)
+        self.rng = np.random.default_rng(seed)
+
+        cells = self.size[0] * self.size[1]
+        players = len(self.policies)
+
+        self.grids = np.full((num_games, self.size[1], self.size[0]),
+                             vectorized.EMPTY,
+                             dtype=np.int8)
+        self.scores = np.zeros((num_games, players), dtype=np.int32)
+        self.first_sos = np.full(num_games, -1, dtype=np.int8)
+        self.end = np.zeros(num_games, dtype=bool)
+
+        self.turn = 0 # every unfinished game is always on the same turn
+        self.move_count = 0
+        self.moves = np.zeros(num_games, dtype=np.int32)
+        self.cells = np.full((num_games, cells), -1, dtype=np.int32)
+        self.marks = np.zeros((num_games, cells), dtype=np.int8)
+        self.gains = np.zeros((num_games, cells), dtype=np.int8)
+
+    def danger_maps(self, grids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Where an S, and an O, would leave the next player an SOS to make."""
+        padded = vectorized.pad(grids)
+        is_s = padded == vectorized.S
+        is_o = padded == vectorized.O
+        is_empty = padded == vectorized.EMPTY
+        shifted = vectorized.shifted
+
+        s_danger = np.zeros(grids.shape, dtype=bool)
+        for dx, dy in board.OFFSETS:
+            s_danger |= shifted(is_o, dx, dy) & shifted(is_empty, dx*2, dy*2)
+            s_danger |= shifted(is_empty, dx, dy) & shifted(is_s, dx*2, dy*2)
+
+        o_danger = np.zeros(grids.shape, dtype=bool)
+        for dx, dy in board.OFFSETS:
+            o_danger |= shifted(is_s, dx, dy) & shifted(is_empty, -dx, -dy)
+
+        return s_danger, o_danger
+
+    def choose(self,
+               grids: np.ndarray,
+               policy: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Picks a move per game as (flat cell, mark index, gain) arrays.
+
+        The mark index is 0 for S and 1 for O.
+        """
+        games = grids.shape[0]
+        s_gain, o_gain = vectorized.gain_maps(grids)
+
+        # (games, cells, 2) with S then O for every cell
+        gains = np.stack((s_gain.reshape(games, -1), o_gain.reshape(games, -1)), axis=2)
+        legal = np.repeat((grids == vectorized.EMPTY).reshape(games, -1, 1), 2, axis=2)
+
+        keys = self.rng.random(gains.shape)
+        match policy:
+            case "greedy":
+                keys += gains * 2
+            case "safe":
+                s_danger, o_danger = self.danger_maps(grids)
+                safe = ~np.stack((s_danger.reshape(games, -1),
+                                  o_danger.reshape(games, -1)), axis=2)
+                keys += gains * 4 + safe * 2
+
+        keys[~legal] = -1
+        choice = keys.reshape(games, -1).argmax(axis=1)
+        return choice >> 1, choice & 1, gains.reshape(games, -1)[np.arange(games), choice]
+
+    def step(self) -> int:
+        """Makes one move in every unfinished game, returning how many moved."""
+        active = np.flatnonzero(~self.end)
+        if active.size == 0:
+            return 0
+
+        grids = self.grids[active]
+        cells, mark_idx, gains = self.choose(grids, self.policies[self.turn])
+        marks = np.where(mark_idx == 0, vectorized.S, vectorized.O).astype(np.int8)
+
+        width = self.size[0]
+        self.grids[active, cells // width, cells % width] = marks
+        self.scores[active, self.turn] += gains
+
+        scored = active[(gains > 0) & (self.first_sos[active] < 0)]
+        self.first_sos[scored] = self.turn
+
+        self.cells[active, self.move_count] = cells
+        self.marks[active, self.move_count] = marks
+        self.gains[active, self.move_count] = gains
+        self.moves[active] += 1
+        self.move_count += 1
+
+        full = self.move_count == self.cells.shape[1]
+        if self.game_mode == "simple":
+            self.end[active] = full | (self.first_sos[active] >= 0)
+        else:
+            self.end[active] = full
+
+        self.turn = (self.turn + 1) % len(self.policies)
+        return active.size
+
+    def victors(self) -> np.ndarray:
+        """(games, players) mask of victors, as Board.victors would list them."""
+        if self.game_mode == "simple":
+            victors = np.ones(self.scores.shape, dtype=bool)
+            decided = self.first_sos >= 0
+            victors[decided] = False
+            victors[np.flatnonzero(decided), self.first_sos[decided]] = True
+            return victors
+        else:
+            return self.scores == self.scores.max(axis=1, keepdims=True)
+
+    def run(self) -> BatchResult:
+        while self.step():
+            pass
+        return BatchResult(self.scores.copy(),
+                           self.victors(),
+                           self.moves.copy(),
+                           self.cells.copy(),
+                           self.marks.copy(),
+                           self.gains.copy())
+
+
+def simulate(num_games: int,
+             size: Sequence[int] = (8, 8),
+             game_mode: str = "general",
+             policies: Sequence[str] = ("random", "random"),
+             seed: int = None) -> BatchResult:
+    """Plays num_games games to the end and returns their results and logs."""
+    return BatchSimulator(num_games, size, game_mode, policies, seed).run()
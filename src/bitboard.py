@@ -0,0 +1,286 @@
+# File: bitboard.py
+# Project: 2023 Spring Semester SOS Project
+# Programmer: Ian Rowse <imrnnc@umsystem.edu>
+
+"""Standalone SOS board core kept in two bitmasks.
+
+S and O marks live in two arbitrarily large ints and nothing else: no grid,
+no gain index, no hashes. Rows are stride = width + 2 bits apart, and the
+two bits between rows, like the two rows and two bits before the first
+cell, are never set, so lines cannot wrap from one edge of the board to the
+other and looking two cells up or left never needs a negative shift. Cell
+(x, y) is bit (y + 2) * stride + 2 + x.
+
+creates_sos shifts the bits within two cells of the move down into a small
+int, once per mask, and tests all 8 directions on that with precomputed
+masks. Whole board questions, which cells would score right now and how
+many SOSes there are, take a few shifts of the whole masks per direction.
+
+BitBoard plays games (make_move, undo_move, creates_sos, get_empty_cells,
+scoring_moves, victors) but keeps none of the indexes the searchers read,
+so it is for playing games out quickly, e.g. AI-vs-AI batches.
+"""
+
+from collections.abc import Iterator, Sequence
+from itertools import compress
+from typing import NamedTuple
+
+try:
+    import board
+except ImportError: # imported as part of the src package, e.g. by the tests
+    from src import board
+
+OFFSETS = ((-1,-1), # north west
+           ( 0,-1), # north
+           ( 1,-1), # north east
+           ( 1, 0), #       east
+           ( 1, 1), # south east
+           ( 0, 1), # south
+           (-1, 1), # south west
+           (-1, 0)) #       west
+
+GUARD = 2 # clear bits between rows, and clear rows before the first
+
+# turns the b"0" and b"1" digits of format(bits, "b") into 0 and 1 bytes
+BIT_DIGITS = bytes.maketrans(b"01", b"\x00\x01")
+
+
+class Masks(NamedTuple):
+    """Bit layout of one board size, shared by every board of that size."""
+
+    stride: int           # bits from one row to the next
+    full: int             # every cell of the board
+    positions: tuple      # the position of every bit, None for the guard bits
+    deltas: tuple[int]    # bits moved per step in each of OFFSETS
+    window: int           # bits within two cells of the centre of a window
+    window_bits: int      # how many bits that is
+    centre: int           # the moved cell's bit in its window
+    near: int             # the bits one step from the centre
+    s_tests: tuple[tuple] # (O bit | S bit << window bits, dx, dy) that an S
+                          # at the centre completes
+    o_tests: tuple[tuple] # (S bit | S bit, dx, dy) that an O at the centre completes
+
+
+_masks = {}
+
+def masks(size: Sequence[int]) -> Masks:
+    key = (size[0], size[1])
+    if key not in _masks:
+        width, height = key
+        stride = width + GUARD
+        row = (1 << width) - 1
+        full = sum(row << ((y + GUARD) * stride + GUARD) for y in range(height))
+        positions = [None] * ((height + GUARD) * stride)
+        for y in range(height):
+            for x in range(width):
+                positions[(y + GUARD) * stride + GUARD + x] = (x, y)
+        deltas = tuple(dy * stride + dx for dx, dy in OFFSETS)
+
+        centre = GUARD * (stride + 1)
+        bits = 2 * centre + 1
+        _masks[key] = Masks(stride,
+                            full,
+                            tuple(positions),
+                            deltas,
+                            (1 << bits) - 1,
+                            bits,
+                            centre,
+                            sum(1 << (centre + delta) for delta in deltas),
+                            tuple((1 << (centre + delta) | 1 << (centre + 2*delta + bits), dx, dy)
+                                  for (dx, dy), delta in zip(OFFSETS, deltas)),
+                            tuple((1 << (centre + delta) | 1 << (centre - delta), dx, dy)
+                                  for (dx, dy), delta in zip(OFFSETS[:4], deltas[:4])))
+    return _masks[key]
+
+
+def shift(bits: int, delta: int) -> int:
+    """Moves every bit delta places down (or -delta places up), so bit k
+    of the result is bit k + delta of bits."""
+    return bits >> delta if delta >= 0 else bits << -delta
+
+
+class BitBoard:
+    """SOS game on two bitmasks, for playing games out."""
+
+    def __init__(self,
+                 size: list[int] = None,
+                 players: list[board.Player] = None) -> None:
+
+        if size is None:
+            size = [8, 8]
+        elif size[0] < 3 or size[1] < 3:
+            raise ValueError("board dimensions must be greater than or equal to 3x3")
+
+        if players == []:
+            raise ValueError("must specify at least one player")
+        elif players is not None and len(players) > board.MAX_PLAYERS:
+            raise ValueError(f"boards may have at most {board.MAX_PLAYERS} players")
+
+        self.size = size
+        self.masks = masks(size)
+        self.cells = size[0] * size[1]
+        self.s_bits = 0
+        self.o_bits = 0
+        self.mark_count = 0
+
+        if players is None:
+            self.players = [board.Player("Player One", 0), board.Player("Player Two", 240)]
+        else:
+            self.players = players
+
+        self.sos_list = board.SOSList(size)
+        self.move_hist = board.MoveList(size)
+        self.turn = 0
+        self.game_mode = "simple"
+        self.end = False
+
+    def __repr__(self) -> None:
+        return f"BitBoard({self.size}, {self.players!r})"
+
+    def bit(self, pos: Sequence[int]) -> int:
+        return (pos[1] + GUARD) * self.masks.stride + GUARD + pos[0]
+
+    def in_bounds(self, pos: Sequence[int]) -> bool:
+        return (0 <= pos[0] < self.size[0] and
+                0 <= pos[1] < self.size[1])
+
+    def get_mark(self, pos: Sequence[int]) -> board.Mark:
+        if not self.in_bounds(pos):
+            return board.Mark.NONE
+        bit = self.bit(pos)
+        if self.s_bits >> bit & 1:
+            return board.Mark.S
+        elif self.o_bits >> bit & 1:
+            return board.Mark.O
+        return board.Mark.EMPTY
+
+    def creates_sos(self, pos: Sequence[int], mark: board.Mark) -> list[board.SOS]:
+        sos_list = []
+        if not self.in_bounds(pos):
+            return sos_list
+
+        masks = self.masks
+        x, y = pos
+        low = y * masks.stride + x # the window's lowest bit, bit(pos) - masks.centre
+
+        if mark is board.Mark.S:
+            o_bits = self.o_bits >> low & masks.window
+            if not o_bits & masks.near:
+                return sos_list
+            # the O window, with the S window above it
+            bits = o_bits | (self.s_bits >> low & masks.window) << masks.window_bits
+            for test, dx, dy in masks.s_tests:
+                if bits & test == test:
+                    sos_list.append(board.SOS(pos, (x + 2*dx, y + 2*dy), self.turn))
+        elif mark is board.Mark.O:
+            s_bits = self.s_bits >> low & masks.near
+            if not s_bits:
+                return sos_list
+            for test, dx, dy in masks.o_tests:
+                if s_bits & test == test:
+                    sos_list.append(board.SOS((x + dx, y + dy), (x - dx, y - dy), self.turn))
+        return sos_list
+
+    def make_move(self, pos: Sequence[int], mark: board.Mark) -> bool:
+        if mark.value <= board.EMPTY:
+            raise ValueError("player cannot set a mark to empty")
+        elif self.end or not self.in_bounds(pos):
+            return False
+
+        bit = 1 << self.bit(pos)
+        if (self.s_bits | self.o_bits) & bit:
+            return False
+
+        new_sos_list = self.creates_sos(pos, mark)
+        if mark == board.Mark.S:
+            self.s_bits |= bit
+        else:
+            self.o_bits |= bit
+        self.mark_count += 1
+
+        if new_sos_list:
+            self.players[self.turn].score += len(new_sos_list)
+            self.sos_list.extend(new_sos_list)
+        self.move_hist.append(board.Move(pos, mark, len(new_sos_list), self.turn))
+
+        if self.detect_end():
+            self.end = True
+        else:
+            self.turn = (self.turn + 1) % len(self.players)
+        return True
+
+    def undo_move(self) -> None:
+        if not self.move_hist:
+            return
+
+        move = self.move_hist.pop()
+        bit = 1 << self.bit(move.pos)
+        if move.mark == board.Mark.S:
+            self.s_bits ^= bit
+        else:
+            self.o_bits ^= bit
+        self.mark_count -= 1
+
+        if move.sos_count:
+            del self.sos_list[-move.sos_count:]
+        self.players[move.player].score -= move.sos_count
+        self.turn = move.player
+        self.end = False
+
+    def empty_bits(self) -> int:
+        return self.masks.full & ~(self.s_bits | self.o_bits)
+
+    def positions_of(self, bits: int) -> list[tuple[int, int]]:
+        """The position of every set bit, row by row."""
+        return list(compress(self.masks.positions,
+                             format(bits, "b")[::-1].encode().translate(BIT_DIGITS)))
+
+    def get_empty_cells(self) -> list[tuple[int, int]]:
+        return self.positions_of(self.empty_bits())
+
+    def scoring_bits(self) -> tuple[int, int]:
+        """The empty cells where an S, and where an O, would make an SOS."""
+        s, o = self.s_bits, self.o_bits
+        s_cells = o_cells = 0
+        for delta in self.masks.deltas:
+            s_cells |= shift(o, delta) & shift(s, 2 * delta)
+        for delta in self.masks.deltas[:4]:
+            o_cells |= shift(s, delta) & shift(s, -delta)
+        empty = self.empty_bits()
+        return s_cells & empty, o_cells & empty
+
+    def scoring_moves(self) -> Iterator[board.Move]:
+        """Yields every move that would make an SOS, most SOSes first per cell."""
+        s_cells, o_cells = self.scoring_bits()
+        for pos in self.positions_of(s_cells | o_cells):
+            moves = sorted(((len(self.creates_sos(pos, mark)), mark)
+                            for mark in (board.Mark.S, board.Mark.O)),
+                           key=lambda move: move[0],
+                           reverse=True)
+            for gain, mark in moves:
+                if gain > 0:
+                    yield board.Move(pos, mark, gain)
+
+    def count_sos(self) -> int:
+        """Counts every S-O-S line on the board with whole-board shifts."""
+        s, o = self.s_bits, self.o_bits
+        # east, south east, south and south west find each line once
+        return sum((s & shift(o, delta) & shift(s, 2 * delta)).bit_count()
+                   for delta in self.masks.deltas[3:7])
+
+    def detect_end(self) -> bool:
+        match self.game_mode:
+            case "simple"  : return len(self.sos_list) > 0 or self.mark_count == self.cells
+            case "general" : return self.mark_count == self.cells
+            case _: raise NotImplementedError(f"Game mode {self.game_mode} does not exist.")
+
+    def victors(self) -> list[board.Player]:
+        match self.game_mode:
+            case "simple":
+                if self.sos_list:
+                    return [self.players[self.sos_list[0].player_id]]
+                return self.players
+            case "general":
+                highscore = max(player.score for player in self.players)
+                return [player for player in self.players if player.score == highscore]
+            case _: raise NotImplementedError(f"Game mode {self.game_mode} does not exist.")
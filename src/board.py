@@ -4,12 +4,15 @@
 
 """Basic classes and methods for an SOS game. User interface not included."""
 
-from collections.abc import Sequence
-from copy import deepcopy
+from abc import ABC, abstractmethod
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
 from enum import Enum
 import math
 import random
+import struct
 from typing import NamedTuple
+import zlib
 
 class Mark(Enum):
     """Possible states of an SOS grid space."""
@@ -59,6 +62,16 @@ class Mark(Enum):
             return self.value >= other.value
 
 
+# Board.marks holds these Mark values; MARKS[value] turns one back into a Mark
+NONE, EMPTY, S, O = (mark.value for mark in Mark)
+MARKS = tuple(Mark)
+
+# the most cells a board can have and still pack its history (see PackedList)
+MAX_PACKED_CELLS = 1 << 28
+# the most players a board can have, as ids 0 to 254 (see MoveList)
+MAX_PLAYERS = 255
+
+
 class SOS:
     """Stores the start coordinate, end coordinate, and player id of an SOS."""
 
@@ -88,6 +101,15 @@ class SOS:
             
             self.player_id = player_id
 
+    def __eq__(self, other) -> bool:
+        if self.__class__ is not other.__class__:
+            return NotImplemented
+        return ((tuple(self.p1), tuple(self.p2), self.player_id) ==
+                (tuple(other.p1), tuple(other.p2), other.player_id))
+
+    def __hash__(self) -> int:
+        return hash((tuple(self.p1), tuple(self.p2), self.player_id))
+
     def __repr__(self) -> None:
         return f"SOS({self.p1!r}, {self.p2!r}, {self.player_id!r})"
 
@@ -96,8 +118,15 @@ class SOS:
 
 
 class Player:
-    """Stores a player's name, what hue to use in a gui, and their score."""
-    def __init__(self, name: str, hue: int = 0, computer: bool = False) -> None:
+    """Stores a player's name, what hue to use in a gui, and their score.
+
+    strategy names the ai.STRATEGIES entry that picks moves for a computer.
+    """
+    def __init__(self,
+                 name: str,
+                 hue: int = 0,
+                 computer: bool = False,
+                 strategy: str = "search") -> None:
         if not 0 <= hue <= 360:
             raise ValueError("player hue must be between 0 and 360")
 
@@ -106,9 +135,10 @@ class Player:
             self.hue = hue
             self.score = 0
             self.computer = computer
+            self.strategy = strategy
 
     def __repr__(self) -> None:
-        return f"Player(\"{self.name}\", {self.hue}, {self.computer})"
+        return f"Player(\"{self.name}\", {self.hue}, {self.computer}, \"{self.strategy}\")"
 
     def __str__(self) -> None:
         return f"({self.name} has hue {self.hue} and has {self.score} points)"
@@ -120,6 +150,256 @@ class Move(NamedTuple):
     sos_count: int = 0
     player: int = -1
 
+_zobrist_keys = {}
+
+def zobrist_keys(size: Sequence[int]) -> tuple[tuple[int]]:
+    """Random 64 bit keys for every (mark, cell) pair of a board size.
+
+    Indexed as keys[mark.value][cell]. The keys for NONE and EMPTY are all
+    zero, so xoring out the old mark and xoring in the new one always works.
+    Keys are seeded by size, so equal positions hash equally across boards.
+    """
+    key = (size[0], size[1])
+    if key not in _zobrist_keys:
+        rng = random.Random(f"zobrist {size[0]}x{size[1]}")
+        cells = math.prod(key)
+        _zobrist_keys[key] = ((0,) * cells,
+                              (0,) * cells,
+                              tuple(rng.getrandbits(64) for _ in range(cells)),
+                              tuple(rng.getrandbits(64) for _ in range(cells)))
+    return _zobrist_keys[key]
+
+
+GAME_MODES = ("simple", "general")
+
+# Save files are a header, one record per move or undo in the order they
+# were made, and a footer record holding the crc32 of everything before it.
+SAVE_MAGIC   = b"SOS\x1a"
+SAVE_VERSION = 1
+SAVE_HEADER  = struct.Struct("<4sBHHBB") # magic, version, width, height, mode, players
+SAVE_PLAYER  = struct.Struct("<HBBB")    # hue, computer, name and strategy lengths
+SAVE_RECORD  = struct.Struct("<BI")      # mark value or record kind, then cell or crc32
+UNDO_RECORD  = 0
+END_RECORD   = 0xFF
+
+OFFSETS = ((-1,-1), # north west
+           ( 0,-1), # north
+           ( 1,-1), # north east
+           ( 1, 0), #       east
+           ( 1, 1), # south east
+           ( 0, 1), # south
+           (-1, 1), # south west
+           (-1, 0)) #       west
+
+
+class LineTables(NamedTuple):
+    """Every in-bounds S-O-S line of a board size, as flat cell indices.
+
+    as_end[cell] holds (o, s) pairs for the lines an S on cell would start,
+    as_middle[cell] holds (s, s) pairs for the lines an O on cell would
+    centre, both in OFFSETS order, and through[cell] holds (s, o, s) triples
+    for every line that includes cell at all.
+    """
+    as_end: tuple[tuple[tuple[int, int]]]
+    as_middle: tuple[tuple[tuple[int, int]]]
+    through: tuple[tuple[tuple[int, int, int]]]
+
+_line_tables = {}
+
+def line_tables(size: Sequence[int]) -> LineTables:
+    key = (size[0], size[1])
+    if key not in _line_tables:
+        width, height = key
+
+        def flat(x: int, y: int) -> int:
+            return y * width + x if 0 <= x < width and 0 <= y < height else None
+
+        as_end, as_middle, through = [], [], []
+        for y in range(height):
+            for x in range(width):
+                as_end.append(tuple(
+                    (flat(x + dx, y + dy), flat(x + dx*2, y + dy*2))
+                    for dx, dy in OFFSETS
+                    if flat(x + dx*2, y + dy*2) is not None))
+
+                as_middle.append(tuple(
+                    (flat(x + dx, y + dy), flat(x - dx, y - dy))
+                    for dx, dy in OFFSETS[:4]
+                    if (flat(x + dx, y + dy) is not None and
+                        flat(x - dx, y - dy) is not None)))
+
+                through.append(tuple(
+                    (flat(x + dx*first,     y + dy*first),
+                     flat(x + dx*(first+1), y + dy*(first+1)),
+                     flat(x + dx*(first+2), y + dy*(first+2)))
+                    for dx, dy in OFFSETS[3:7]
+                    for first in (-2, -1, 0)
+                    if (flat(x + dx*first,     y + dy*first) is not None and
+                        flat(x + dx*(first+2), y + dy*(first+2)) is not None)))
+
+        _line_tables[key] = LineTables(tuple(as_end), tuple(as_middle), tuple(through))
+    return _line_tables[key]
+
+_cell_positions = {}
+
+def cell_positions(size: Sequence[int]) -> tuple[tuple[int, int]]:
+    """The (x, y) position of every flat cell index of a board size."""
+    key = (size[0], size[1])
+    if key not in _cell_positions:
+        _cell_positions[key] = tuple((x, y)
+                                     for y in range(size[1])
+                                     for x in range(size[0]))
+    return _cell_positions[key]
+
+_cell_symmetries = {}
+
+def cell_symmetries(size: Sequence[int]) -> tuple[tuple[int]]:
+    """Where every flat cell lands under each symmetry of a board size.
+
+    Indexed as symmetries[transform][cell]. Transform 0 is the identity.
+    Every board can be mirrored either way or turned half way round, and
+    square boards can also be transposed, giving all 8 rotations and
+    reflections. SOS lines map onto SOS lines under all of them.
+    """
+    key = (size[0], size[1])
+    if key not in _cell_symmetries:
+        width, height = key
+        symmetries = []
+        for transpose in ((False, True) if width == height else (False,)):
+            for flip_x in (False, True):
+                for flip_y in (False, True):
+                    cells = []
+                    for y in range(height):
+                        for x in range(width):
+                            new_x = width - 1 - x if flip_x else x
+                            new_y = height - 1 - y if flip_y else y
+                            if transpose:
+                                new_x, new_y = new_y, new_x
+                            cells.append(new_y * width + new_x)
+                    symmetries.append(tuple(cells))
+        _cell_symmetries[key] = tuple(symmetries)
+    return _cell_symmetries[key]
+
+_inverse_symmetries = {}
+
+def inverse_symmetries(size: Sequence[int]) -> tuple[int]:
+    """The transform that undoes each of cell_symmetries(size)."""
+    key = (size[0], size[1])
+    if key not in _inverse_symmetries:
+        symmetries = cell_symmetries(key)
+        identity = symmetries[0]
+        _inverse_symmetries[key] = tuple(
+            next(other for other, undo in enumerate(symmetries)
+                 if tuple(undo[cell] for cell in cells) == identity)
+            for cells in symmetries)
+    return _inverse_symmetries[key]
+
+
+class PackedList(ABC):
+    """List of records packed into one 64 bit int each, in a typed array.
+
+    Items go in and come out as objects (Move, SOS), but only their codes
+    are kept, with positions stored as flat cell indexes, so boards may have
+    at most 2**28 cells. Appending and popping are O(1) and slicing works as
+    it does on a list. Reading an item builds a new object for it, so change
+    items by replacing them, not in place.
+    """
+
+    def __init__(self, size: Sequence[int], items: Iterable = ()) -> None:
+        if size[0] * size[1] > MAX_PACKED_CELLS:
+            raise ValueError(f"boards over {MAX_PACKED_CELLS} cells cannot be packed")
+
+        self.width = size[0]
+        self.positions = cell_positions(size)
+        self.codes = array("Q")
+        self.extend(items)
+
+    @abstractmethod
+    def encode(self, item) -> int:
+        pass
+
+    @abstractmethod
+    def decode(self, code: int):
+        pass
+
+    def cell(self, pos: Sequence[int]) -> int:
+        return (pos[1] * self.width) + pos[0]
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __iter__(self) -> Iterator:
+        return map(self.decode, self.codes)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self.decode(code) for code in self.codes[key]]
+        return self.decode(self.codes[key])
+
+    def __delitem__(self, key) -> None:
+        del self.codes[key]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, PackedList)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    def append(self, item) -> None:
+        self.codes.append(self.encode(item))
+
+    def extend(self, items: Iterable) -> None:
+        self.codes.extend(map(self.encode, items))
+
+    def pop(self, key: int = -1):
+        return self.decode(self.codes.pop(key))
+
+    def clear(self) -> None:
+        del self.codes[:]
+
+
+class MoveList(PackedList):
+    """Moves packed as cell << 16 | player + 1 << 8 | sos_count << 4 | mark value.
+
+    Players must be numbered below MAX_PLAYERS (or be -1), and no move makes
+    more than the 8 SOSes that fit in its 4 bits; anything else raises
+    ValueError rather than being read back as some other player.
+    """
+
+    def encode(self, item: Move) -> int:
+        if not -1 <= item.player < MAX_PLAYERS or not 0 <= item.sos_count <= 0xF:
+            raise ValueError(f"{item} cannot be packed")
+        pos = item.pos
+        return (((pos[1] * self.width) + pos[0]) << 16 | (item.player + 1) << 8 |
+                item.sos_count << 4 | item.mark.value)
+
+    def cell_marks(self) -> Iterator[tuple[int, int]]:
+        """The (cell, mark value) of every move, without building Moves."""
+        return ((code >> 16, code & 0xF) for code in self.codes)
+
+    def decode(self, code: int) -> Move:
+        return Move(self.positions[code >> 16],
+                    MARKS[code & 0xF],
+                    code >> 4 & 0xF,
+                    (code >> 8 & 0xFF) - 1)
+
+
+class SOSList(PackedList):
+    """SOS lines packed as start cell << 36 | end cell << 8 | player id."""
+
+    def encode(self, item: SOS) -> int:
+        if not 0 <= item.player_id < MAX_PLAYERS:
+            raise ValueError(f"{item} cannot be packed")
+        return self.cell(item.p1) << 36 | self.cell(item.p2) << 8 | item.player_id
+
+    def decode(self, code: int) -> SOS:
+        return SOS(self.positions[code >> 36],
+                   self.positions[code >> 8 & 0xFFFFFFF],
+                   code & 0xFF)
+
+
 class Board:
     """SOS game."""
     def __init__(self,
@@ -133,27 +413,48 @@ class Board:
 
         if players == []:
             raise ValueError("must specify at least one player")
+        elif players is not None and len(players) > MAX_PLAYERS:
+            raise ValueError(f"boards may have at most {MAX_PLAYERS} players")
 
         self.size = size
-        self.grid = [Mark.EMPTY] * math.prod(size)
-        #self.empty_cells = 
+        # the Mark value of every cell, row by row
+        self.marks = bytearray([EMPTY]) * math.prod(size)
+        self.positions = cell_positions(size)
+        self.lines = line_tables(size)
+        # empty_cells holds the flat index of every empty cell in no set order,
+        # and empty_slots[idx] is where idx sits (or last sat) in empty_cells
+        self.empty_cells = list(range(len(self.marks)))
+        self.empty_slots = list(range(len(self.marks)))
         self.mark_count = 0
+        self.zobrist = 0
+        self.zobrist_keys = zobrist_keys(size)
+        self.symmetries = cell_symmetries(size)
+        # the zobrist hash of the grid under each symmetry, kept up to date
+        # from the first call to canonical_key on
+        self.symmetry_hashes = None
+        # how many SOSes an S or an O would make on each empty cell right now
+        self.s_gain = [0] * len(self.marks)
+        self.o_gain = [0] * len(self.marks)
+        self.scoring_cells = set()
 
         if players is None:
             self.players = [Player("Player One", 0), Player("Player Two", 240)]
         else:
             self.players = players
 
-        self.sos_list = []
+        self.sos_list = SOSList(size)
         self.turn = 0
 
-        self.move_hist = []
-        self.move_future = []
+        self.move_hist = MoveList(size)
+        self.move_future = MoveList(size)
 
         self.game_mode = "simple"
 
         self.end = False
 
+        # set by record, which writes every move to a save file as it is made
+        self.recorder = None
+
     def __repr__(self) -> None:
         return f"Board({self.size}, {self.players!r})"
 
@@ -173,6 +474,11 @@ class Board:
         temp += " " + "-" * self.size[0]
         return temp
 
+    @property
+    def grid(self) -> list[Mark]:
+        """Every cell's Mark, row by row. A copy, so set cells with set_mark."""
+        return [MARKS[value] for value in self.marks]
+
     def in_bounds(self, pos: Sequence[int]) -> bool:
         return (0 <= pos[0] < self.size[0] and
                 0 <= pos[1] < self.size[1])
@@ -182,7 +488,7 @@ class Board:
 
     def get_mark(self, pos: Sequence[int] = None) -> Mark:
         if self.in_bounds(pos):
-            return self.grid[(pos[1] * self.size[0]) + pos[0]]
+            return MARKS[self.marks[(pos[1] * self.size[0]) + pos[0]]]
         else:
             return Mark.NONE
 
@@ -206,61 +512,204 @@ class Board:
             raise ValueError("cannot set a cell to NONE")
 
         else:
-            if mark > self.get_mark(pos):
-                #self.empty_cells.discard(tuple(pos))
+            idx = (pos[1] * self.size[0]) + pos[0]
+            value = mark.value
+            old = self.marks[idx]
+
+            if old == EMPTY and value != EMPTY:
+                self.remove_empty(idx)
                 self.mark_count += 1
-            elif mark < self.get_mark(pos):
-                #self.empty_cells.add(tuple(pos))
+            elif old != EMPTY and value == EMPTY:
+                self.add_empty(idx)
                 self.mark_count -= 1
 
-            self.grid[(pos[1] * self.size[0]) + pos[0]] = mark
+            self.zobrist ^= (self.zobrist_keys[old][idx] ^
+                             self.zobrist_keys[value][idx])
+            if self.symmetry_hashes is not None:
+                old_keys, new_keys = self.zobrist_keys[old], self.zobrist_keys[value]
+                self.symmetry_hashes = [hashed ^ old_keys[cells[idx]] ^ new_keys[cells[idx]]
+                                        for hashed, cells in zip(self.symmetry_hashes,
+                                                                 self.symmetries)]
+
+            lines = self.lines.through[idx]
+            for line in lines:
+                self.credit_line(line, -1)
+            self.marks[idx] = value
+            for line in lines:
+                self.credit_line(line, 1)
+
+    # Adds (or with -1, removes) the point a line is worth to the one empty
+    # cell that would complete it, if there is one
+    def credit_line(self, line: tuple[int, int, int], amount: int) -> None:
+        marks = self.marks
+        first, middle, last = marks[line[0]], marks[line[1]], marks[line[2]]
+
+        if middle == O:
+            if first == EMPTY and last == S:
+                cell, gains = line[0], self.s_gain
+            elif first == S and last == EMPTY:
+                cell, gains = line[2], self.s_gain
+            else:
+                return
+        elif middle == EMPTY and first == S and last == S:
+            cell, gains = line[1], self.o_gain
+        else:
+            return
+
+        gains[cell] += amount
+        if self.s_gain[cell] or self.o_gain[cell]:
+            self.scoring_cells.add(cell)
+        else:
+            self.scoring_cells.discard(cell)
+
+    def get_gain(self, pos: Sequence[int], mark: Mark) -> int:
+        """How many SOSes mark would make at the empty cell pos right now."""
+        idx = (pos[1] * self.size[0]) + pos[0]
+        match mark:
+            case Mark.S: return self.s_gain[idx]
+            case Mark.O: return self.o_gain[idx]
+            case _: return 0
+
+    def scoring_moves(self) -> Iterator[Move]:
+        """Yields every move that would make an SOS, most SOSes first per cell."""
+        for idx in sorted(self.scoring_cells):
+            moves = sorted(((self.s_gain[idx], Mark.S), (self.o_gain[idx], Mark.O)),
+                           key=lambda move: move[0],
+                           reverse=True)
+            for gain, mark in moves:
+                if gain > 0:
+                    yield Move(self.positions[idx], mark, gain)
+
+    def canonical_key(self) -> tuple[int, int]:
+        """The same hash for every rotation and reflection of the grid.
+
+        Returns (key, transform): the smallest zobrist hash of the grid under
+        any of self.symmetries, and the transform that gives it. Positions
+        that are symmetric to each other share a key, so a cache keyed on
+        it stores them once, as the grid under transform looks. Only the
+        grid is hashed; mix in the game mode and the like as needed.
+        """
+        if self.symmetry_hashes is None:
+            self.symmetry_hashes = [0] * len(self.symmetries)
+            for idx, value in enumerate(self.marks):
+                if value != EMPTY:
+                    keys = self.zobrist_keys[value]
+                    self.symmetry_hashes = [hashed ^ keys[cells[idx]]
+                                            for hashed, cells in zip(self.symmetry_hashes,
+                                                                     self.symmetries)]
+
+        key = min(self.symmetry_hashes)
+        return key, self.symmetry_hashes.index(key)
+
+    def transform_move(self, move: Move, transform: int) -> Move:
+        """Where move lands on the grid seen through transform."""
+        idx = (move.pos[1] * self.size[0]) + move.pos[0]
+        return move._replace(pos=self.positions[self.symmetries[transform][idx]])
+
+    def untransform_move(self, move: Move, transform: int) -> Move:
+        """Maps a move on the grid seen through transform back onto this one."""
+        return self.transform_move(move, inverse_symmetries(self.size)[transform])
+
+    # Swaps the last empty cell into the removed cell's slot
+    def remove_empty(self, idx: int) -> None:
+        slot = self.empty_slots[idx]
+        last = self.empty_cells.pop()
+        if last != idx:
+            self.empty_cells[slot] = last
+            self.empty_slots[last] = slot
+
+    # Puts the cell back in its old slot if it can, so undoing removals in
+    # reverse order leaves empty_cells in exactly the order it was in
+    def add_empty(self, idx: int) -> None:
+        slot = self.empty_slots[idx]
+        if slot < len(self.empty_cells):
+            other = self.empty_cells[slot]
+            self.empty_slots[other] = len(self.empty_cells)
+            self.empty_cells.append(other)
+            self.empty_cells[slot] = idx
+        else:
+            self.empty_slots[idx] = len(self.empty_cells)
+            self.empty_cells.append(idx)
 
+    # Also stops recording, since the recorded game no longer matches
     def clear(self) -> None:
-        self.grid = [Mark.EMPTY] * math.prod(self.size)
+        self.stop_recording()
+        self.marks = bytearray([EMPTY]) * math.prod(self.size)
+        self.positions = cell_positions(self.size)
+        self.lines = line_tables(self.size)
+        self.empty_cells = list(range(len(self.marks)))
+        self.empty_slots = list(range(len(self.marks)))
         self.mark_count = 0
-        self.sos_list.clear()
-        self.move_hist.clear()
-        self.move_future.clear()
+        self.zobrist = 0
+        self.zobrist_keys = zobrist_keys(self.size)
+        self.symmetries = cell_symmetries(self.size)
+        self.symmetry_hashes = None
+        self.s_gain = [0] * len(self.marks)
+        self.o_gain = [0] * len(self.marks)
+        self.scoring_cells.clear()
+        self.sos_list = SOSList(self.size)
+        self.move_hist = MoveList(self.size)
+        self.move_future = MoveList(self.size)
         for player in self.players:
             player.score = 0
 
-    # Assumes that col and row are in bounds
-    def make_move(self, pos: Sequence[int], mark: Mark) -> bool:
-        if mark <= Mark.EMPTY:
-            raise ValueError("player cannot set a mark to empty")
-        elif not self.end and self.get_mark(pos) == Mark.EMPTY:
-            self.set_mark(pos, mark)
+    # Assumes that the move is legal
+    # Plays a move without touching move_future, for searching
+    def push_move(self, pos: Sequence[int], mark: Mark) -> Move:
+        self.set_mark(pos, mark)
 
-            new_sos_list = self.creates_sos(pos, mark)
+        new_sos_list = self.creates_sos(pos, mark)
+        if new_sos_list:
             self.get_player().score += len(new_sos_list)
             self.sos_list.extend(new_sos_list)
 
-            move = Move(pos, mark, len(new_sos_list), self.turn)
-            self.move_hist.append(move)
+        move = Move(pos, mark, len(new_sos_list), self.turn)
+        self.move_hist.append(move)
+
+        if self.detect_end():
+            self.end = True
+        else:
+            self.turn = self.get_next_turn()
+
+        return move
+
+    # Exactly reverts the last push_move, without touching move_future
+    def pop_move(self) -> Move:
+        last_move = self.move_hist.pop(-1)
+        self.set_mark(last_move.pos, Mark.EMPTY)
+        if last_move.sos_count > 0:
+            del self.sos_list[-last_move.sos_count:]
+        self.players[last_move.player].score -= last_move.sos_count
+        self.turn = last_move.player
+        self.end = False
+        return last_move
+
+    # Assumes that col and row are in bounds
+    def make_move(self, pos: Sequence[int], mark: Mark) -> bool:
+        if mark.value <= EMPTY:
+            raise ValueError("player cannot set a mark to empty")
+        elif (not self.end and self.in_bounds(pos) and
+              self.marks[(pos[1] * self.size[0]) + pos[0]] == EMPTY):
+            move = self.push_move(pos, mark)
+
             if not self.move_future:
                pass 
             elif self.move_future[-1] == move:
-                self.move_future.pop(-1)
+                del self.move_future[-1]
             else:
                 self.move_future.clear()
 
-            if self.detect_end():
-                self.end = True
-            else:
-                self.turn = self.get_next_turn()
-
+            if self.recorder is not None:
+                self.recorder.write_move(move)
             return True
         else:
             return False
 
     def undo_move(self) -> None:
         if len(self.move_hist) > 0:
-            last_move = self.move_hist.pop(-1)
-            self.set_mark(last_move.pos, Mark.EMPTY)
-            del self.sos_list[-last_move.sos_count:]
-            self.players[last_move.player].score -= last_move.sos_count
-            self.turn = (self.turn - 1) % len(self.players)
-            self.move_future.append(last_move)
+            self.move_future.append(self.pop_move())
+            if self.recorder is not None:
+                self.recorder.write_undo()
 
     def redo_move(self) -> None:
         if len(self.move_future) > 0:
@@ -268,27 +717,101 @@ class Board:
             self.make_move(next_move.pos, next_move.mark)
 
 
+    # Only the position is packed: size, mode, turn, end, scores and grid.
+    # History, SOS lines and player names are left out, which is all a
+    # search running in another process needs.
+    def pack_state(self) -> bytes:
+        return (struct.pack("<HHBBBB",
+                            self.size[0],
+                            self.size[1],
+                            GAME_MODES.index(self.game_mode),
+                            self.turn,
+                            self.end,
+                            len(self.players)) +
+                struct.pack(f"<{len(self.players)}i",
+                            *(player.score for player in self.players)) +
+                bytes(self.marks))
+
+    @classmethod
+    def unpack_state(cls, state: bytes) -> "Board":
+        width, height, mode, turn, end, num_players = struct.unpack_from("<HHBBBB", state)
+        scores = struct.unpack_from(f"<{num_players}i", state, 8)
+
+        new_board = cls([width, height],
+                        [Player(f"Player {idx + 1}") for idx in range(num_players)])
+        new_board.game_mode = GAME_MODES[mode]
+
+        for idx, value in enumerate(state[8 + 4*num_players:]):
+            if value != EMPTY:
+                new_board.set_mark(new_board.positions[idx], MARKS[value])
+
+        for player, score in zip(new_board.players, scores):
+            player.score = score
+        new_board.turn = turn
+        new_board.end = bool(end)
+        return new_board
+
     def save(self, file_path: str = "sos.sav") -> None:
-        with open(file_path, "w") as file:
-            file.write(repr(self.size)+"\n")
-            file.write(repr(self.game_mode)+"\n")
-            file.write(repr(self.players)+"\n")
-            file.write(repr(self.move_hist)+"\n")
-            file.write(repr(self.move_future)+"\n")
+        with GameWriter(file_path, self):
+            pass
 
+    # Replays the saved game, so the board ends up exactly as it was saved,
+    # redo moves included. The checksum is only checked at the end, so a
+    # damaged file raises SaveFileError with the board part way loaded.
     def load(self, file_path: str = "sos.sav") -> None:
-        with open(file_path, "r") as file:
-            self.size = eval(file.readline())
+        with GameReader(file_path) as reader:
+            self.size = reader.size
+            self.players = reader.players
+            self.game_mode = reader.game_mode
             self.clear()
-            
-            self.game_mode   = eval(file.readline())
-            self.players     = eval(file.readline())
+            self.turn = 0
+            self.end = False
+
+            try:
+                self.replay(reader)
+            except SaveFileError: # from the reader, already naming the file
+                raise
+            except ValueError as error: # an illegal move
+                raise SaveFileError(f"{file_path}: {error}") from None
+
+    # Plays moves (None for an undo) with make_move and undo_move, but with
+    # no lines to credit while it does, working out the gains once at the end
+    def replay(self, moves: Iterable[Move]) -> None:
+        lines = self.lines
+        self.lines = lines._replace(through=((),) * len(self.marks))
+        try:
+            for move in moves:
+                if move is None:
+                    self.undo_move()
+                elif not self.make_move(move.pos, move.mark):
+                    raise ValueError(f"illegal move {move}")
+        finally:
+            self.lines = lines
+            self.rebuild_gains()
+
+    def rebuild_gains(self) -> None:
+        self.s_gain = [0] * len(self.marks)
+        self.o_gain = [0] * len(self.marks)
+        self.scoring_cells.clear()
+
+        # only lines with a mark on them can be worth anything
+        lines = set()
+        for idx, value in enumerate(self.marks):
+            if value != EMPTY:
+                lines.update(self.lines.through[idx])
+        for line in lines:
+            self.credit_line(line, 1)
+
+    def record(self, file_path: str = "sos.sav") -> None:
+        """Saves the game so far, then appends every move and undo as it happens."""
+        self.stop_recording()
+        self.recorder = GameWriter(file_path, self)
+
+    def stop_recording(self) -> None:
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
 
-            move_hist        = eval(file.readline())
-            move_future      = eval(file.readline())
-            self.move_future = move_future.extend(move_hist.reverse())
-
-    # Assumes that col and row are in bounds
     # Assumes that the space is empty
     def creates_sos(self, pos: Sequence[int], mark: Mark) -> list[SOS]:
         sos_list = []
@@ -296,50 +819,45 @@ class Board:
         if self.out_of_bounds(pos):
             return sos_list
 
-        offsets = ((-1,-1), # north west
-                   ( 0,-1), # north
-                   ( 1,-1), # north east
-                   ( 1, 0), #       east
-                   ( 1, 1), # south east
-                   ( 0, 1), # south
-                   (-1, 1), # south west
-                   (-1, 0)) #       west
+        idx = (pos[1] * self.size[0]) + pos[0]
+        marks = self.marks
 
         match mark:
             case Mark.S:
-                for off in offsets:
-                    if (self.get_mark((pos[0] + off[0]  , pos[1] + off[1]  )) == Mark.O and
-                        self.get_mark((pos[0] + off[0]*2, pos[1] + off[1]*2)) == Mark.S):
-
-                        sos_list.append(SOS(pos,
-                                            (pos[0] + off[0]*2, pos[1] + off[1]*2),
-                                            self.turn))
+                for o_idx, s_idx in self.lines.as_end[idx]:
+                    if marks[o_idx] == O and marks[s_idx] == S:
+                        sos_list.append(SOS(pos, self.positions[s_idx], self.turn))
             case Mark.O:
-                for off in offsets[:4]:
-                    if (self.get_mark((pos[0] + off[0], pos[1] + off[1])) == Mark.S and
-                        self.get_mark((pos[0] - off[0], pos[1] - off[1])) == Mark.S):
-
-                        sos_list.append(SOS((pos[0] + off[0], pos[1] + off[1]),
-                                            (pos[0] - off[0], pos[1] - off[1]),
+                for s_idx, other_idx in self.lines.as_middle[idx]:
+                    if marks[s_idx] == S and marks[other_idx] == S:
+                        sos_list.append(SOS(self.positions[s_idx],
+                                            self.positions[other_idx],
                                             self.turn))
         return sos_list
 
     def get_empty_cells(self) -> list[tuple[int]]:
-        empty_cells = []
-        for row in range(self.size[1]):     
-            for col in range(self.size[0]):
-                if self.get_mark((col, row)) == Mark.EMPTY:
-                    empty_cells.append((col, row))
-        return empty_cells
-
+        return [self.positions[idx] for idx in self.empty_cells]
+
+    # The board may change between items, as long as it is changed back
+    # (e.g. with push_move and pop_move) before asking for the next one
+    def legal_moves(self) -> Iterator[tuple[tuple[int, int], Mark]]:
+        positions = self.positions
+        empty_cells = self.empty_cells
+        for slot in range(len(empty_cells)):
+            pos = positions[empty_cells[slot]]
+            yield pos, Mark.S
+            yield pos, Mark.O
 
     def get_random_legal_position(self) -> tuple[int, int]:
-        return random.choice(self.get_empty_cells())
+        return self.positions[random.choice(self.empty_cells)]
 
     def get_optimal_move(self, depth: int = 0) -> Move:
-        if self.mark_count == len(self.grid):
+        if self.mark_count == len(self.marks):
             return None
         
+        elif self.game_mode == "simple" and self.scoring_cells:
+            return next(self.scoring_moves())
+
         else:
             empty_cells = self.get_empty_cells()
             best_score = -9
@@ -354,15 +872,15 @@ class Board:
             for pos in empty_cells:
                 for mark in (Mark.S, Mark.O):
                     
-                    expected_gain = len(self.creates_sos(pos, mark))
+                    expected_gain = self.get_gain(pos, mark)
 
                     if self.game_mode == "simple" and expected_gain > 0:
                         return Move(pos, mark, expected_gain)
 
                     if depth > 0:
-                        test_board = deepcopy(self)
-                        test_board.make_move(pos, mark)
-                        next_move = test_board.get_optimal_move(depth - 1)
+                        self.push_move(pos, mark)
+                        next_move = self.get_optimal_move(depth - 1)
+                        self.pop_move()
 
                         if next_move is None:
                             expected_loss = 0
@@ -507,12 +1025,12 @@ class Board:
             if best_moves:
                 return random.choice(best_moves)
             else:
-                return Move(random.choice(empty_cells), 
+                return Move(self.get_random_legal_position(), 
                             random.choice((Mark.S, Mark.O)))
 
     def make_computer_move(self) -> None:
         move = self.get_optimal_move(1)
-        self.make_move(move.col, move.row, move.mark)
+        self.make_move(move.pos, move.mark)
 
     def get_next_turn(self) -> int:
         return (self.turn + 1) % len(self.players)
@@ -572,3 +1090,162 @@ class Board:
         if game_mode in ("simple", "general"):
             self.game_mode = game_mode
 
+
+
+class SaveFileError(ValueError):
+    """A save file that is not one, is damaged, or holds an impossible game."""
+
+
+class GameWriter:
+    """Writes a board's game to a save file, then appends moves as they come.
+
+    Records are flushed as they are written, so a game cut off part way can
+    still be read with allow_partial. close writes the checksum footer.
+    """
+
+    def __init__(self, file_path: str, test_board: Board) -> None:
+        if len(test_board.players) > 255:
+            raise ValueError("cannot save more than 255 players")
+
+        self.width = test_board.size[0]
+        self.crc = 0
+        self.file = open(file_path, "wb")
+
+        header = [SAVE_HEADER.pack(SAVE_MAGIC,
+                                   SAVE_VERSION,
+                                   test_board.size[0],
+                                   test_board.size[1],
+                                   GAME_MODES.index(test_board.game_mode),
+                                   len(test_board.players))]
+        for player in test_board.players:
+            name = player.name.encode()[:255]
+            strategy = player.strategy.encode()[:255]
+            header += [SAVE_PLAYER.pack(player.hue, player.computer, len(name), len(strategy)),
+                       name,
+                       strategy]
+        self.write(b"".join(header))
+
+        # moves still to redo are played, then undone again
+        future = test_board.move_future[::-1]
+        self.write(b"".join(self.move_record(move)
+                            for move in [*test_board.move_hist, *future]))
+        self.write(SAVE_RECORD.pack(UNDO_RECORD, 0) * len(future))
+        self.file.flush()
+
+    def __enter__(self) -> "GameWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def move_record(self, move: Move) -> bytes:
+        return SAVE_RECORD.pack(move.mark.value, (move.pos[1] * self.width) + move.pos[0])
+
+    def write(self, data: bytes) -> None:
+        self.file.write(data)
+        self.crc = zlib.crc32(data, self.crc)
+
+    def write_move(self, move: Move) -> None:
+        self.write(self.move_record(move))
+        self.file.flush()
+
+    def write_undo(self) -> None:
+        self.write(SAVE_RECORD.pack(UNDO_RECORD, 0))
+        self.file.flush()
+
+    def close(self) -> None:
+        if not self.file.closed:
+            self.file.write(SAVE_RECORD.pack(END_RECORD, self.crc))
+            self.file.close()
+
+
+class GameReader:
+    """Reads a save file's header on opening, then streams its records.
+
+    Iterating yields a Move (without sos_count or player) for every move and
+    None for every undo, and checks the checksum once it reaches the footer.
+    A file without a footer, e.g. from a game that was being recorded when
+    the program stopped, raises SaveFileError unless allow_partial is set.
+    """
+
+    def __init__(self, file_path: str, allow_partial: bool = False) -> None:
+        self.file_path = file_path
+        self.allow_partial = allow_partial
+        self.crc = 0
+        self.file = open(file_path, "rb")
+        try:
+            self.read_header()
+        except Exception:
+            self.file.close()
+            raise
+
+    def __enter__(self) -> "GameReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.file.close()
+
+    def read(self, length: int) -> bytes:
+        data = self.file.read(length)
+        if len(data) != length:
+            raise SaveFileError(f"{self.file_path} ends inside its header")
+        self.crc = zlib.crc32(data, self.crc)
+        return data
+
+    def read_header(self) -> None:
+        magic, version, width, height, mode, num_players = SAVE_HEADER.unpack(
+            self.read(SAVE_HEADER.size))
+
+        if magic != SAVE_MAGIC:
+            raise SaveFileError(f"{self.file_path} is not an SOS save file")
+        elif version != SAVE_VERSION:
+            raise SaveFileError(f"{self.file_path} is save version {version}, "
+                                f"only version {SAVE_VERSION} can be read")
+        elif width < 3 or height < 3 or mode >= len(GAME_MODES) or num_players == 0:
+            raise SaveFileError(f"{self.file_path} has an impossible header")
+
+        self.version = version
+        self.size = [width, height]
+        self.game_mode = GAME_MODES[mode]
+        self.positions = cell_positions(self.size)
+
+        self.players = []
+        for _ in range(num_players):
+            hue, computer, name_length, strategy_length = SAVE_PLAYER.unpack(
+                self.read(SAVE_PLAYER.size))
+            name = self.read(name_length).decode(errors="replace")
+            strategy = self.read(strategy_length).decode(errors="replace")
+            try:
+                self.players.append(Player(name, hue, bool(computer), strategy))
+            except ValueError as error:
+                raise SaveFileError(f"{self.file_path} has a bad player: {error}") from None
+
+    def __iter__(self) -> Iterator[Move]:
+        size = SAVE_RECORD.size
+        cells = len(self.positions)
+        leftover = b""
+
+        while chunk := self.file.read(size * 4096):
+            data = leftover + chunk
+            whole = len(data) - len(data) % size
+            records, leftover = data[:whole], data[whole:]
+
+            for index, (kind, value) in enumerate(SAVE_RECORD.iter_unpack(records)):
+                if kind == END_RECORD:
+                    if zlib.crc32(records[:index * size], self.crc) != value:
+                        raise SaveFileError(f"{self.file_path} failed its checksum")
+                    return
+                elif kind == UNDO_RECORD:
+                    yield None
+                elif kind in (S, O) and value < cells:
+                    yield Move(self.positions[value], MARKS[kind])
+                else:
+                    raise SaveFileError(f"{self.file_path} has a bad record {(kind, value)}")
+
+            self.crc = zlib.crc32(records, self.crc)
+
+        if not self.allow_partial:
+            raise SaveFileError(f"{self.file_path} is cut off before its checksum")
@@ -0,0 +1,274 @@
+# File: corpus.py
+# Project: 2023 Spring Semester SOS Project
+# Programmer: Ian Rowse <imrnnc@umsystem.edu>
+
+"""Append-only archive of finished games, split into numbered shards.
+
+The corpus directory holds a corpus.meta file, which records the shard
+size the corpus was written with, and each shard is a pair of files:
+
+    00000.moves  every move of every game, 4 bytes each (cell << 1 | is O)
+    00000.index  one fixed size record per game: where its moves start, how
+                 many there are, and its size, mode, players and winner
+
+A game's id is its shard number * shard_size + its place in the shard, so
+finding any game is one index record read. Readers memory map the files,
+and filtering by size, mode or winner reads nothing but the index.
+"""
+
+from collections.abc import Iterator, Sequence
+import mmap
+import os
+import struct
+from typing import NamedTuple
+
+try:
+    import board
+except ImportError: # imported as part of the src package, e.g. by the tests
+    from src import board
+
+INDEX_RECORD = struct.Struct("<QIHHBBBx") # offset, moves, width, height, mode, players, winner
+
+META_FILE    = "corpus.meta"
+META_MAGIC   = b"SOSC"
+META_VERSION = 1
+META_RECORD  = struct.Struct("<4sBxxxI") # magic, version, shard size
+
+DRAW       = 0xFF # more than one victor
+UNFINISHED = 0xFE # archived before the game ended
+
+SHARD_SIZE = 1 << 16
+
+
+class GameInfo(NamedTuple):
+    game_id: int
+    size: tuple[int, int]
+    game_mode: str
+    num_players: int
+    winner: int     # player index, DRAW or UNFINISHED
+    num_moves: int
+
+
+def shard_paths(directory: str, shard: int) -> tuple[str, str]:
+    return (os.path.join(directory, f"{shard:05d}.index"),
+            os.path.join(directory, f"{shard:05d}.moves"))
+
+
+def count_shards(directory: str) -> int:
+    shards = 0
+    while os.path.exists(shard_paths(directory, shards)[0]):
+        shards += 1
+    return shards
+
+
+def read_shard_size(directory: str) -> int:
+    """The shard size the corpus was written with, or None if it has no metadata."""
+    path = os.path.join(directory, META_FILE)
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except FileNotFoundError:
+        return None
+
+    try:
+        magic, version, shard_size = META_RECORD.unpack(data)
+    except struct.error:
+        magic = None
+    if magic != META_MAGIC:
+        raise ValueError(f"{path} is not corpus metadata")
+    elif version != META_VERSION or shard_size < 1:
+        raise ValueError(f"{path} is an unsupported corpus version")
+    return shard_size
+
+
+def winner_of(test_board: board.Board) -> int:
+    if not test_board.end:
+        return UNFINISHED
+    victors = test_board.victors()
+    if len(victors) == 1:
+        return test_board.players.index(victors[0])
+    return DRAW
+
+
+class CorpusWriter:
+    """Appends games to a corpus, carrying on from wherever it left off.
+
+    A game's moves are written before its index record, so a crash part way
+    through leaves at worst some unindexed moves, never a broken index. An
+    existing corpus keeps the shard size it was made with, and asking for a
+    different one raises ValueError.
+    """
+
+    def __init__(self, directory: str, shard_size: int = None) -> None:
+        os.makedirs(directory, exist_ok=True)
+        stored = read_shard_size(directory)
+        if stored is None:
+            if shard_size is None:
+                shard_size = SHARD_SIZE
+            elif shard_size < 1:
+                raise ValueError("shard_size must be at least 1")
+            with open(os.path.join(directory, META_FILE), "wb") as file:
+                file.write(META_RECORD.pack(META_MAGIC, META_VERSION, shard_size))
+        elif shard_size not in (None, stored):
+            raise ValueError(f"{directory} has shards of {stored} games, not {shard_size}")
+        else:
+            shard_size = stored
+
+        self.directory = directory
+        self.shard_size = shard_size
+        self.index_file = None
+        self.moves_file = None
+
+        self.shard = max(count_shards(directory) - 1, 0)
+        self.open_shard()
+
+    def __enter__(self) -> "CorpusWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def open_shard(self) -> None:
+        self.close()
+        index_path, moves_path = shard_paths(self.directory, self.shard)
+        self.index_file = open(index_path, "ab")
+        self.moves_file = open(moves_path, "ab")
+        self.count = self.index_file.tell() // INDEX_RECORD.size
+
+    def close(self) -> None:
+        if self.index_file is not None:
+            self.index_file.close()
+            self.moves_file.close()
+            self.index_file = self.moves_file = None
+
+    def add(self, test_board: board.Board) -> int:
+        """Archives the board's move_hist, returning the new game's id."""
+        if self.count >= self.shard_size:
+            self.shard += 1
+            self.open_shard()
+
+        moves = [cell << 1 | (mark == board.O)
+                 for cell, mark in test_board.move_hist.cell_marks()]
+
+        offset = self.moves_file.tell()
+        self.moves_file.write(struct.pack(f"<{len(moves)}I", *moves))
+        self.moves_file.flush()
+        self.index_file.write(INDEX_RECORD.pack(offset,
+                                                len(moves),
+                                                test_board.size[0],
+                                                test_board.size[1],
+                                                board.GAME_MODES.index(test_board.game_mode),
+                                                len(test_board.players),
+                                                winner_of(test_board)))
+        self.index_file.flush()
+
+        self.count += 1
+        return self.shard * self.shard_size + self.count - 1
+
+
+class Shard:
+    """Memory maps of one shard's index and moves files."""
+
+    def __init__(self, directory: str, shard: int) -> None:
+        self.maps = []
+        for path in shard_paths(directory, shard):
+            with open(path, "rb") as file:
+                if os.fstat(file.fileno()).st_size:
+                    self.maps.append(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+                else:
+                    self.maps.append(b"")
+        self.index, self.moves = self.maps
+        self.count = len(self.index) // INDEX_RECORD.size
+
+    def close(self) -> None:
+        for memory in self.maps:
+            if isinstance(memory, mmap.mmap):
+                memory.close()
+
+
+class Corpus:
+    """Reads a corpus as it was when opened."""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.shard_size = read_shard_size(directory) or SHARD_SIZE
+        self.shards = [Shard(directory, shard) for shard in range(count_shards(directory))]
+
+    def __enter__(self) -> "Corpus":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for shard in self.shards:
+            shard.close()
+
+    def __len__(self) -> int:
+        return sum(shard.count for shard in self.shards)
+
+    def __contains__(self, game_id: int) -> bool:
+        shard, place = divmod(game_id, self.shard_size)
+        return 0 <= shard < len(self.shards) and place < self.shards[shard].count
+
+    def game_ids(self) -> Iterator[int]:
+        for number, shard in enumerate(self.shards):
+            yield from range(number * self.shard_size, number * self.shard_size + shard.count)
+
+    def __iter__(self) -> Iterator[GameInfo]:
+        for game_id in self.game_ids():
+            yield self.info(game_id)
+
+    def record(self, game_id: int) -> tuple:
+        if game_id not in self:
+            raise IndexError(f"no game {game_id} in {self.directory}")
+        shard, place = divmod(game_id, self.shard_size)
+        return INDEX_RECORD.unpack_from(self.shards[shard].index, place * INDEX_RECORD.size)
+
+    def info(self, game_id: int) -> GameInfo:
+        offset, num_moves, width, height, mode, num_players, winner = self.record(game_id)
+        return GameInfo(game_id, (width, height), board.GAME_MODES[mode],
+                        num_players, winner, num_moves)
+
+    def moves(self, game_id: int) -> list[board.Move]:
+        """The game's moves, without their sos_count or player."""
+        offset, num_moves, width, height = self.record(game_id)[:4]
+        positions = board.cell_positions((width, height))
+        codes = struct.unpack_from(f"<{num_moves}I",
+                                   self.shards[game_id // self.shard_size].moves,
+                                   offset)
+        return [board.Move(positions[code >> 1], board.Mark.O if code & 1 else board.Mark.S)
+                for code in codes]
+
+    def replay(self, game_id: int) -> board.Board:
+        """The game replayed onto a new board, as it was when archived."""
+        info = self.info(game_id)
+        new_board = board.Board(list(info.size),
+                                [board.Player(f"Player {idx + 1}")
+                                 for idx in range(info.num_players)])
+        new_board.game_mode = info.game_mode
+        new_board.replay(self.moves(game_id))
+        return new_board
+
+    def select(self,
+               size: int | Sequence[int] = None,
+               game_mode: str = None,
+               winner: int = None,
+               min_moves: int = 0) -> Iterator[int]:
+        """Ids of the games that match every given filter, from the index alone.
+
+        An int size matches square boards of that side.
+        """
+        if isinstance(size, int):
+            size = (size, size)
+        mode = None if game_mode is None else board.GAME_MODES.index(game_mode)
+
+        for number, shard in enumerate(self.shards):
+            records = INDEX_RECORD.iter_unpack(shard.index[:shard.count * INDEX_RECORD.size])
+            for place, (_, num_moves, width, height, record_mode, _, record_winner) \
+                    in enumerate(records):
+                if ((size is None or (width, height) == tuple(size)) and
+                    (mode is None or record_mode == mode) and
+                    (winner is None or record_winner == winner) and
+                    num_moves >= min_moves):
+                    yield number * self.shard_size + place
@@ -5,13 +5,20 @@
 """Pygame-based graphical frontend for the board.py SOS game."""
 
 from collections.abc import Sequence
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
 import os
 import pygame
 
+import ai
 import board
+import corpus
 from pygame_helper import *
 import ui
 
+# finished games are archived in the project's games directory, wherever
+# the game was started from
+ARCHIVE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "games")
+
 class GameEvents:
     MAKE_MOVE = pygame.event.custom_type()
 
@@ -26,6 +33,17 @@ class Game:
         self.surface = pygame.display.set_mode(window_size, pygame.RESIZABLE)
 
         self.board = board.Board()
+        # computer moves are worked out in the worker process, one at a time;
+        # thinking is the move in flight, and job goes up whenever one is
+        # abandoned, so a MAKE_MOVE for it that was already posted is ignored
+        self.worker = None
+        self.thinking = None
+        self.job = 0
+        # every finished game goes into the corpus in ARCHIVE_PATH, once it
+        # is left for a new game or on quitting, since it may be undone and
+        # played on until then
+        self.archive = None
+        self.finished = False # a game played here has ended since it was archived
 
         self.board_ui = ui.UI()
         self.menu_ui  = ui.UI()
@@ -36,6 +54,18 @@ class Game:
 
         self.state = "menu"
 
+        # what the screen showed when it was last drawn, so that only what
+        # changed since is drawn again; see draw
+        self.redraw = True     # draw everything, after a resize or the like
+        self.dirty = []        # rects to draw again this frame
+        self.drawn_state = None
+        self.hovered = None    # key of the button under the mouse
+
+        # every SOS line, drawn once each onto a see-through layer the size
+        # of the window, which is blitted over the board
+        self.sos_layer = None
+        self.sos_layer_count = 0
+
         self.running = False
 
         self.clock = pygame.time.Clock()
@@ -66,16 +96,12 @@ class Game:
                                        self.board.game_mode == "general"),
             
             "player_one"   : ui.Button(rect, 
-                                       "Player One: " + ("Computer"
-                                            if self.board.players[0].computer
-                                            else "Human"), 
+                                       "Player One: " + self.player_kind(0), 
                                        {}, 
                                        self.board.players[0].computer),
             
             "player_two"   : ui.Button(rect, 
-                                       "Player Two: " + ("Computer" 
-                                            if self.board.players[1].computer
-                                            else "Human"), 
+                                       "Player Two: " + self.player_kind(1), 
                                        {}, 
                                        self.board.players[1].computer),
 
@@ -91,16 +117,39 @@ class Game:
             "quit"     : ui.Button(rect, "Quit?")
         })
 
+    def player_kind(self, idx: int) -> str:
+        player = self.board.players[idx]
+        if player.computer:
+            return ai.strategy_name(player, self.board)
+        else:
+            return "Human"
+
+    # the labels depend on the board's size and mode as well as the players
+    def update_player_buttons(self) -> None:
+        for idx, key in enumerate(("player_one", "player_two")):
+            self.menu_ui[key].clicked = self.board.players[idx].computer
+            self.menu_ui[key].text = ("Player One: ", "Player Two: ")[idx] + self.player_kind(idx)
+
     def resize(self) -> None:
+        self.redraw = True
+        self.sos_layer = None
+        ui.clear_text_cache()
         self.size = min(self.surface.get_size())
         gap_size = self.size*0.01
         cell_size = ((self.size - gap_size) / self.board.size[0] - gap_size)
 
         width, height = self.surface.get_size()
 
+        # for draw_board_region, which looks for the cells a rect touches
+        self.cell_buttons = list(self.board_ui.values())
+
         board_offset = ((width  - self.size)/2 + gap_size,
                         (height - self.size)/2 + gap_size)
 
+        # kept for cell_at, which finds cells from the layout alone
+        self.board_offset = board_offset
+        self.cell_pitch = cell_size + gap_size
+
         for y in range(self.board.size[1]):
             for x in range(self.board.size[0]):
                 self.board_ui[f"{x} {y}"].rect = ( # Cursed, I know...
@@ -148,6 +197,25 @@ class Game:
         self.end_ui["quit"].rect          = rect_center((width * 5/6, height * 3/4),
                                                         (width * 1/6, height * 1/4))
 
+        self.cell_rects = [button.rect for button in self.cell_buttons]
+
+        for buttons in (self.board_ui, self.menu_ui, self.end_ui):
+            buttons.reindex()
+
+    # Cell rects have their float corners truncated, so the cell under a point
+    # is the one the layout puts it in or the next one along, on each axis
+    def cell_at(self, pos: Sequence[int]) -> str:
+        """Key of the board cell button under pos, or None if there is none."""
+        first_x = int((pos[0] - self.board_offset[0]) // self.cell_pitch)
+        first_y = int((pos[1] - self.board_offset[1]) // self.cell_pitch)
+        for y in (first_y, first_y + 1):
+            for x in (first_x, first_x + 1):
+                if 0 <= x < self.board.size[0] and 0 <= y < self.board.size[1]:
+                    key = f"{x} {y}"
+                    if self.board_ui[key].rect.collidepoint(pos):
+                        return key
+        return None
+
     def draw_menu(self) -> None:
         self.surface.fill((50, 50, 50))
         self.menu_ui.draw(self.surface)
@@ -187,12 +255,91 @@ class Game:
         self.end_ui.draw(self.surface)
 
     def draw_sos_list(self) -> None:
-        for sos in self.board.sos_list:
-            draw_nice_line(self.surface,
-                           hue_to_color(self.board.players[sos.player_id].hue), 
-                           self.board_ui[f"{sos.p1[0]} {sos.p1[1]}"].rect.center, 
+        self.update_sos_layer()
+        self.surface.blit(self.sos_layer, (0, 0))
+
+    # Draws the SOSes made since the last update onto the layer, starting a
+    # new layer if there is none or if SOSes have been taken back
+    def update_sos_layer(self) -> None:
+        if self.sos_layer is None or self.sos_layer_count > len(self.board.sos_list):
+            self.sos_layer = pygame.Surface(self.surface.get_size(), pygame.SRCALPHA)
+            self.sos_layer_count = 0
+
+        for sos in self.board.sos_list[self.sos_layer_count:]:
+            draw_nice_line(self.sos_layer,
+                           hue_to_color(self.board.players[sos.player_id].hue),
+                           self.board_ui[f"{sos.p1[0]} {sos.p1[1]}"].rect.center,
                            self.board_ui[f"{sos.p2[0]} {sos.p2[1]}"].rect.center,
-                           max(1, self.size / self.board.size[0] * 0.1))
+                           self.sos_width())
+        self.sos_layer_count = len(self.board.sos_list)
+
+    def sos_width(self) -> float:
+        return max(1, self.size / self.board.size[0] * 0.1)
+
+    def sos_rect(self, sos: board.SOS) -> pygame.Rect:
+        """The screen rect an SOS line covers, round ends included."""
+        start = self.board_ui[f"{sos.p1[0]} {sos.p1[1]}"].rect.center
+        end   = self.board_ui[f"{sos.p2[0]} {sos.p2[1]}"].rect.center
+        reach = self.sos_width() + 2
+        return pygame.Rect(min(start[0], end[0]) - reach,
+                           min(start[1], end[1]) - reach,
+                           abs(start[0] - end[0]) + reach*2,
+                           abs(start[1] - end[1]) + reach*2)
+
+    def border_rects(self) -> list[pygame.Rect]:
+        """The strips the turn border is drawn on."""
+        width, height = self.surface.get_size()
+        return [pygame.Rect(0, 0, width, 2),
+                pygame.Rect(0, height - 2, width, 2),
+                pygame.Rect(0, 0, 2, height),
+                pygame.Rect(width - 2, 0, 2, height)]
+
+    # Draws only what changed since the last frame: the whole screen after a
+    # resize or a switch of state, and otherwise the rects in self.dirty plus
+    # any button the mouse moved on to or off of. Returns the rects drawn.
+    def draw(self) -> list[pygame.Rect]:
+        current_ui = {"menu": self.menu_ui, "play": self.board_ui, "end": self.end_ui}[self.state]
+        if self.state == "play":
+            hovered = self.cell_at(pygame.mouse.get_pos())
+        else:
+            hovered = current_ui.hover(pygame.mouse.get_pos())
+        if hovered != self.hovered:
+            for key in (self.hovered, hovered):
+                if key in current_ui:
+                    self.dirty.append(current_ui[key].rect)
+            self.hovered = hovered
+
+        if self.redraw or self.state != self.drawn_state:
+            match self.state:
+                case "menu" : self.draw_menu()
+                case "play" : self.draw_board()
+                case "end"  : self.draw_end()
+            self.redraw = False
+            self.drawn_state = self.state
+            self.dirty.clear()
+            return [self.surface.get_rect()]
+
+        rects, self.dirty = self.dirty, []
+        for rect in rects:
+            self.surface.set_clip(rect)
+            match self.state:
+                case "menu" : self.draw_menu()
+                case "play" : self.draw_board_region(rect)
+                case "end"  : self.draw_end()
+        self.surface.set_clip(None)
+        return rects
+
+    # Everything that draw_board draws, but only what touches rect, which
+    # must be the surface's clip rect
+    def draw_board_region(self, rect: pygame.Rect) -> None:
+        self.surface.fill((50, 50, 50))
+        border_color = hue_to_color(self.board.get_player().hue)
+        pygame.draw.rect(self.surface, border_color, self.surface.get_rect(), 2)
+
+        for idx in rect.collidelistall(self.cell_rects):
+            self.cell_buttons[idx].draw(self.surface)
+
+        self.draw_sos_list()
 
     def handle_menu_clicks(self, key: str, mouse_button: int = 1) -> None:
         match key:
@@ -200,36 +347,35 @@ class Game:
                 if self.board.size[0] > 3:
                     self.board.size = tuple(i-1 for i in self.board.size)
                     self.menu_ui["cur_size"].text = str(self.board.size[0])
+                    self.update_player_buttons()
             
             case "size_up":
                 self.board.size = tuple(i+1 for i in self.board.size)
                 self.menu_ui["cur_size"].text = str(self.board.size[0])
+                self.update_player_buttons()
             
             case "simple_game":
                 self.board.game_mode = "simple"
                 self.menu_ui["simple_game"].clicked = True
                 self.menu_ui["general_game"].clicked = False
+                self.update_player_buttons()
             
             case "general_game":
                 self.board.game_mode = "general"
                 self.menu_ui["simple_game"].clicked = False
                 self.menu_ui["general_game"].clicked = True
+                self.update_player_buttons()
             
             case "player_one":
-                self.board.players[0].computer = not self.board.players[0].computer
-                self.menu_ui["player_one"].clicked = not self.menu_ui["player_one"].clicked
-                self.menu_ui["player_one"].text = "Player One: " + ("Computer" 
-                                            if self.board.players[0].computer
-                                            else "Human")
+                ai.next_strategy(self.board.players[0])
+                self.update_player_buttons()
             
             case "player_two":
-                self.board.players[1].computer = not self.board.players[1].computer
-                self.menu_ui["player_two"].clicked = not self.menu_ui["player_two"].clicked
-                self.menu_ui["player_two"].text = "Player Two: " + ("Computer" 
-                                            if self.board.players[1].computer
-                                            else "Human")
+                ai.next_strategy(self.board.players[1])
+                self.update_player_buttons()
             
             case "start_game":
+                self.cancel_thinking()
                 self.board.reset()
                 self.populate_buttons()
                 self.resize()
@@ -237,26 +383,22 @@ class Game:
 
             case "load":
                 if os.path.isfile("sos.sav"):
-                    self.board.load("sos.sav")
-
-                    self.menu_ui["cur_size"].text = str(self.board.size[0])
-
-                    self.menu_ui["simple_game"].clicked = (self.board.game_mode == "simple")
-                    self.menu_ui["general_game"].clicked = (self.board.game_mode == "general")
+                    self.cancel_thinking()
+                    # load leaves the board as it was saved, so carry on from there
+                    try:
+                        self.board.load("sos.sav")
+                    except board.SaveFileError:
+                        self.board.reset()
+                        self.populate_buttons()
+                        self.resize()
+                        return
 
-                    self.menu_ui["player_one"].clicked = self.board.players[0].computer
-                    self.menu_ui["player_one"].text = "Player One: " + ("Computer" 
-                                                if self.board.players[0].computer
-                                                else "Human")
+                    self.populate_buttons()
+                    self.resize()
+                    self.state = "end" if self.board.end else "play"
 
-                    self.menu_ui["player_two"].clicked = self.board.players[1].computer
-                    self.menu_ui["player_two"].text = "Player Two: " + ("Computer" 
-                                                if self.board.players[1].computer
-                                                else "Human")
-                    while self.board.move_future:
-                        next_move = self.board.move_future[-1]
-                        attrs = {"pos": next_move.pos, "mark": next_move.mark}
-                        pygame.event.post(pygame.event.Event(GameEvents.MAKE_MOVE, attrs))
+        # menu buttons change their text and colours when clicked
+        self.redraw = True
 
     def handle_board_clicks(self, pos: Sequence[int], button: int) -> None:
         if (not self.board.get_player().computer) and (button in (1, 3)) :
@@ -267,14 +409,97 @@ class Game:
             pygame.event.post(pygame.event.Event(GameEvents.MAKE_MOVE, attrs))
 
     def click_cell(self, pos: Sequence[int], mark: board.Mark) -> None:
-        self.board.make_move(pos, mark)
-        self.board_ui[f"{pos[0]} {pos[1]}"].text = self.board.get_char(pos)
+        made, turn = len(self.board.sos_list), self.board.turn
+        if not self.board.make_move(pos, mark):
+            return
+
+        button = self.board_ui[f"{pos[0]} {pos[1]}"]
+        button.text = self.board.get_char(pos)
+        self.dirty.append(button.rect)
+        for sos in self.board.sos_list[made:]:
+            self.dirty.append(self.sos_rect(sos))
+        if self.board.turn != turn:
+            self.dirty.extend(self.border_rects())
+
         if self.board.end:
             self.state = "end"
+            self.finished = True
+
+    # Takes moves back until it is a human's turn again, if anyone is human
+    def undo(self) -> None:
+        self.cancel_thinking()
+        humans = any(not player.computer for player in self.board.players)
+        while self.board.move_hist:
+            pos = self.board.move_hist[-1].pos
+            self.board.undo_move()
+            self.board_ui[f"{pos[0]} {pos[1]}"].text = self.board.get_char(pos)
+            if not humans or not self.board.get_player().computer:
+                break
+        self.state = "play"
+        self.redraw = True
+        self.sos_layer = None
+
+    # Starts the computer's move in the worker when it is a computer's turn,
+    # and posts it as a MAKE_MOVE once it is ready
+    def update_computer(self) -> None:
+        if self.thinking is None:
+            if self.state == "play" and self.board.get_player().computer:
+                if self.worker is None:
+                    self.worker = ProcessPoolExecutor(1)
+                self.thinking = self.worker.submit(ai.choose_replayed_move,
+                                                   tuple(self.board.size),
+                                                   self.board.game_mode,
+                                                   len(self.board.players),
+                                                   list(self.board.move_hist.cell_marks()),
+                                                   self.board.get_player().strategy,
+                                                   self.board.turn)
+        elif self.thinking.done():
+            try:
+                result = self.thinking.result()
+            except Exception as error: # the agent failed, or the worker died
+                result = self.fallback_move(error)
+            self.thinking = None
+            if result is not None:
+                cell, mark = result
+                attrs = {"pos": self.board.positions[cell],
+                         "mark": board.MARKS[mark],
+                         "job": self.job}
+                pygame.event.post(pygame.event.Event(GameEvents.MAKE_MOVE, attrs))
+
+    # Plays a quick greedy move for the computer whose job failed, so the
+    # game carries on, and starts a new worker next time if it was broken
+    def fallback_move(self, error: Exception) -> tuple[int, int]:
+        if isinstance(error, BrokenExecutor):
+            self.worker.shutdown(wait=False, cancel_futures=True)
+            self.worker = None
+
+        move = ai.GreedyPlayer().choose_move(self.board)
+        if move is None:
+            return None
+        return move.pos[1] * self.board.size[0] + move.pos[0], move.mark.value
+
+    # The worker cannot be interrupted, so an abandoned move is left to
+    # finish and its answer ignored
+    def cancel_thinking(self) -> None:
+        if self.thinking is not None:
+            self.thinking.cancel()
+            self.thinking = None
+        self.job += 1
+
+    # Archives the game being left, if it was played to the end here and
+    # not undone since
+    def archive_game(self) -> None:
+        if self.finished and self.board.end:
+            if self.archive is None:
+                self.archive = corpus.CorpusWriter(ARCHIVE_PATH)
+            self.archive.add(self.board)
+        self.finished = False
 
     def handle_end_clicks(self, key: str, button: int = 1) -> None:
         match key:
             case "new_game":
+                self.cancel_thinking()
+                self.archive_game()
                 self.state = "menu"
             case "save":
                 self.board.save()
@@ -285,10 +510,7 @@ class Game:
         self.running = True
 
         while self.running:
-            if self.state == "play" and self.board.get_player().computer:
-                move = self.board.get_optimal_move(1)
-                attrs = {"pos": move.pos, "mark": move.mark}
-                pygame.event.post(pygame.event.Event(GameEvents.MAKE_MOVE, attrs))
+            self.update_computer()
 
             for e in pygame.event.get():
                 match e.type:
@@ -299,6 +521,8 @@ class Game:
                         keys = pygame.key.get_pressed()
                         if keys[pygame.K_q] or keys[pygame.K_ESCAPE]:
                             self.running = False
+                        elif keys[pygame.K_u] and self.state in ("play", "end"):
+                            self.undo()
 
                     case pygame.VIDEORESIZE:
                         self.resize()
@@ -306,7 +530,10 @@ class Game:
                     case pygame.MOUSEBUTTONUP:
                         match self.state:
                             case "menu" : self.menu_ui.click(e.pos, e.button)
-                            case "play" : self.board_ui.click(e.pos, e.button)
+                            case "play" :
+                                key = self.cell_at(e.pos)
+                                if key is not None:
+                                    self.board_ui[key].click(e.button)
                             case "end"  : self.end_ui.click(e.pos, e.button)
 
                     case ui.BUTTON_CLICK:
@@ -316,14 +543,26 @@ class Game:
                             case "end"  : self.handle_end_clicks(e.key, e.mouse_button)
 
                     case GameEvents.MAKE_MOVE:
-                        self.click_cell(e.pos, e.mark)
-
-            match self.state:
-                case "menu" : self.draw_menu()
-                case "play" : self.draw_board()
-                case "end"  : self.draw_end()
+                        # computer moves carry the job they were worked out for
+                        if getattr(e, "job", self.job) == self.job:
+                            self.click_cell(e.pos, e.mark)
 
-            pygame.display.update()
+            rects = self.draw()
+            if rects:
+                pygame.display.update(rects)
 
             self.clock.tick(40)
 
+        self.cancel_thinking()
+        self.archive_game()
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None
+        if self.worker is not None:
+            # the worker only exits once its agents' own pools are closed
+            try:
+                self.worker.submit(ai.close_replay_agents)
+            except BrokenExecutor:
+                pass
+            self.worker.shutdown(wait=False)
+
@@ -0,0 +1,259 @@
+# File: mcts.py
+# Project: 2023 Spring Semester SOS Project
+# Programmer: Ian Rowse <imrnnc@umsystem.edu>
+
+"""Monte Carlo tree search (UCT) computer player.
+
+Each iteration walks down the tree picking children by their UCT score,
+adds one new child, plays the rest of the game out at random (always taking
+an SOS when there is one) and credits every node on the way down with how
+well the player who moved into it did. The board is searched in place with
+push_move and pop_move.
+
+With progressive widening a node only gets as many children as
+widening * visits ** 0.5, best looking moves first, which keeps the 2 x empty
+cells branching factor of large boards in check.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import math
+import random
+import time
+
+try:
+    import board
+except ImportError: # imported as part of the src package, e.g. by the tests
+    from src import board
+
+
+class Node:
+    """One position in the search tree, reached by move from its parent."""
+
+    __slots__ = ("move", "parent", "player", "children", "untried", "visits", "reward")
+
+    def __init__(self,
+                 move: tuple,
+                 parent: "Node",
+                 player: int,
+                 untried: list[tuple]) -> None:
+
+        self.move = move        # (pos, mark), None for the root
+        self.parent = parent
+        self.player = player    # who made move
+        self.children = []
+        self.untried = untried  # moves not expanded yet, best looking last
+        self.visits = 0
+        self.reward = 0.0       # summed over visits, from player's view
+
+    def uct_child(self, exploration: float) -> "Node":
+        log_visits = math.log(self.visits)
+        return max(self.children,
+                   key=lambda child: (child.reward / child.visits +
+                                      exploration * math.sqrt(log_visits / child.visits)))
+
+    def find_child(self, move: tuple) -> "Node":
+        for child in self.children:
+            if child.move == move:
+                return child
+        return None
+
+
+class MCTSPlayer:
+    """Picks moves with UCT, keeping its tree between turns when it can.
+
+    With more than one worker, the process pool is started on the first move
+    and reused until close().
+    """
+
+    def __init__(self,
+                 playouts: int = None,
+                 time_limit: float = None,
+                 exploration: float = 1.4,
+                 widening: float = None,
+                 workers: int = 1,
+                 seed: int = None) -> None:
+
+        if playouts is None and time_limit is None:
+            playouts = 1000
+        elif playouts is not None and playouts < 1:
+            raise ValueError("playouts must be at least 1")
+
+        self.playouts = playouts
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.widening = widening
+        self.workers = workers
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+        self.root = None
+        self.root_history = []
+        self.executor = None
+
+    def __enter__(self) -> "MCTSPlayer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def untried_moves(self, test_board: board.Board) -> list[tuple]:
+        if test_board.end:
+            return []
+        moves = list(test_board.legal_moves())
+        self.rng.shuffle(moves)
+        moves.sort(key=lambda move: test_board.get_gain(*move))
+        return moves
+
+    def can_expand(self, node: Node) -> bool:
+        if not node.untried:
+            return False
+        elif self.widening is None:
+            return True
+        else:
+            return len(node.children) < max(1, self.widening * math.sqrt(node.visits))
+
+    def rollout(self, test_board: board.Board) -> int:
+        """Plays the game out, returning how many moves it pushed."""
+        pushed = 0
+        while not test_board.end and test_board.empty_cells:
+            if test_board.scoring_cells:
+                idx = self.rng.choice(tuple(test_board.scoring_cells))
+                if test_board.s_gain[idx] >= test_board.o_gain[idx]:
+                    mark = board.Mark.S
+                else:
+                    mark = board.Mark.O
+            else:
+                idx = self.rng.choice(test_board.empty_cells)
+                mark = self.rng.choice((board.Mark.S, board.Mark.O))
+
+            test_board.push_move(test_board.positions[idx], mark)
+            pushed += 1
+        return pushed
+
+    def iterate(self, test_board: board.Board, root: Node) -> None:
+        node = root
+        pushed = 0
+
+        while not self.can_expand(node) and node.children:
+            node = node.uct_child(self.exploration)
+            test_board.push_move(*node.move)
+            pushed += 1
+
+        if self.can_expand(node):
+            move = node.untried.pop()
+            player = test_board.turn
+            test_board.push_move(*move)
+            pushed += 1
+            child = Node(move, node, player, self.untried_moves(test_board))
+            node.children.append(child)
+            node = child
+
+        pushed += self.rollout(test_board)
+
+        victors = test_board.victors()
+        rewards = [1 / len(victors) if player in victors else 0.0
+                   for player in test_board.players]
+
+        for _ in range(pushed):
+            test_board.pop_move()
+
+        while node is not None:
+            node.visits += 1
+            node.reward += rewards[node.player]
+            node = node.parent
+
+    def reuse_root(self, test_board: board.Board) -> Node:
+        """The node for the board's position in the last tree, if it has one."""
+        history = [(move.pos, move.mark) for move in test_board.move_hist]
+        node = self.root
+
+        if node is None or history[:len(self.root_history)] != self.root_history:
+            return None
+
+        for move in history[len(self.root_history):]:
+            node = node.find_child(move)
+            if node is None:
+                return None
+
+        node.parent = None
+        return node
+
+    def search(self, test_board: board.Board) -> Node:
+        root = self.reuse_root(test_board)
+        if root is None:
+            root = Node(None, None, test_board.turn, self.untried_moves(test_board))
+
+        deadline = None
+        if self.time_limit is not None:
+            deadline = time.perf_counter() + self.time_limit
+
+        # always at least one, so the root has a child to choose
+        self.iterate(test_board, root)
+        iterations = 1
+        while ((self.playouts is None or iterations < self.playouts) and
+               (deadline is None or time.perf_counter() < deadline)):
+            self.iterate(test_board, root)
+            iterations += 1
+
+        return root
+
+    def root_statistics(self, test_board: board.Board) -> dict[tuple, tuple[int, float]]:
+        """Searches from scratch, returning {move: (visits, reward)} at the root."""
+        self.root = None
+        root = self.search(test_board)
+        return {child.move: (child.visits, child.reward) for child in root.children}
+
+    def choose_move(self, test_board: board.Board) -> board.Move:
+        if test_board.end or not test_board.empty_cells:
+            return None
+
+        if self.workers > 1:
+            return self.choose_parallel(test_board)
+
+        root = self.search(test_board)
+        best = max(root.children, key=lambda child: child.visits)
+
+        self.root = best
+        self.root_history = ([(move.pos, move.mark) for move in test_board.move_hist] +
+                             [best.move])
+        return board.Move(best.move[0], best.move[1], test_board.get_gain(*best.move))
+
+    def choose_parallel(self, test_board: board.Board) -> board.Move:
+        """Root parallel search: independent trees whose root visits are summed."""
+        base_seed = self.rng.getrandbits(32)
+        players = [MCTSPlayer(self.playouts,
+                              self.time_limit,
+                              self.exploration,
+                              self.widening,
+                              1,
+                              base_seed + worker)
+                   for worker in range(self.workers)]
+
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.workers)
+        results = list(self.executor.map(root_statistics,
+                                         players,
+                                         [test_board.pack_state()] * self.workers))
+
+        totals = {}
+        for result in results:
+            for move, (visits, reward) in result.items():
+                old_visits, old_reward = totals.get(move, (0, 0.0))
+                totals[move] = (old_visits + visits, old_reward + reward)
+
+        # ties go to the earliest legal move, so a seeded search is repeatable
+        order = {move: idx for idx, move in enumerate(test_board.legal_moves())}
+        best = max(totals, key=lambda move: (totals[move][0], -order[move]))
+
+        self.root = None
+        return board.Move(best[0], best[1], test_board.get_gain(*best))
+
+
+def root_statistics(player: MCTSPlayer, state: bytes) -> dict[tuple, tuple[int, float]]:
+    """Root parallel worker, given the position as Board.pack_state() bytes."""
+    return player.root_statistics(board.Board.unpack_state(state))
@@ -0,0 +1,126 @@
+# File: parallel.py
+# Project: 2023 Spring Semester SOS Project
+# Programmer: Ian Rowse <imrnnc@umsystem.edu>
+
+"""Alpha-beta search with the root moves spread over a process pool.
+
+Workers get the position as Board.pack_state() bytes and their share of the
+root moves as (cell, mark value) pairs, and send back exact scores for every
+move that ties their best. Merging only looks at those scores and the root
+move order, so the answer never depends on which worker finished first.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+import random
+
+try:
+    import board
+    import search
+except ImportError: # imported as part of the src package, e.g. by the tests
+    from src import board
+    from src import search
+
+
+def search_moves(state: bytes,
+                 moves: list[tuple[int, int, int]],
+                 depth: int) -> list[tuple[int, int]]:
+    """Scores (order, cell, mark value) root moves, returning (order, score).
+
+    Each move is searched with a window that only just excludes the best
+    score found so far, so every move that ties the best gets an exact score.
+    Weaker moves are left out.
+    """
+    test_board = board.Board.unpack_state(state)
+    searcher = search.Searcher(max_depth=depth)
+
+    scores = []
+    best = -search.INFINITY
+    for order, cell, mark in moves:
+        pos = test_board.positions[cell]
+        mark = board.Mark(mark)
+        move = (test_board.get_gain(pos, mark), pos, mark)
+
+        value = searcher.child_value(test_board, move, depth, best - 1, search.INFINITY)
+        if value >= best:
+            best = value
+            scores.append((order, value))
+
+    return [(order, value) for order, value in scores if value == best]
+
+
+class ParallelSearcher:
+    """Fixed depth root parallel search, reusing one process pool.
+
+    With a seed, ties between equally good root moves are broken with that
+    seed; without one, the first of them in move order is played. With one
+    worker the moves are searched in this process and no pool is started,
+    for agents that are already running in some other pool's worker.
+    """
+
+    def __init__(self,
+                 depth: int = 2,
+                 workers: int = None,
+                 seed: int = None) -> None:
+
+        if depth < 1:
+            raise ValueError("search depth must be at least 1")
+        elif workers is not None and workers < 1:
+            raise ValueError("workers must be at least 1")
+
+        self.depth = depth
+        self.workers = os.cpu_count() if workers is None else workers
+        self.seed = seed
+        self.executor = None
+
+    def __enter__(self) -> "ParallelSearcher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def search(self, test_board: board.Board) -> search.SearchResult:
+        if test_board.end or not test_board.empty_cells:
+            return search.SearchResult(None, 0, 0, 0)
+
+        root = search.Searcher().ordered_moves(test_board)
+        width = test_board.size[0]
+        moves = [(order, pos[1] * width + pos[0], mark.value)
+                 for order, (gain, pos, mark) in enumerate(root)]
+
+        # dealt out round robin, so every worker gets some of the likely best
+        chunks = [moves[start::self.workers * 2] for start in range(self.workers * 2)]
+        chunks = [chunk for chunk in chunks if chunk]
+
+        if self.workers == 1:
+            mapper = map
+        else:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(self.workers)
+            mapper = self.executor.map
+
+        state = test_board.pack_state()
+        results = mapper(search_moves,
+                         [state] * len(chunks),
+                         chunks,
+                         [self.depth] * len(chunks))
+
+        scores = sorted(score for result in results for score in result)
+        best = max(value for order, value in scores)
+        ties = [order for order, value in scores if value == best]
+
+        if self.seed is None:
+            order = ties[0]
+        else:
+            order = random.Random(f"{self.seed} {test_board.zobrist}").choice(ties)
+
+        gain, pos, mark = root[order]
+        return search.SearchResult(board.Move(pos, mark, gain), best, self.depth, 0)
+
+    def choose_move(self, test_board: board.Board) -> board.Move:
+        return self.search(test_board).move
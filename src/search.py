@@ -0,0 +1,312 @@
+# File: search.py
+# Project: 2023 Spring Semester SOS Project
+# Programmer: Ian Rowse <imrnnc@umsystem.edu>
+
+"""Negamax search with alpha-beta pruning and iterative deepening.
+
+Turns always alternate in SOS, so every position is scored from the point of
+view of the player about to move. In general mode a position is worth the most
+points that player can gain over their opponents from here on. In simple mode
+the first SOS wins, so a position is worth WIN, -WIN or 0 for a draw. With
+more than two players every opponent is treated as one.
+"""
+
+from collections.abc import Sequence
+import random
+import time
+from typing import NamedTuple
+
+try:
+    import board
+except ImportError: # imported as part of the src package, e.g. by the tests
+    from src import board
+
+WIN = 1000
+INFINITY = 1000000
+
+# Positions are keyed on the grid alone, since the value of a position for the
+# player to move does not depend on who that is or on the points so far.
+GENERAL_KEY = random.Random("general mode").getrandbits(64)
+
+EXACT = 0
+LOWER = 1 # the value is at least this
+UPPER = 2 # the value is at most this
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when its time or node budget runs out."""
+
+
+class SearchResult(NamedTuple):
+    move: board.Move
+    score: int
+    depth: int
+    nodes: int
+
+
+class TranspositionTable:
+    """Fixed size two-tier table of (key, depth, value, flag, best) entries.
+
+    Each slot has a depth-preferred tier, which keeps whichever entry was
+    searched deepest, and an always-replace tier, which keeps the newest
+    entry pushed out or passed over by the first.
+    """
+
+    def __init__(self, size: int = 1 << 18) -> None:
+        if size <= 0 or size & (size - 1):
+            raise ValueError("table size must be a positive power of two")
+
+        self.size = size
+        self.mask = size - 1
+        self.clear()
+
+    def __len__(self) -> int:
+        return (sum(entry is not None for entry in self.deep) +
+                sum(entry is not None for entry in self.recent))
+
+    def clear(self) -> None:
+        self.deep   = [None] * self.size
+        self.recent = [None] * self.size
+
+        self.probes = 0
+        self.hits = 0
+        self.collisions = 0
+        self.stores = 0
+
+    def probe(self, key: int) -> tuple:
+        self.probes += 1
+        slot = key & self.mask
+
+        deep = self.deep[slot]
+        if deep is not None and deep[0] == key:
+            self.hits += 1
+            return deep
+
+        recent = self.recent[slot]
+        if recent is not None and recent[0] == key:
+            self.hits += 1
+            return recent
+
+        if deep is not None or recent is not None:
+            self.collisions += 1
+        return None
+
+    def store(self,
+              key: int,
+              depth: int,
+              value: int,
+              flag: int,
+              best: tuple) -> None:
+
+        self.stores += 1
+        slot = key & self.mask
+        entry = (key, depth, value, flag, best)
+
+        deep = self.deep[slot]
+        if deep is None or deep[0] == key or depth >= deep[1]:
+            if deep is not None and deep[0] != key:
+                self.recent[slot] = deep
+            self.deep[slot] = entry
+        else:
+            self.recent[slot] = entry
+
+    def stats(self) -> dict:
+        return {"probes"     : self.probes,
+                "hits"       : self.hits,
+                "collisions" : self.collisions,
+                "stores"     : self.stores}
+
+
+class Searcher:
+    """Searches deeper and deeper until it runs out of depth, time or nodes.
+
+    The best move of the deepest fully searched depth is returned, so a
+    search cut short by its budget still gives a sound answer. Depth 1 always
+    runs to completion. The transposition table is kept between searches,
+    pass table_size=0 to search without one.
+    """
+
+    def __init__(self,
+                 max_depth: int = None,
+                 time_limit: float = None,
+                 node_limit: int = None,
+                 table_size: int = 1 << 18) -> None:
+
+        if max_depth is not None and max_depth < 1:
+            raise ValueError("search depth must be at least 1")
+
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.table = TranspositionTable(table_size) if table_size else None
+
+        self.nodes = 0
+        self.deadline = None
+        self.completed_depth = 0
+
+    def check_budget(self) -> None:
+        if self.completed_depth == 0:
+            return
+        elif self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchTimeout()
+        elif self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+
+    def ordered_moves(self,
+                      test_board: board.Board,
+                      first: Sequence = None) -> list[tuple]:
+        """Lists (gain, pos, mark) for every legal move, best guesses first."""
+        moves = []
+        for pos, mark in test_board.legal_moves():
+            moves.append((test_board.get_gain(pos, mark), pos, mark))
+
+        moves.sort(key=lambda move: move[0], reverse=True)
+
+        if first is not None:
+            for idx, move in enumerate(moves):
+                if move[1:] == first:
+                    moves.insert(0, moves.pop(idx))
+                    break
+
+        return moves
+
+    def child_value(self,
+                    test_board: board.Board,
+                    move: tuple,
+                    depth: int,
+                    alpha: int,
+                    beta: int) -> int:
+        """Scores one move for the player making it."""
+        gain, pos, mark = move
+
+        if test_board.game_mode == "simple":
+            if gain > 0:
+                return WIN
+            gain = 0
+
+        test_board.push_move(pos, mark)
+        try:
+            return gain - self.negamax(test_board, depth - 1, gain - beta, gain - alpha)
+        finally:
+            test_board.pop_move()
+
+    def negamax(self,
+                test_board: board.Board,
+                depth: int,
+                alpha: int,
+                beta: int) -> int:
+
+        self.nodes += 1
+        if self.nodes & 1023 == 0:
+            self.check_budget()
+
+        if depth == 0 or test_board.end:
+            return 0
+        elif test_board.game_mode == "simple" and test_board.scoring_cells:
+            return WIN
+
+        key, first = None, None
+        if self.table is not None:
+            key = self.table_key(test_board)
+            entry = self.table.probe(key)
+            if entry is not None:
+                _, entry_depth, value, flag, first = entry
+                if entry_depth >= depth:
+                    if (flag == EXACT or
+                        (flag == LOWER and value >= beta) or
+                        (flag == UPPER and value <= alpha)):
+                        return value
+
+        moves = self.ordered_moves(test_board, first)
+        if not moves:
+            return 0
+
+        alpha_orig = alpha
+        best, best_move = -INFINITY, None
+        for move in moves:
+            value = self.child_value(test_board, move, depth, alpha, beta)
+            if value > best:
+                best, best_move = value, move
+                if best > alpha:
+                    alpha = best
+                    if alpha >= beta:
+                        break
+
+        if key is not None:
+            if best <= alpha_orig:
+                flag = UPPER
+            elif best >= beta:
+                flag = LOWER
+            else:
+                flag = EXACT
+            self.table.store(key, depth, best, flag, best_move[1:])
+
+        return best
+
+    def table_key(self, test_board: board.Board) -> int:
+        if test_board.game_mode == "general":
+            return test_board.zobrist ^ GENERAL_KEY
+        else:
+            return test_board.zobrist
+
+    def search_root(self,
+                    test_board: board.Board,
+                    depth: int,
+                    first: Sequence = None) -> tuple[int, tuple]:
+
+        self.nodes += 1
+        best, best_move = -INFINITY, None
+        for move in self.ordered_moves(test_board, first):
+            value = self.child_value(test_board, move, depth, best, INFINITY)
+            if value > best:
+                best, best_move = value, move
+        return best, best_move
+
+    def search(self, test_board: board.Board) -> SearchResult:
+        """Finds the best move for the player whose turn it is.
+
+        The board is searched in place and is left exactly as it was found.
+        Returns a SearchResult whose move is None if the game is over.
+        """
+        self.nodes = 0
+        self.completed_depth = 0
+        if self.time_limit is None:
+            self.deadline = None
+        else:
+            self.deadline = time.perf_counter() + self.time_limit
+
+        empties = len(test_board.marks) - test_board.mark_count
+        if test_board.end or empties == 0:
+            return SearchResult(None, 0, 0, 0)
+
+        max_depth = empties
+        if self.max_depth is not None:
+            max_depth = min(max_depth, self.max_depth)
+
+        score, best_move = 0, None
+        for depth in range(1, max_depth + 1):
+            try:
+                first = None if best_move is None else best_move[1:]
+                score, best_move = self.search_root(test_board, depth, first)
+            except SearchTimeout:
+                break
+            self.completed_depth = depth
+            if abs(score) >= WIN:
+                break
+
+        gain, pos, mark = best_move
+        return SearchResult(board.Move(pos, mark, gain),
+                            score,
+                            self.completed_depth,
+                            self.nodes)
+
+    def choose_move(self, test_board: board.Board) -> board.Move:
+        return self.search(test_board).move
+
+
+def get_best_move(test_board: board.Board,
+                  max_depth: int = None,
+                  time_limit: float = None,
+                  node_limit: int = None) -> board.Move:
+    """Shorthand for a one-off search with the given budget."""
+    return Searcher(max_depth, time_limit, node_limit).search(test_board).move
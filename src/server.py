@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+
+# File: server.py
+# Project: 2023 Spring Semester SOS Project
+# Programmer: Ian Rowse <imrnnc@umsystem.edu>
+
+"""Asyncio TCP server hosting many SOS games at once.
+
+Clients send one JSON object per line, each with an "op" and optionally an
+"id", which the reply echoes back:
+
+    {"op": "new", "size": [8, 8], "mode": "general",
+     "players": [{"name": "Ann"}, {"name": "Bot", "computer": true}]}
+    {"op": "subscribe", "session": 3}      also sends a full "state" event
+    {"op": "unsubscribe", "session": 3}
+    {"op": "move", "session": 3, "pos": [4, 2], "mark": "S"}
+    {"op": "undo", "session": 3}
+    {"op": "state", "session": 3}
+
+Replies are {"id": ..., "ok": true, ...} or {"id": ..., "error": "..."}.
+Making a game subscribes the client to it, and subscribers are sent a "move"
+or "undo" event with only what changed whenever anyone plays. Events caused
+by a request are sent before its reply, and every event carries the
+session's seq, which goes up by one per change, so a gap means a missed
+event and a "state" request catches up.
+
+Computer players move in an executor, a process pool by default, so a long
+search never holds up the event loop. A game is thought about by at most
+one job at a time, and a move that comes back for a position that has since
+changed is thrown away. If a job fails, subscribers are sent an "error"
+event and the computer's seat is left to the clients. Every client has a
+bounded queue of outgoing lines: a client stops being read while its own
+queue is half full, and a client whose queue fills with other players'
+events is disconnected.
+"""
+
+import argparse
+import asyncio
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+import itertools
+import json
+
+try:
+    import ai
+    import board
+except ImportError: # imported as part of the src package, e.g. by the tests
+    from src import ai
+    from src import board
+
+MAX_LINE        = 1 << 16    # longest request, in bytes
+MAX_SESSIONS    = 10000
+MAX_SUBSCRIBERS = 64         # per session
+MAX_CELLS       = 100 * 100  # per board
+MAX_PLAYERS     = 16         # per board, at most 255 (see Board.pack_state)
+QUEUE_SIZE      = 256        # outgoing lines per client
+
+MARK_NAMES = {"S": board.Mark.S, "O": board.Mark.O}
+
+
+class RequestError(Exception):
+    """A request that cannot be carried out, sent back as its error reply."""
+
+
+def computer_move(state: bytes, strategy: str) -> tuple[int, int]:
+    """Picks the move for Board.pack_state() state, as (cell, mark value)."""
+    test_board = board.Board.unpack_state(state)
+    agent = ai.make_worker_agent(strategy)
+    try:
+        move = agent.choose_move(test_board)
+    finally:
+        ai.close_agent(agent)
+    return move.pos[1] * test_board.size[0] + move.pos[0], move.mark.value
+
+
+def sos_lines(sos_list: list[board.SOS]) -> list[list[int]]:
+    return [[*sos.p1, *sos.p2, sos.player_id] for sos in sos_list]
+
+
+class Session:
+    """One hosted game and the clients watching it."""
+
+    def __init__(self, session_id: int, test_board: board.Board) -> None:
+        self.id = session_id
+        self.board = test_board
+        self.seq = 0
+        self.subscribers = set()
+        self.thinking = None # the computer move task, if one is running
+
+    def state(self) -> dict:
+        test_board = self.board
+        return {"event"   : "state",
+                "session" : self.id,
+                "seq"     : self.seq,
+                "size"    : list(test_board.size),
+                "mode"    : test_board.game_mode,
+                "marks"   : "".join(" SO"[value - board.EMPTY] for value in test_board.marks),
+                "players" : [{"name"     : player.name,
+                              "hue"      : player.hue,
+                              "computer" : player.computer,
+                              "strategy" : player.strategy,
+                              "score"    : player.score}
+                             for player in test_board.players],
+                "sos"     : sos_lines(test_board.sos_list),
+                "turn"    : test_board.turn,
+                "end"     : test_board.end}
+
+    def delta(self, event: str, move: board.Move, sos_list: list[board.SOS]) -> dict:
+        test_board = self.board
+        return {"event"   : event,
+                "session" : self.id,
+                "seq"     : self.seq,
+                "pos"     : list(move.pos),
+                "mark"    : move.mark.name,
+                "player"  : move.player,
+                "sos"     : sos_lines(sos_list),
+                "scores"  : [player.score for player in test_board.players],
+                "turn"    : test_board.turn,
+                "end"     : test_board.end}
+
+
+class Connection:
+    """One client's stream and its queue of lines waiting to be sent."""
+
+    def __init__(self,
+                 reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter,
+                 queue_size: int) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.queue = asyncio.Queue(queue_size)
+        self.sessions = set()
+        self.closed = False
+
+    def send(self, message: dict) -> None:
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(json.dumps(message).encode() + b"\n")
+        except asyncio.QueueFull: # too far behind to catch up
+            self.close()
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.writer.close()
+
+    # Runs until it is sent None or the connection closes, and then marks
+    # whatever is left as done, so nothing waits on the queue forever
+    async def write_lines(self) -> None:
+        try:
+            while True:
+                line = await self.queue.get()
+                try:
+                    if line is None or self.closed:
+                        break
+                    self.writer.write(line)
+                    await self.writer.drain()
+                finally:
+                    self.queue.task_done()
+        except ConnectionError:
+            pass
+        finally:
+            self.close()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                self.queue.task_done()
+
+
+class GameServer:
+    """Hosts sessions for any number of clients on one event loop."""
+
+    def __init__(self,
+                 executor: Executor = None,
+                 max_sessions: int = MAX_SESSIONS,
+                 max_subscribers: int = MAX_SUBSCRIBERS,
+                 max_cells: int = MAX_CELLS,
+                 max_players: int = MAX_PLAYERS,
+                 queue_size: int = QUEUE_SIZE) -> None:
+        if not 1 <= max_players <= 255:
+            raise ValueError("max_players must be from 1 to 255")
+
+        self.executor = executor
+        self.own_executor = executor is None
+        self.max_sessions = max_sessions
+        self.max_subscribers = max_subscribers
+        self.max_cells = max_cells
+        self.max_players = max_players
+        self.queue_size = queue_size
+
+        self.sessions = {}
+        self.session_ids = itertools.count(1)
+        self.server = None
+        self.connections = {} # every open connection and the task handling it
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> asyncio.Server:
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor()
+        self.server = await asyncio.start_server(self.handle, host, port, limit=MAX_LINE)
+        return self.server
+
+    @property
+    def port(self) -> int:
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        for session in list(self.sessions.values()):
+            self.end_session(session)
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for connection in list(self.connections):
+            connection.close()
+        await asyncio.gather(*self.connections.values())
+        if self.own_executor and self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    async def handle(self,
+                     reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        connection = Connection(reader, writer, self.queue_size)
+        writing = asyncio.create_task(connection.write_lines())
+        self.connections[connection] = asyncio.current_task()
+        try:
+            while not connection.closed:
+                # stop reading a client until it takes in what it asked for
+                if connection.queue.qsize() * 2 >= self.queue_size:
+                    await connection.queue.join()
+
+                try:
+                    line = await reader.readline()
+                except ValueError: # longer than MAX_LINE
+                    connection.send({"error": "request too long"})
+                    break
+                if not line:
+                    break
+
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError()
+                except ValueError:
+                    connection.send({"error": "requests must be JSON objects"})
+                    continue
+
+                connection.send(self.dispatch(connection, request))
+        except ConnectionError:
+            pass
+        finally:
+            for session_id in list(connection.sessions):
+                self.unsubscribe(connection, self.sessions[session_id])
+            try:
+                connection.queue.put_nowait(None) # send what is queued, then stop
+                await writing
+            except asyncio.QueueFull:
+                writing.cancel()
+            connection.close()
+            del self.connections[connection]
+
+    def dispatch(self, connection: Connection, request: dict) -> dict:
+        handlers = {"new"         : self.op_new,
+                    "subscribe"   : self.op_subscribe,
+                    "unsubscribe" : self.op_unsubscribe,
+                    "move"        : self.op_move,
+                    "undo"        : self.op_undo,
+                    "state"       : self.op_state}
+
+        reply = {"id": request.get("id")}
+        try:
+            handler = handlers.get(request.get("op"))
+            if handler is None:
+                raise RequestError(f"unknown op {request.get('op')!r}")
+            reply.update(handler(connection, request) or {})
+            reply["ok"] = True
+        except RequestError as error:
+            reply["error"] = str(error)
+        except (AttributeError, KeyError, OverflowError, TypeError, ValueError) as error:
+            reply["error"] = f"bad request: {error!r}"
+        return reply
+
+    def session(self, connection: Connection, request: dict) -> Session:
+        """The request's session, which the connection must be watching."""
+        session = self.sessions.get(request["session"])
+        if session is None:
+            raise RequestError(f"no session {request['session']!r}")
+        elif session.id not in connection.sessions:
+            raise RequestError(f"not subscribed to session {session.id}")
+        return session
+
+    def op_new(self, connection: Connection, request: dict) -> dict:
+        if len(self.sessions) >= self.max_sessions:
+            raise RequestError("too many sessions")
+
+        size = [int(side) for side in request.get("size", [8, 8])]
+        if len(size) != 2 or size[0] * size[1] > self.max_cells:
+            raise RequestError(f"boards may have at most {self.max_cells} cells")
+
+        requested = request.get("players", [{}, {}])
+        if not isinstance(requested, list) or not 1 <= len(requested) <= self.max_players:
+            raise RequestError(f"games must have from 1 to {self.max_players} players")
+
+        players = []
+        for idx, player in enumerate(requested):
+            if not isinstance(player, dict):
+                raise RequestError("players must be JSON objects")
+            strategy = player.get("strategy", "search")
+            if strategy not in ai.STRATEGIES:
+                raise RequestError(f"unknown strategy {strategy!r}")
+            players.append(board.Player(str(player.get("name", f"Player {idx + 1}")),
+                                        int(player.get("hue", (idx * 240) % 360)),
+                                        bool(player.get("computer", False)),
+                                        strategy))
+
+        test_board = board.Board(size, players)
+        game_mode = request.get("mode", "simple")
+        if game_mode not in board.GAME_MODES:
+            raise RequestError(f"game mode {game_mode!r} does not exist")
+        test_board.game_mode = game_mode
+
+        session = Session(next(self.session_ids), test_board)
+        self.sessions[session.id] = session
+        self.subscribe(connection, session)
+        self.think(session)
+        return {"session": session.id}
+
+    def op_subscribe(self, connection: Connection, request: dict) -> None:
+        session = self.sessions.get(request["session"])
+        if session is None:
+            raise RequestError(f"no session {request['session']!r}")
+        self.subscribe(connection, session)
+
+    def op_unsubscribe(self, connection: Connection, request: dict) -> None:
+        self.unsubscribe(connection, self.session(connection, request))
+
+    def op_move(self, connection: Connection, request: dict) -> None:
+        session = self.session(connection, request)
+        test_board = session.board
+        if test_board.get_player().computer:
+            raise RequestError("waiting for a computer player")
+
+        pos = tuple(int(coord) for coord in request["pos"])
+        mark = MARK_NAMES.get(request["mark"])
+        if mark is None:
+            raise RequestError("mark must be \"S\" or \"O\"")
+        elif len(pos) != 2 or not test_board.in_bounds(pos):
+            raise RequestError(f"{list(pos)} is off the board")
+        self.play(session, pos, mark)
+
+    def op_undo(self, connection: Connection, request: dict) -> None:
+        session = self.session(connection, request)
+        if not session.board.move_hist:
+            raise RequestError("nothing to undo")
+
+        test_board = session.board
+        move = test_board.move_hist[-1]
+        undone = test_board.sos_list[len(test_board.sos_list) - move.sos_count:]
+        test_board.undo_move()
+        self.changed(session, session.delta("undo", move, undone))
+
+    def op_state(self, connection: Connection, request: dict) -> None:
+        connection.send(self.session(connection, request).state())
+
+    def subscribe(self, connection: Connection, session: Session) -> None:
+        if connection not in session.subscribers:
+            if len(session.subscribers) >= self.max_subscribers:
+                raise RequestError(f"session {session.id} is full")
+            session.subscribers.add(connection)
+            connection.sessions.add(session.id)
+        connection.send(session.state())
+
+    def unsubscribe(self, connection: Connection, session: Session) -> None:
+        session.subscribers.discard(connection)
+        connection.sessions.discard(session.id)
+        if not session.subscribers:
+            self.end_session(session)
+
+    def end_session(self, session: Session) -> None:
+        if session.thinking is not None:
+            session.thinking.cancel()
+        for connection in session.subscribers:
+            connection.sessions.discard(session.id)
+        self.sessions.pop(session.id, None)
+
+    def play(self, session: Session, pos: tuple[int, int], mark: board.Mark) -> None:
+        test_board = session.board
+        if not test_board.make_move(pos, mark):
+            raise RequestError(f"{list(pos)} is not an open cell")
+
+        move = test_board.move_hist[-1]
+        made = test_board.sos_list[len(test_board.sos_list) - move.sos_count:]
+        self.changed(session, session.delta("move", move, made))
+
+    def changed(self, session: Session, delta: dict) -> None:
+        session.seq += 1
+        delta["seq"] = session.seq
+        for connection in list(session.subscribers):
+            connection.send(delta)
+            if connection.closed:
+                self.unsubscribe(connection, session)
+        if session.id in self.sessions:
+            self.think(session)
+
+    def think(self, session: Session) -> None:
+        """Starts the computer's move if it is a computer's turn."""
+        test_board = session.board
+        if (session.thinking is None and not test_board.end and
+            test_board.get_player().computer):
+            session.thinking = asyncio.get_running_loop().create_task(
+                self.computer_turn(session))
+
+    async def computer_turn(self, session: Session) -> None:
+        test_board = session.board
+        seq = session.seq
+        try:
+            cell, mark = await asyncio.get_running_loop().run_in_executor(
+                self.executor, computer_move, test_board.pack_state(),
+                test_board.get_player().strategy)
+        except asyncio.CancelledError:
+            raise
+        except Exception as error: # a crashed job, or a broken pool
+            self.computer_failed(session, error)
+            return
+        finally:
+            session.thinking = None
+
+        if session.id not in self.sessions:
+            return
+        elif session.seq == seq:
+            self.play(session, test_board.positions[cell], board.Mark(mark))
+        else: # the game changed while the computer was thinking
+            self.think(session)
+
+    def computer_failed(self, session: Session, error: Exception) -> None:
+        """Tells the session's clients the computer cannot move, and hands
+        its seat to them, so the game does not stall waiting on it."""
+        player = session.board.get_player()
+        player.computer = False
+        for connection in list(session.subscribers):
+            connection.send({"event"   : "error",
+                             "session" : session.id,
+                             "error"   : f"computer player {player.name} failed: {error!r}"})
+
+
+class Client:
+    """Minimal client, mostly for tests: replies are returned, events queued."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.events = deque()
+        self.request_ids = itertools.count(1)
+
+    @classmethod
+    async def connect(cls, host: str, port: int) -> "Client":
+        return cls(*await asyncio.open_connection(host, port, limit=MAX_LINE))
+
+    async def close(self) -> None:
+        self.writer.close()
+        await self.writer.wait_closed()
+
+    async def read(self) -> dict:
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("server closed the connection")
+        return json.loads(line)
+
+    async def request(self, op: str, **fields) -> dict:
+        request_id = next(self.request_ids)
+        self.writer.write(json.dumps({"op": op, "id": request_id, **fields}).encode() + b"\n")
+        await self.writer.drain()
+
+        while True:
+            message = await self.read()
+            if "event" in message:
+                self.events.append(message)
+            elif message.get("id") == request_id:
+                return message
+
+    async def event(self) -> dict:
+        if self.events:
+            return self.events.popleft()
+        return await self.read()
+
+
+async def serve(host: str, port: int, workers: int = None) -> None:
+    game_server = GameServer(ProcessPoolExecutor(workers))
+    server = await game_server.start(host, port)
+    print(f"serving SOS on {host}:{game_server.port}")
+    try:
+        await server.serve_forever()
+    finally:
+        await game_server.close()
+        game_server.executor.shutdown(cancel_futures=True)
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Host SOS games over TCP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7777)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes for computer moves, default one per CPU")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+
+# File: tablebase.py
+# Project: 2023 Spring Semester SOS Project
+# Programmer: Ian Rowse <imrnnc@umsystem.edu>
+
+"""Solved tables of every position on the smallest boards, for perfect play.
+
+A table holds the exact value of every grid of one board size and game mode,
+from the point of view of the player to move. In general mode that is the
+most points the player can gain over their opponents from here on, as
+search.py scores it. In simple mode it is 1, -1 or 0 for a win, loss or
+draw, where search.py uses WIN, -WIN and 0. Grids
+are ranked in base 3, each cell being a digit of 0 for empty, 1 for S or 2
+for O with cell 0 the least significant, so a value is one read at
+header + rank. Files are
+
+    4 bytes  magic b"SOST"
+    4 bytes  version, width, height, game mode index
+    3**cells signed bytes, one value per rank
+
+Tables are solved offline, layer by layer from the full grid back to the
+empty one, which needs NumPy, and written to the project's tablebases
+directory:
+
+    python src/tablebase.py 3 4 --modes simple general
+
+and memory mapped at play time, so looking a value up reads one byte. Every
+grid is stored, reachable or not, so a table is 3**cells bytes: 19 KB for
+3x3, 43 MB for 4x4. That caps tables at MAX_CELLS cells; 5x5 would need 847
+GB.
+"""
+
+import argparse
+import mmap
+import os
+import random
+import struct
+
+try:
+    import board
+    import search
+except ImportError: # imported as part of the src package, e.g. by the tests
+    from src import board
+    from src import search
+
+TABLE_MAGIC   = b"SOST"
+TABLE_VERSION = 1
+TABLE_HEADER  = struct.Struct("<4sBBBB") # magic, version, width, height, mode
+
+MAX_CELLS = 16
+
+# the project's tablebases directory, wherever the game was started from
+TABLEBASE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              "tablebases")
+
+
+def table_path(directory: str, size: tuple[int, int], game_mode: str) -> str:
+    return os.path.join(directory, f"{size[0]}x{size[1]}-{game_mode}.sost")
+
+
+def rank_powers(size: tuple[int, int]) -> tuple[int]:
+    """The rank each cell adds per digit, 3**cell."""
+    return tuple(3 ** cell for cell in range(size[0] * size[1]))
+
+
+def solve(size: tuple[int, int], game_mode: str):
+    """Every grid's value, as an int8 NumPy array indexed by rank.
+
+    Marking a cell only ever adds to a grid's rank, and every grid with k
+    marks only leads to grids with k + 1, so solving the grids in layers of
+    their mark count, fullest first, always finds the children solved.
+    Each layer is solved for all of its grids at once.
+    """
+    import numpy as np
+
+    width, height = size
+    cells = width * height
+    if cells > MAX_CELLS:
+        raise ValueError(f"a {width}x{height} table would need 3**{cells} bytes")
+    elif game_mode not in board.GAME_MODES:
+        raise ValueError(f"game mode {game_mode} does not exist")
+
+    lines = board.line_tables(size)
+    powers = rank_powers(size)
+    simple = game_mode == "simple"
+
+    # how many cells each rank has marked, built up a cell at a time
+    marked = np.zeros(1, dtype=np.uint8)
+    for _ in range(cells):
+        marked = np.concatenate((marked, marked + 1, marked + 1))
+
+    values = np.zeros(3 ** cells, dtype=np.int8)
+    for layer in range(cells - 1, -1, -1):
+        ranks = np.flatnonzero(marked == layer)
+        digits = [(ranks // power % 3).astype(np.int8) for power in powers]
+        best = np.full(len(ranks), -128, dtype=np.int16)
+
+        for cell in range(cells):
+            empty = np.flatnonzero(digits[cell] == 0)
+            if not len(empty):
+                continue
+            around = [digit[empty] for digit in digits]
+
+            # an S ends lines (o, s) with an O then an S, an O centres (s, s)
+            for digit, pairs, wants in ((1, lines.as_end[cell], (2, 1)),
+                                        (2, lines.as_middle[cell], (1, 1))):
+                gain = np.zeros(len(empty), dtype=np.int16)
+                for first, second in pairs:
+                    gain += (around[first] == wants[0]) & (around[second] == wants[1])
+
+                child = values[ranks[empty] + digit * powers[cell]].astype(np.int16)
+                if simple:
+                    score = np.where(gain > 0, 1, -child)
+                else:
+                    score = gain - child
+                best[empty] = np.maximum(best[empty], score)
+
+        if simple:
+            # a grid with an SOS on it has already ended the game
+            ended = np.zeros(len(ranks), dtype=bool)
+            for cell in range(cells):
+                for s1, o, s2 in lines.through[cell]:
+                    if s1 == cell:
+                        ended |= (digits[s1] == 1) & (digits[o] == 2) & (digits[s2] == 1)
+            best[ended] = 0
+
+        values[ranks] = best
+
+    return values
+
+
+def write_table(path: str, size: tuple[int, int], game_mode: str) -> None:
+    values = solve(size, game_mode)
+    with open(path, "wb") as file:
+        file.write(TABLE_HEADER.pack(TABLE_MAGIC,
+                                     TABLE_VERSION,
+                                     size[0],
+                                     size[1],
+                                     board.GAME_MODES.index(game_mode)))
+        file.write(values.tobytes())
+
+
+class Tablebase:
+    """A memory mapped table, read one value at a time."""
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as file:
+            self.memory = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, version, width, height, mode = TABLE_HEADER.unpack_from(self.memory)
+        except struct.error:
+            magic = None
+        if magic != TABLE_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a tablebase")
+        elif version != TABLE_VERSION or mode >= len(board.GAME_MODES):
+            self.close()
+            raise ValueError(f"{path} is an unsupported tablebase version")
+        elif len(self.memory) != TABLE_HEADER.size + 3 ** (width * height):
+            self.close()
+            raise ValueError(f"{path} is truncated")
+
+        self.size = (width, height)
+        self.game_mode = board.GAME_MODES[mode]
+        self.powers = rank_powers(self.size)
+        self.values = memoryview(self.memory)[TABLE_HEADER.size:].cast("b")
+
+    def __enter__(self) -> "Tablebase":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if getattr(self, "values", None) is not None:
+            self.values.release()
+            self.values = None
+        self.memory.close()
+
+    def covers(self, test_board: board.Board) -> bool:
+        return (tuple(test_board.size) == self.size and
+                test_board.game_mode == self.game_mode)
+
+    def rank(self, test_board: board.Board) -> int:
+        return sum(power * (mark - board.EMPTY)
+                   for power, mark in zip(self.powers, test_board.marks))
+
+    def value(self, test_board: board.Board) -> int:
+        """The board's value for the player to move."""
+        return self.values[self.rank(test_board)]
+
+    def move_values(self, test_board: board.Board) -> list[tuple[int, board.Move]]:
+        """Every legal move with its value for the player making it."""
+        rank = self.rank(test_board)
+        simple = self.game_mode == "simple"
+
+        moves = []
+        for cell in test_board.empty_cells:
+            for mark, gain in ((board.Mark.S, test_board.s_gain[cell]),
+                               (board.Mark.O, test_board.o_gain[cell])):
+                if simple and gain:
+                    value = 1
+                else:
+                    child = rank + (mark.value - board.EMPTY) * self.powers[cell]
+                    value = (0 if simple else gain) - self.values[child]
+                moves.append((value, board.Move(test_board.positions[cell], mark, gain)))
+        return moves
+
+
+_tablebases = {}
+
+def open_tablebase(directory: str,
+                   size: tuple[int, int],
+                   game_mode: str) -> Tablebase:
+    """The shared table for a board size and mode, or None if there is none."""
+    path = table_path(directory, size, game_mode)
+    if path not in _tablebases:
+        _tablebases[path] = Tablebase(path) if os.path.exists(path) else None
+    return _tablebases[path]
+
+
+def has_table(directory: str, size: tuple[int, int], game_mode: str) -> bool:
+    return open_tablebase(directory, tuple(size), game_mode) is not None
+
+
+class TablebasePlayer:
+    """Plays perfectly on boards with a table, and searches on the rest.
+
+    Ties between equally good moves are broken at random.
+    """
+
+    def __init__(self,
+                 directory: str = TABLEBASE_PATH,
+                 time_limit: float = 0.5,
+                 seed: int = None) -> None:
+        self.directory = directory
+        self.rng = random.Random(seed)
+        self.searcher = search.Searcher(time_limit=time_limit)
+
+    def choose_move(self, test_board: board.Board) -> board.Move:
+        if test_board.end or not test_board.empty_cells:
+            return None
+
+        table = open_tablebase(self.directory, tuple(test_board.size), test_board.game_mode)
+        if table is None:
+            return self.searcher.choose_move(test_board)
+
+        moves = table.move_values(test_board)
+        best = max(value for value, _ in moves)
+        return self.rng.choice([move for value, move in moves if value == best])
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Solve every position of small SOS boards.")
+    parser.add_argument("sizes", nargs="+", type=int,
+                        help="board side lengths to solve")
+    parser.add_argument("--modes", nargs="+", default=list(board.GAME_MODES),
+                        choices=board.GAME_MODES)
+    parser.add_argument("--directory", default=TABLEBASE_PATH)
+    args = parser.parse_args(argv)
+
+    if min(args.sizes) < 3:
+        parser.error("board dimensions must be greater than or equal to 3x3")
+    elif max(args.sizes) ** 2 > MAX_CELLS:
+        parser.error(f"boards may have at most {MAX_CELLS} cells")
+
+    os.makedirs(args.directory, exist_ok=True)
+    for size in args.sizes:
+        for game_mode in args.modes:
+            path = table_path(args.directory, (size, size), game_mode)
+            write_table(path, (size, size), game_mode)
+            print(f"{path}: {3 ** (size * size)} positions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+
+# File: tournament.py
+# Project: 2023 Spring Semester SOS Project
+# Programmer: Ian Rowse <imrnnc@umsystem.edu>
+
+"""Headless round robin tournaments between computer strategies.
+
+Every pair of strategies plays every board size and game mode, taking turns
+at going first, with the games spread over a process pool. Strategies are
+given as ai.STRATEGIES names with optional options, e.g.
+
+    tournament greedy search:max_depth=2,time_limit=None mcts:playouts=200 \\
+               --sizes 4 6 --modes simple general --games 50
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import ast
+import inspect
+import itertools
+import json
+import math
+import os
+import random
+import time
+from typing import NamedTuple
+
+try:
+    import ai
+    import board
+except ImportError: # imported as part of the src package, e.g. by the tests
+    from src import ai
+    from src import board
+
+
+class GameSpec(NamedTuple):
+    first: str          # strategy specs, first is player one
+    second: str
+    size: int
+    game_mode: str
+    seed: int
+
+
+class GameResult(NamedTuple):
+    spec: GameSpec
+    scores: tuple[int, int]
+    victors: tuple[bool, bool]
+    moves: int
+    seconds: float
+
+
+def parse_strategy(spec: str) -> tuple[str, dict]:
+    """Splits "name:key=value,key=value" into the name and an options dict."""
+    name, _, option_text = spec.partition(":")
+    if name not in ai.STRATEGIES:
+        raise ValueError(f"unknown strategy {name!r}")
+
+    options = {}
+    for option in filter(None, option_text.split(",")):
+        key, _, value = option.partition("=")
+        try:
+            options[key] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            options[key] = value
+    return name, options
+
+
+def play_game(spec: GameSpec) -> GameResult:
+    random.seed(spec.seed)
+    start = time.perf_counter()
+
+    test_board = board.Board([spec.size, spec.size],
+                             [board.Player(spec.first, 0, True),
+                              board.Player(spec.second, 240, True)])
+    test_board.game_mode = spec.game_mode
+
+    agents = []
+    for seat, strategy in enumerate((spec.first, spec.second)):
+        name, options = parse_strategy(strategy)
+        # games are already spread over a pool, so no pools inside it
+        options = options or dict(ai.WORKER_OPTIONS.get(name) or
+                                  ai.DEFAULT_OPTIONS.get(name, {}))
+        # seeded agents keep a game the same whichever process plays it
+        if "seed" in inspect.signature(ai.STRATEGIES[name]).parameters:
+            options.setdefault("seed", spec.seed + seat)
+        agents.append(ai.make_agent(name, **options))
+
+    try:
+        while not test_board.end:
+            move = agents[test_board.turn].choose_move(test_board)
+            if not test_board.make_move(move.pos, move.mark):
+                raise RuntimeError(f"{spec} made an illegal move {move}")
+    finally:
+        for agent in agents:
+            ai.close_agent(agent)
+
+    victors = test_board.victors()
+    return GameResult(spec,
+                      tuple(player.score for player in test_board.players),
+                      tuple(player in victors for player in test_board.players),
+                      len(test_board.move_hist),
+                      time.perf_counter() - start)
+
+
+def schedule(strategies: list[str],
+             sizes: list[int],
+             game_modes: list[str],
+             games: int,
+             seed: int = 0) -> list[GameSpec]:
+    """Every ordered pair of strategies plays games games per size and mode."""
+    specs = []
+    for size, game_mode in itertools.product(sizes, game_modes):
+        for first, second in itertools.permutations(strategies, 2):
+            for game in range(games):
+                game_seed = random.Random(f"{seed} {size} {game_mode} "
+                                          f"{first} {second} {game}").getrandbits(32)
+                specs.append(GameSpec(first, second, size, game_mode, game_seed))
+    return specs
+
+
+def wilson_interval(points: float, games: int, z: float = 1.96) -> tuple[float, float]:
+    """95% Wilson score interval for a rate of points out of games."""
+    if games == 0:
+        return 0.0, 1.0
+    rate = points / games
+    centre = rate + z*z / (2*games)
+    spread = z * math.sqrt(rate * (1 - rate) / games + z*z / (4*games*games))
+    scale = 1 + z*z / games
+    return max(0.0, (centre - spread) / scale), min(1.0, (centre + spread) / scale)
+
+
+def summarize(results: list[GameResult]) -> list[dict]:
+    """Wins, draws and points for each strategy against each other one.
+
+    A draw is any game where both players are victors. The rate counts a
+    draw as half a win.
+    """
+    table = {}
+    for result in results:
+        spec = result.spec
+        for seat, other in ((0, 1), (1, 0)):
+            strategy = (spec.first, spec.second)[seat]
+            opponent = (spec.first, spec.second)[other]
+            row = table.setdefault((spec.size, spec.game_mode, strategy, opponent),
+                                   {"games": 0, "wins": 0, "draws": 0, "losses": 0,
+                                    "points": 0, "opponent_points": 0})
+            row["games"] += 1
+            row["points"] += result.scores[seat]
+            row["opponent_points"] += result.scores[other]
+            if result.victors[seat] and result.victors[other]:
+                row["draws"] += 1
+            elif result.victors[seat]:
+                row["wins"] += 1
+            else:
+                row["losses"] += 1
+
+    rows = []
+    for (size, game_mode, strategy, opponent), row in sorted(table.items()):
+        rate_points = row["wins"] + row["draws"] / 2
+        low, high = wilson_interval(rate_points, row["games"])
+        rows.append({"size": size,
+                     "game_mode": game_mode,
+                     "strategy": strategy,
+                     "opponent": opponent,
+                     **row,
+                     "rate": rate_points / row["games"],
+                     "rate_low": low,
+                     "rate_high": high})
+    return rows
+
+
+def run(strategies: list[str],
+        sizes: list[int],
+        game_modes: list[str],
+        games: int,
+        workers: int = None,
+        seed: int = 0) -> dict:
+
+    for strategy in strategies:
+        parse_strategy(strategy)
+
+    specs = schedule(strategies, sizes, game_modes, games, seed)
+
+    start = time.perf_counter()
+    if workers == 1:
+        results = list(map(play_game, specs))
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(play_game, specs, chunksize=4))
+    seconds = time.perf_counter() - start
+
+    moves = sum(result.moves for result in results)
+    return {"rows": summarize(results),
+            "games": len(results),
+            "moves": moves,
+            "seconds": seconds,
+            "games_per_second": len(results) / seconds if seconds else 0.0,
+            "moves_per_second": moves / seconds if seconds else 0.0}
+
+
+def print_report(report: dict) -> None:
+    width = max([8] + [len(row["strategy"]) for row in report["rows"]])
+    print(f"{'size':>4} {'mode':<8} {'strategy':<{width}} {'opponent':<{width}} "
+          f"{'W':>5} {'D':>5} {'L':>5} {'pts':>7} {'rate':>6}  95% CI")
+    for row in report["rows"]:
+        print(f"{row['size']:>4} {row['game_mode']:<8} "
+              f"{row['strategy']:<{width}} {row['opponent']:<{width}} "
+              f"{row['wins']:>5} {row['draws']:>5} {row['losses']:>5} "
+              f"{row['points'] / row['games']:>7.2f} {row['rate']:>6.3f}  "
+              f"[{row['rate_low']:.3f}, {row['rate_high']:.3f}]")
+    print(f"{report['games']} games, {report['moves']} moves in {report['seconds']:.2f}s: "
+          f"{report['games_per_second']:.1f} games/s, "
+          f"{report['moves_per_second']:.1f} moves/s")
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Round robin SOS tournament between "
+                                                 "computer strategies.")
+    parser.add_argument("strategies", nargs="+",
+                        help="strategy specs, as name or name:key=value,...")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[6],
+                        help="board side lengths to play on")
+    parser.add_argument("--modes", nargs="+", default=["simple", "general"],
+                        choices=board.GAME_MODES)
+    parser.add_argument("--games", type=int, default=10,
+                        help="games per ordered pair, size and mode")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="worker processes, 1 plays in this process")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    if len(args.strategies) < 2:
+        parser.error("need at least two strategies")
+    if min(args.sizes) < 3:
+        parser.error("board dimensions must be greater than or equal to 3x3")
+
+    report = run(args.strategies, args.sizes, args.modes, args.games, args.workers, args.seed)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
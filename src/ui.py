@@ -9,6 +9,36 @@ import pygame
 
 BUTTON_CLICK = pygame.event.custom_type()
 
+# Fonts by size, rendered text by (text, size, colour) and the font size that
+# fits each (text, width, height). Fonts are kept for good; the other two
+# are emptied by clear_text_cache whenever the layout changes.
+_fonts = {}
+_rendered_text = {}
+_fitted_sizes = {}
+
+def get_font(size: int) -> pygame.font.Font:
+    if size not in _fonts:
+        _fonts[size] = pygame.font.SysFont(None, size)
+    return _fonts[size]
+
+def render_text(text: str, size: int, color: Sequence[int]) -> pygame.Surface:
+    key = (text, size, tuple(color))
+    if key not in _rendered_text:
+        _rendered_text[key] = get_font(size).render(text, 1, color)
+    return _rendered_text[key]
+
+def fitted_size(text: str, rect: pygame.Rect) -> int:
+    """The font size that fits text to rect, as measured at size 20."""
+    key = (text, rect.width, rect.height)
+    if key not in _fitted_sizes:
+        measured = get_font(20).size(text)
+        _fitted_sizes[key] = int(pygame.Rect((0, 0), measured).fit(rect).height)
+    return _fitted_sizes[key]
+
+def clear_text_cache() -> None:
+    _rendered_text.clear()
+    _fitted_sizes.clear()
+
 class Button(pygame.Rect):
     """A clickable button for Pygame"""
 
@@ -54,13 +84,7 @@ class Button(pygame.Rect):
         pygame.draw.rect(surface, cur_color, self.rect, 0)
         
         if self.rect.height >= 5:
-            font = pygame.font.SysFont(None, 20)
-            text = font.render(self.text, 1, (0,0,0))
-            size = int(text.get_rect().fit(self.rect).height)
- 
-            font = pygame.font.SysFont(None, size)
-            text = font.render(self.text, 1, self.text_color)
-
+            text = render_text(self.text, fitted_size(self.text, self.rect), self.text_color)
             surface.blit(text, text.get_rect(center=self.rect.center))
 
     def click(self, mouse_button: int = 1):
@@ -70,27 +94,58 @@ class Button(pygame.Rect):
 
 
 class UI(UserDict):
-    #def __init__(self):
-    #    pass
-        
-    #needs_refresh = False        
+    """Buttons by key, with a uniform grid of buckets for finding the one at a point.
+
+    Each bucket is a square about the size of an average button and lists
+    the keys of the buttons that overlap it, so click and hover only test
+    the few buttons near the point. The grid is built on first use; call
+    reindex after moving buttons.
+    """
+
+    index = None # (bucket size, {(column, row): [keys]}), or None to rebuild
 
     def __setitem__(self, key: str, button: Button):
         UserDict.__setitem__(self, key, button)
         UserDict.__getitem__(self, key).event_attrs["key"] = key
+        self.index = None
+
+    def __delitem__(self, key: str):
+        UserDict.__delitem__(self, key)
+        self.index = None
+
+    def reindex(self) -> None:
+        self.index = None
+
+    def build_index(self) -> None:
+        rects = [button.rect for button in self.values()]
+        sides = [side for rect in rects for side in rect.size if side > 0]
+        bucket = max(1, int(sum(sides) / len(sides))) if sides else 1
+
+        buckets = {}
+        for key, button in self.items():
+            rect = button.rect
+            for column in range(rect.left // bucket, (rect.right - 1) // bucket + 1):
+                for row in range(rect.top // bucket, (rect.bottom - 1) // bucket + 1):
+                    buckets.setdefault((column, row), []).append(key)
+        self.index = (bucket, buckets)
+
+    def at(self, pos: Sequence) -> str:
+        """Key of the first button under pos, in the order they were added."""
+        if self.index is None:
+            self.build_index()
+        bucket, buckets = self.index
+        for key in buckets.get((int(pos[0] // bucket), int(pos[1] // bucket)), ()):
+            if self[key].rect.collidepoint(pos):
+                return key
+        return None
 
     def draw(self, surface: pygame.Surface, hover: bool = True) -> None:
         for b in self.values(): b.draw(surface, hover)
 
     def click(self, pos: Sequence, mouse_button: int = 1) -> None:
-        for b in self.values():
-            if b.rect.collidepoint(pos):
-                b.click(mouse_button)
-                break
+        key = self.at(pos)
+        if key is not None:
+            self[key].click(mouse_button)
 
     def hover(self, pos: Sequence) -> str:
-        for key, b in self.items():
-            if b.rect.collidepoint(pos):
-                return key
-
-
+        return self.at(pos)
@@ -0,0 +1,114 @@
+# File: vectorized.py
+# Project: 2023 Spring Semester SOS Project
+# Programmer: Ian Rowse <imrnnc@umsystem.edu>
+
+"""NumPy kernels that score every cell of one or more SOS boards at once.
+
+Grids are int8 arrays of Mark values shaped (..., height, width), so the same
+kernels work on a single board or on a stack of boards. Each direction is
+handled with one shifted view of a padded copy of the grid, instead of a
+Python call per cell.
+"""
+
+from collections.abc import Sequence
+
+import numpy as np
+
+try:
+    import board
+except ImportError: # imported as part of the src package, e.g. by the tests
+    from src import board
+
+NONE  = board.NONE
+EMPTY = board.EMPTY
+S     = board.S
+O     = board.O
+
+# east, south east, south and south west see every line exactly once
+HALF_OFFSETS = board.OFFSETS[3:7]
+
+
+def to_array(test_board: board.Board) -> np.ndarray:
+    """The board's grid as an int8 (height, width) array of Mark values."""
+    marks = np.frombuffer(test_board.marks, dtype=np.int8)
+    return marks.reshape(test_board.size[1], test_board.size[0]).copy()
+
+
+def pad(grid: np.ndarray) -> np.ndarray:
+    """Surrounds the last two axes with two cells of NONE on every side."""
+    widths = [(0, 0)] * (grid.ndim - 2) + [(2, 2), (2, 2)]
+    return np.pad(grid, widths, constant_values=NONE)
+
+
+def shifted(padded: np.ndarray, dx: int, dy: int) -> np.ndarray:
+    """View of a padded grid where cell (x, y) holds cell (x + dx, y + dy)."""
+    height = padded.shape[-2] - 4
+    width  = padded.shape[-1] - 4
+    return padded[..., 2 + dy : 2 + dy + height, 2 + dx : 2 + dx + width]
+
+
+def gain_maps(grid: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """How many SOSes an S, and an O, would make on every cell.
+
+    Filled cells always gain 0. Both maps have the same shape as grid.
+    """
+    padded = pad(grid)
+    is_s = padded == S
+    is_o = padded == O
+    is_empty = grid == EMPTY
+
+    s_gain = np.zeros(grid.shape, dtype=np.int8)
+    o_gain = np.zeros(grid.shape, dtype=np.int8)
+
+    for dx, dy in board.OFFSETS:
+        s_gain += shifted(is_o, dx, dy) & shifted(is_s, dx*2, dy*2)
+
+    for dx, dy in HALF_OFFSETS:
+        o_gain += shifted(is_s, dx, dy) & shifted(is_s, -dx, -dy)
+
+    s_gain *= is_empty
+    o_gain *= is_empty
+    return s_gain, o_gain
+
+
+def count_sos(grid: np.ndarray) -> np.ndarray:
+    """Counts the SOS lines on every board in grid, recounted from scratch."""
+    padded = pad(grid)
+    is_s = padded == S
+    is_o = padded == O
+
+    lines = np.zeros(grid.shape, dtype=np.int32)
+    for dx, dy in HALF_OFFSETS:
+        lines += shifted(is_s, 0, 0) & shifted(is_o, dx, dy) & shifted(is_s, dx*2, dy*2)
+    return lines.sum(axis=(-2, -1))
+
+
+def scored_moves(test_board: board.Board) -> list[tuple[int, Sequence[int], board.Mark]]:
+    """Every legal (gain, pos, mark) on the board, highest gain first.
+
+    Ties keep row-major order with S before O.
+    """
+    grid = to_array(test_board)
+    s_gain, o_gain = gain_maps(grid)
+
+    gains = np.stack((s_gain.ravel(), o_gain.ravel()), axis=1).ravel()
+    legal = np.repeat(grid.ravel() == EMPTY, 2)
+
+    order = np.flatnonzero(legal)
+    order = order[np.argsort(-gains[order], kind="stable")]
+
+    marks = (board.Mark.S, board.Mark.O)
+    positions = test_board.positions
+    return [(int(gains[move]), positions[move >> 1], marks[move & 1])
+            for move in order.tolist()]
+
+
+def validate(test_board: board.Board) -> bool:
+    """Checks the board's SOS list and scoring-cell index against a recount."""
+    grid = to_array(test_board)
+    if int(count_sos(grid)) != len(test_board.sos_list):
+        return False
+
+    s_gain, o_gain = gain_maps(grid)
+    return (s_gain.ravel().tolist() == test_board.s_gain and
+            o_gain.ravel().tolist() == test_board.o_gain)
@@ -0,0 +1,243 @@
+# File: bench_board.py
+# Project: 2023 Spring Semester SOS Project
+# Programmer: Ian Rowse <imrnnc@umsystem.edu>
+
+"""microbenchmarks for the SOS board hot paths
+
+Not collected by the test runner. Run it from the project root:
+
+    python -m test.bench_board              compare against the baselines
+    python -m test.bench_board --save       record new baselines
+    python -m test.bench_board -k optimal   only cases whose name has "optimal"
+
+Every case is timed once per round, for --rounds rounds, and keeps its best
+time; spreading the runs out like this keeps a burst of load on the machine
+from landing on all of one case's runs. The run fails (exit status 1)
+when any case is more than --threshold slower than its baseline. Baselines
+are per machine, so record them on the machine that does the comparing.
+"""
+
+import argparse
+from collections.abc import Callable
+import json
+import os
+import random
+import sys
+import tempfile
+import timeit
+from typing import NamedTuple
+from src import bitboard
+from src import board
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "bench_baseline.json")
+
+SIZES = (3, 8, 20, 50, 100)
+FILLS = (0.0, 0.5, 0.9)
+SAMPLE = 64 # cells swept by the per-cell cases
+
+# get_optimal_move looks at every move for each move per level, so the
+# deeper searches only run on boards with at most this many empty cells
+OPTIMAL_EMPTY = {0: 100 * 100, 1: 400, 2: 40}
+
+
+class Case(NamedTuple):
+    name: str
+    run: Callable[[], object]
+
+
+def filled_board(size: int, fill: float) -> board.Board:
+    """A general mode board with fill of its cells marked, the same every time."""
+    rng = random.Random(f"bench {size} {fill}")
+    test_board = board.Board([size, size])
+    test_board.game_mode = "general"
+
+    for _ in range(int(size * size * fill)):
+        pos = test_board.positions[rng.choice(test_board.empty_cells)]
+        test_board.push_move(pos, rng.choice((board.Mark.S, board.Mark.O)))
+    return test_board
+
+
+def sample_cells(test_board: board.Board) -> list[tuple[int, int]]:
+    rng = random.Random(len(test_board.empty_cells))
+    cells = sorted(test_board.empty_cells)
+    return [test_board.positions[idx]
+            for idx in rng.sample(cells, min(SAMPLE, len(cells)))]
+
+
+def bit_board(test_board: board.Board) -> bitboard.BitBoard:
+    """test_board's game replayed onto a BitBoard."""
+    bits = bitboard.BitBoard(list(test_board.size))
+    bits.game_mode = test_board.game_mode
+    for move in test_board.move_hist:
+        bits.make_move(move.pos, move.mark)
+    return bits
+
+
+def playout_moves(test_board: board.Board) -> list[tuple[tuple[int, int], board.Mark]]:
+    """Every empty cell in a random order, each with a random mark."""
+    rng = random.Random(len(test_board.empty_cells))
+    cells = sorted(test_board.empty_cells)
+    rng.shuffle(cells)
+    return [(test_board.positions[idx], rng.choice((board.Mark.S, board.Mark.O)))
+            for idx in cells]
+
+
+def creates_sos_case(test_board: board.Board | bitboard.BitBoard,
+                     cells: list[tuple[int, int]]) -> Callable[[], None]:
+    def run():
+        for pos in cells:
+            test_board.creates_sos(pos, board.Mark.S)
+            test_board.creates_sos(pos, board.Mark.O)
+    return run
+
+
+def make_undo_case(test_board: board.Board | bitboard.BitBoard,
+                   cells: list[tuple[int, int]]) -> Callable[[], None]:
+    def run():
+        for pos in cells:
+            test_board.make_move(pos, board.Mark.S)
+            test_board.undo_move()
+            test_board.make_move(pos, board.Mark.O)
+            test_board.undo_move()
+    return run
+
+
+# a game of random moves played out and taken back, the AI-vs-AI batch load
+def playout_case(test_board: board.Board | bitboard.BitBoard,
+                 moves: list[tuple[tuple[int, int], board.Mark]]) -> Callable[[], None]:
+    def run():
+        for pos, mark in moves:
+            test_board.make_move(pos, mark)
+        for _ in moves:
+            test_board.undo_move()
+    return run
+
+
+def optimal_case(test_board: board.Board, depth: int) -> Callable[[], None]:
+    def run():
+        random.seed(0)
+        test_board.get_optimal_move(depth)
+    return run
+
+
+def save_load_case(test_board: board.Board, path: str) -> tuple[Case, Case]:
+    test_board.save(path)
+    loaded = board.Board(list(test_board.size))
+    return (lambda: test_board.save(path),
+            lambda: loaded.load(path))
+
+
+def cases(directory: str) -> list[Case]:
+    """Every benchmark, named operation/size/fill."""
+    all_cases = []
+    for size in SIZES:
+        for fill in FILLS:
+            test_board = filled_board(size, fill)
+            suffix = f"{size}x{size}/{int(fill * 100)}%"
+
+            cells = sample_cells(test_board)
+            moves = playout_moves(test_board)
+            all_cases.append(Case(f"creates_sos/{suffix}", creates_sos_case(test_board, cells)))
+            all_cases.append(Case(f"make_undo/{suffix}", make_undo_case(test_board, cells)))
+            all_cases.append(Case(f"get_empty_cells/{suffix}", test_board.get_empty_cells))
+            all_cases.append(Case(f"playout/{suffix}", playout_case(test_board, moves)))
+
+            # the same cases on the bitmask core
+            bits = bit_board(test_board)
+            all_cases.append(Case(f"bitboard_creates_sos/{suffix}", creates_sos_case(bits, cells)))
+            all_cases.append(Case(f"bitboard_make_undo/{suffix}", make_undo_case(bits, cells)))
+            all_cases.append(Case(f"bitboard_get_empty_cells/{suffix}", bits.get_empty_cells))
+            all_cases.append(Case(f"bitboard_playout/{suffix}", playout_case(bits, moves)))
+            all_cases.append(Case(f"str/{suffix}", test_board.__str__))
+
+            for depth, most_empty in OPTIMAL_EMPTY.items():
+                if len(test_board.empty_cells) <= most_empty:
+                    all_cases.append(Case(f"get_optimal_move_{depth}/{suffix}",
+                                          optimal_case(test_board, depth)))
+
+            save, load = save_load_case(test_board, os.path.join(
+                directory, f"{size}x{size} {int(fill * 100)}.sav"))
+            all_cases.append(Case(f"save/{suffix}", save))
+            all_cases.append(Case(f"load/{suffix}", load))
+    return all_cases
+
+
+def calls_per_run(timer: timeit.Timer, min_time: float) -> int:
+    """How many calls make a timed run last at least min_time."""
+    number = 1
+    while timer.timeit(number) < min_time and number < 1 << 20:
+        number *= 2
+    return number
+
+
+def compare(results: dict[str, float],
+            baselines: dict[str, float],
+            threshold: float) -> list[str]:
+    """Names of the cases more than threshold slower than their baseline."""
+    return [name for name, seconds in results.items()
+            if name in baselines and seconds > baselines[name] * (1 + threshold)]
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the SOS board hot paths.")
+    parser.add_argument("-k", dest="pattern", default="",
+                        help="only run cases whose name contains this")
+    parser.add_argument("--save", action="store_true",
+                        help="record the results as the new baselines")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown before failing, 0.25 is 25%%")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.05,
+                        help="seconds each timed run lasts at least")
+    args = parser.parse_args(argv)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baselines = json.load(file)
+
+    timers = {}
+    errors = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for case in cases(directory):
+            if args.pattern not in case.name:
+                continue
+            timer = timeit.Timer(case.run)
+            try:
+                timers[case.name] = (timer, calls_per_run(timer, args.min_time))
+            except Exception as error: # a broken hot path is reported, not timed
+                errors[case.name] = error
+                print(f"{case.name:<32} error: {error!r}")
+
+        results = {}
+        for _ in range(args.rounds):
+            for name, (timer, number) in timers.items():
+                seconds = timer.timeit(number) / number
+                results[name] = min(seconds, results.get(name, seconds))
+
+    for name, seconds in results.items():
+        line = f"{name:<32} {seconds * 1e6:>12.2f} us"
+        if name in baselines:
+            line += f"  {seconds / baselines[name] - 1:>+7.1%}"
+        print(line)
+
+    if args.save:
+        baselines.update(results)
+        for name in errors:
+            baselines.pop(name, None)
+        with open(args.baseline, "w") as file:
+            json.dump(dict(sorted(baselines.items())), file, indent=2)
+            file.write("\n")
+        print(f"saved {len(results)} baselines to {args.baseline}")
+        return 0
+
+    failures = compare(results, baselines, args.threshold)
+    failures += [name for name in errors if name in baselines]
+    for name in failures:
+        print(f"REGRESSION {name}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+# File: helpers.py
+# Project: 2023 Spring Semester SOS Project
+# Programmer: Ian Rowse <imrnnc@umsystem.edu>
+
+"""shared fixtures for the tests"""
+
+import random
+from src import board
+
+def random_board(size, game_mode, moves, seed):
+    """A board with up to moves random marks, the same for the same seed.
+
+    Positions and marks both come from the seeded generator, and play stops
+    early if the game ends first.
+    """
+    rng = random.Random(seed)
+    test_board = board.Board(size)
+    test_board.game_mode = game_mode
+    for _ in range(moves):
+        if test_board.end or not test_board.empty_cells:
+            break
+        pos = test_board.positions[rng.choice(test_board.empty_cells)]
+        test_board.make_move(pos, rng.choice((board.Mark.S, board.Mark.O)))
+    return test_board
@@ -0,0 +1,68 @@
+# File: test_ai.py
+# Project: 2023 Spring Semester SOS Project
+# Programmer: Ian Rowse <imrnnc@umsystem.edu>
+
+"""tests for the computer player registry"""
+
+import unittest
+from src import ai
+from src import board
+
+class TestAI(unittest.TestCase):
+    """tests for strategy lookup"""
+
+    def test_every_strategy_moves(self):
+        test_board = board.Board([3, 3])
+        for strategy in ai.STRATEGIES:
+            agent = ai.make_agent(strategy)
+            self.addCleanup(ai.close_agent, agent)
+            move = agent.choose_move(test_board)
+            self.assertIn(move.pos, test_board.get_empty_cells())
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            ai.make_agent("oracle")
+
+    def test_next_strategy_cycles(self):
+        player = board.Player("Test")
+        seen = []
+        for _ in range(len(ai.STRATEGY_NAMES) + 1):
+            ai.next_strategy(player)
+            seen.append((player.computer, player.strategy))
+
+        self.assertEqual(seen[:-1], [(True, strategy) for strategy in ai.STRATEGY_NAMES])
+        self.assertFalse(seen[-1][0])
+
+    def test_strategy_name_without_table(self):
+        test_board = board.Board([5, 5]) # too big for a table
+        self.assertEqual(ai.strategy_name(board.Player("Test", 0, True, "search"), test_board),
+                         "Computer")
+        self.assertEqual(ai.strategy_name(board.Player("Test", 0, True, "tablebase"), test_board),
+                         "Perfect (no table)")
+
+    def test_worker_agents_start_no_pools(self):
+        agent = ai.make_worker_agent("parallel")
+        agent.choose_move(board.Board([4, 4]))
+        self.assertIsNone(agent.executor)
+
+    def test_choose_replayed_move(self):
+        test_board = board.Board([4, 4])
+        test_board.make_move((0, 0), board.Mark.S)
+        test_board.make_move((1, 0), board.Mark.O)
+
+        cell, mark = ai.choose_replayed_move((4, 4), "simple", 2,
+                                             list(test_board.move_hist.cell_marks()),
+                                             "greedy", 0)
+        self.assertEqual((test_board.positions[cell], mark), ((2, 0), board.S))
+
+        test_board.make_move((2, 0), board.Mark.S)
+        self.assertIsNone(ai.choose_replayed_move((4, 4), "simple", 2,
+                                                  list(test_board.move_hist.cell_marks()),
+                                                  "greedy", 1))
+
+        ai.close_replay_agents()
+        self.assertEqual(ai._replay_agents, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
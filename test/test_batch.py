@@ -0,0 +1,75 @@
+# File: test_batch.py
+# Project: 2023 Spring Semester SOS Project
+# Programmer: Ian Rowse <imrnnc@umsystem.edu>
+
+"""tests for the batched numpy game simulator"""
+
+import unittest
+from src import board
+
+try:
+    import numpy
+    from src import batch
+except ImportError:
+    numpy = None
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestBatchSimulator(unittest.TestCase):
+    """tests that batched games play out exactly like Board games"""
+
+    def replay(self, result, game, size, game_mode):
+        test_board = board.Board(list(size))
+        test_board.game_mode = game_mode
+
+        for move in range(result.moves[game]):
+            cell = int(result.cells[game, move])
+            pos = (cell % size[0], cell // size[0])
+            mark = board.Mark(int(result.marks[game, move]))
+
+            self.assertEqual(test_board.get_gain(pos, mark), result.gains[game, move])
+            self.assertTrue(test_board.make_move(pos, mark))
+
+        self.assertTrue(test_board.end)
+        self.assertEqual([player.score for player in test_board.players],
+                         result.scores[game].tolist())
+        victors = test_board.victors()
+        self.assertEqual([player in victors for player in test_board.players],
+                         result.victors[game].tolist())
+
+    def test_general_matches_board(self):
+        size = (5, 4)
+        result = batch.simulate(20, size, "general", ("random", "greedy"), seed=1)
+        for game in range(20):
+            self.assertEqual(result.moves[game], 20)
+            self.replay(result, game, size, "general")
+
+    def test_simple_matches_board(self):
+        size = (4, 4)
+        result = batch.simulate(20, size, "simple", ("safe", "random"), seed=2)
+        for game in range(20):
+            self.replay(result, game, size, "simple")
+
+    def test_greedy_beats_random(self):
+        result = batch.simulate(200, (6, 6), "general", ("greedy", "random"), seed=3)
+        wins = (result.victors[:, 0] & ~result.victors[:, 1]).sum()
+        losses = (result.victors[:, 1] & ~result.victors[:, 0]).sum()
+        self.assertGreater(wins, losses)
+
+    def test_safe_beats_greedy_in_simple(self):
+        result = batch.simulate(200, (6, 6), "simple", ("safe", "greedy"), seed=4)
+        wins = (result.victors[:, 0] & ~result.victors[:, 1]).sum()
+        losses = (result.victors[:, 1] & ~result.victors[:, 0]).sum()
+        self.assertGreater(wins, losses)
+
+    def test_seeded(self):
+        first = batch.simulate(5, (5, 5), seed=9)
+        second = batch.simulate(5, (5, 5), seed=9)
+        self.assertTrue((first.cells == second.cells).all())
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            batch.BatchSimulator(1, (3, 3), policies=("minimax",))
+
+
+if __name__ == "__main__":
+    unittest.main()
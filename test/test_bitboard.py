@@ -0,0 +1,88 @@
+# File: test_bitboard.py
+# Project: 2023 Spring Semester SOS Project
+# Programmer: Ian Rowse <imrnnc@umsystem.edu>
+
+"""tests for the bitmask SOS board core"""
+
+import random
+import unittest
+from src import bitboard
+from src import board
+
+class TestBitBoard(unittest.TestCase):
+    """tests for BitBoard against Board"""
+
+    def play_both(self, size, game_mode, seed):
+        rng = random.Random(seed)
+        plain = board.Board(size)
+        bits = bitboard.BitBoard(size)
+        plain.game_mode = bits.game_mode = game_mode
+
+        while not plain.end:
+            pos = plain.positions[rng.choice(plain.empty_cells)]
+            mark = rng.choice((board.Mark.S, board.Mark.O))
+
+            self.assertEqual(bits.creates_sos(pos, mark), plain.creates_sos(pos, mark))
+            self.assertEqual(sorted(bits.scoring_moves()), sorted(plain.scoring_moves()))
+
+            self.assertTrue(plain.make_move(pos, mark))
+            self.assertTrue(bits.make_move(pos, mark))
+
+            self.assertEqual(sorted(bits.get_empty_cells()), sorted(plain.get_empty_cells()))
+            self.assertEqual(bits.count_sos(), len(plain.sos_list))
+            self.assertEqual((bits.turn, bits.end), (plain.turn, plain.end))
+
+        self.assertEqual(bits.move_hist, plain.move_hist)
+        self.assertEqual(bits.sos_list, plain.sos_list)
+        self.assertEqual([player.score for player in bits.players],
+                         [player.score for player in plain.players])
+        self.assertEqual(bits.players.index(bits.victors()[0]),
+                         plain.players.index(plain.victors()[0]))
+        return plain, bits
+
+    def test_matches_board_square(self):
+        for seed in range(10):
+            self.play_both([5, 5], board.GAME_MODES[seed % 2], seed)
+
+    def test_matches_board_rectangle(self):
+        for seed in range(10):
+            self.play_both([7, 4], "general", seed)
+            self.play_both([3, 6], "general", seed)
+
+    def test_undo(self):
+        plain, bits = self.play_both([4, 4], "general", 3)
+        while plain.move_hist:
+            plain.undo_move()
+            bits.undo_move()
+            self.assertEqual(sorted(bits.get_empty_cells()), sorted(plain.get_empty_cells()))
+            self.assertEqual(bits.sos_list, plain.sos_list)
+            self.assertEqual((bits.turn, bits.end), (plain.turn, plain.end))
+
+        self.assertEqual((bits.s_bits, bits.o_bits), (0, 0))
+        self.assertEqual([player.score for player in bits.players], [0, 0])
+
+    def test_no_wrap_across_edges(self):
+        test_board = bitboard.BitBoard([4, 4])
+        test_board.game_mode = "general"
+        test_board.make_move((3, 0), board.Mark.S)
+        test_board.make_move((0, 1), board.Mark.O)
+        test_board.make_move((3, 3), board.Mark.O)
+        test_board.make_move((0, 3), board.Mark.S)
+
+        self.assertEqual(test_board.creates_sos((1, 1), board.Mark.S), [])
+        self.assertEqual(test_board.creates_sos((1, 0), board.Mark.O), [])
+        self.assertEqual(list(test_board.scoring_moves()), [])
+
+    def test_illegal_moves(self):
+        test_board = bitboard.BitBoard([3, 3])
+        self.assertTrue(test_board.make_move((0, 0), board.Mark.S))
+        self.assertFalse(test_board.make_move((0, 0), board.Mark.O))
+        self.assertFalse(test_board.make_move((3, 0), board.Mark.O))
+        with self.assertRaises(ValueError):
+            test_board.make_move((1, 1), board.Mark.EMPTY)
+        self.assertEqual(test_board.get_mark((0, 0)), board.Mark.S)
+        self.assertEqual(len(test_board.get_empty_cells()), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,6 +4,9 @@
 
 """tests for the SOS board class"""
 
+import os
+import random
+import tempfile
 import unittest
 from src import board
 
@@ -82,6 +85,109 @@ class TestPlayer(unittest.TestCase):
         self.assertEqual(board.Player("Test").score, 0)
 
 
+class TestLineTables(unittest.TestCase):
+    """tests for the precomputed line tables"""
+
+    def test_three_by_three(self):
+        tables = board.line_tables((3, 3))
+
+        self.assertEqual(tables.as_middle[4], ((0, 8), (1, 7), (2, 6), (5, 3)))
+        self.assertEqual(tables.as_end[0], ((1, 2), (4, 8), (3, 6)))
+        self.assertEqual(tables.as_end[4], ())
+        self.assertEqual(sum(len(lines) for lines in tables.through), 8 * 3)
+
+    def test_rectangle_line_count(self):
+        width, height = 5, 4
+        tables = board.line_tables((width, height))
+
+        lines = {line for cell_lines in tables.through for line in cell_lines}
+        expected = ((width - 2) * height +           # rows
+                    width * (height - 2) +           # columns
+                    2 * (width - 2) * (height - 2))  # diagonals
+
+        self.assertEqual(len(lines), expected)
+        self.assertIs(board.line_tables([width, height]), tables)
+
+
+class TestPackedList(unittest.TestCase):
+    """tests for the packed move and SOS lists"""
+
+    def test_move_list_like_a_list(self):
+        moves = [board.Move((x, 1), board.Mark.S if x % 2 else board.Mark.O, x % 3, x % 2)
+                 for x in range(5)]
+        packed = board.MoveList((5, 3), moves)
+
+        self.assertEqual(packed, moves)
+        self.assertEqual(len(packed), 5)
+        self.assertEqual(packed[-1], moves[-1])
+        self.assertEqual(packed[1:3], moves[1:3])
+        self.assertEqual(list(packed), moves)
+        self.assertEqual(repr(packed), repr(moves))
+
+        del packed[-2:]
+        self.assertEqual(packed, moves[:-2])
+        self.assertEqual(packed.pop(), moves[2])
+        self.assertEqual(packed.pop(0), moves[0])
+        self.assertEqual(packed, moves[1:2])
+
+        packed.clear()
+        self.assertEqual(packed, [])
+        self.assertFalse(packed)
+        with self.assertRaises(IndexError):
+            packed.pop()
+
+    def test_move_list_default_player(self):
+        packed = board.MoveList((3, 3))
+        packed.append(board.Move((2, 2), board.Mark.O))
+
+        self.assertEqual(packed[0], board.Move((2, 2), board.Mark.O, 0, -1))
+
+    def test_sos_list(self):
+        lines = [board.SOS((0, 0), (2, 2), 1), board.SOS((4, 3), (4, 1), 0)]
+        packed = board.SOSList((5, 4), lines)
+
+        self.assertEqual(packed, lines)
+        self.assertEqual(packed[0].p1, (0, 0))
+        self.assertEqual(packed[1].p2, (4, 1))
+        self.assertEqual(packed[1].player_id, 0)
+
+    def test_unpackable_players(self):
+        moves, lines = board.MoveList((3, 3)), board.SOSList((3, 3))
+        moves.append(board.Move((0, 0), board.Mark.S, 0, board.MAX_PLAYERS - 1))
+        lines.append(board.SOS((0, 0), (2, 2), board.MAX_PLAYERS - 1))
+        self.assertEqual(moves[0].player, board.MAX_PLAYERS - 1)
+
+        with self.assertRaises(ValueError):
+            moves.append(board.Move((0, 0), board.Mark.S, 0, board.MAX_PLAYERS))
+        with self.assertRaises(ValueError):
+            lines.append(board.SOS((0, 0), (2, 2), board.MAX_PLAYERS))
+        with self.assertRaises(ValueError):
+            board.Board([3, 3], [board.Player(str(idx)) for idx in range(board.MAX_PLAYERS + 1)])
+
+    def test_board_history_round_trip(self):
+        rng = random.Random(15)
+        test_board = board.Board([6, 6])
+        test_board.game_mode = "general"
+
+        moves = []
+        while not test_board.end:
+            pos = test_board.positions[rng.choice(test_board.empty_cells)]
+            moves.append(test_board.push_move(pos, rng.choice((board.Mark.S, board.Mark.O))))
+
+        self.assertIsInstance(test_board.move_hist, board.MoveList)
+        self.assertEqual(test_board.move_hist, moves)
+        self.assertEqual(len(test_board.sos_list), sum(move.sos_count for move in moves))
+
+        for move in reversed(moves):
+            test_board.undo_move()
+        self.assertEqual(test_board.move_future, moves[::-1])
+        self.assertEqual(test_board.sos_list, [])
+
+    def test_base_class_is_abstract(self):
+        with self.assertRaises(TypeError):
+            board.PackedList((3, 3))
+
+
 class TestBoard(unittest.TestCase):
     """tests for the core SOS Board class"""
 
@@ -219,6 +325,19 @@ class TestBoard(unittest.TestCase):
                 count -= 1
                 self.assertEqual(test_board.mark_count, count)
 
+    def test_marks_match_grid(self):
+        test_board = board.Board([4, 3])
+        test_board.set_mark((1, 0), board.Mark.S)
+        test_board.set_mark((3, 2), board.Mark.O)
+        test_board.set_mark((3, 2), board.Mark.S)
+
+        self.assertEqual(len(test_board.marks), 4 * 3)
+        self.assertEqual(test_board.grid, [board.MARKS[value] for value in test_board.marks])
+        self.assertEqual(test_board.marks[1], board.S)
+        self.assertEqual(test_board.marks[11], board.S)
+        self.assertEqual(test_board.grid.count(board.Mark.EMPTY), 10)
+        self.assertEqual(test_board.mark_count, 2)
+
     def test_clear_board(self):
         width, height = 3, 3
         test_board = board.Board(width, height)
@@ -269,6 +388,188 @@ class TestBoard(unittest.TestCase):
         test_board.make_move((1, 1), board.Mark.O)
         self.assertEqual(test_board.turn, 0)
 
+    def test_zobrist_transposition(self):
+        first = board.Board([4, 4])
+        first.make_move((0, 0), board.Mark.S)
+        first.make_move((1, 1), board.Mark.O)
+        first.make_move((2, 2), board.Mark.S)
+
+        second = board.Board([4, 4])
+        second.make_move((2, 2), board.Mark.S)
+        second.make_move((1, 1), board.Mark.O)
+        second.make_move((0, 0), board.Mark.S)
+
+        self.assertEqual(first.zobrist, second.zobrist)
+        self.assertNotEqual(first.zobrist, 0)
+
+    def test_zobrist_undo(self):
+        test_board = board.Board([4, 4])
+        test_board.make_move((0, 0), board.Mark.S)
+        before = test_board.zobrist
+
+        test_board.make_move((1, 0), board.Mark.O)
+        self.assertNotEqual(test_board.zobrist, before)
+
+        test_board.undo_move()
+        self.assertEqual(test_board.zobrist, before)
+
+        test_board.clear()
+        self.assertEqual(test_board.zobrist, 0)
+
+    def test_empty_cells_track_set_mark(self):
+        test_board = board.Board([4, 4])
+
+        test_board.set_mark((0, 0), board.Mark.S)
+        test_board.set_mark((3, 1), board.Mark.O)
+        test_board.set_mark((2, 2), board.Mark.S)
+        test_board.set_mark((3, 1), board.Mark.S)
+        test_board.set_mark((0, 0), board.Mark.EMPTY)
+
+        empty_cells = [(x, y) for y in range(4) for x in range(4)
+                       if test_board.get_mark((x, y)) == board.Mark.EMPTY]
+
+        self.assertEqual(sorted(test_board.get_empty_cells()), sorted(empty_cells))
+        self.assertEqual(len(test_board.get_empty_cells()), 14)
+
+    def test_empty_cells_order_restored(self):
+        test_board = board.Board([4, 4])
+        test_board.make_move((1, 2), board.Mark.S)
+        before = list(test_board.empty_cells)
+
+        test_board.push_move((0, 0), board.Mark.O)
+        test_board.push_move((3, 3), board.Mark.S)
+        test_board.pop_move()
+        test_board.pop_move()
+
+        self.assertEqual(test_board.empty_cells, before)
+
+    def test_legal_moves(self):
+        test_board = board.Board([3, 3])
+        test_board.make_move((1, 1), board.Mark.O)
+
+        moves = list(test_board.legal_moves())
+
+        self.assertEqual(len(moves), 16)
+        self.assertNotIn(((1, 1), board.Mark.S), moves)
+        self.assertIn(((2, 0), board.Mark.O), moves)
+
+    def test_random_legal_position(self):
+        test_board = board.Board([3, 3])
+        for x in range(3):
+            for y in range(3):
+                if (x, y) != (2, 1):
+                    test_board.set_mark((x, y), board.Mark.S)
+
+        self.assertEqual(test_board.get_random_legal_position(), (2, 1))
+
+    def test_gains_match_creates_sos(self):
+        rng = random.Random(7)
+        test_board = board.Board([6, 5])
+        test_board.game_mode = "general"
+
+        while not test_board.end:
+            for pos, mark in test_board.legal_moves():
+                self.assertEqual(test_board.get_gain(pos, mark),
+                                 len(test_board.creates_sos(pos, mark)))
+
+            scoring = {move.pos for move in test_board.scoring_moves()}
+            self.assertEqual(scoring,
+                             {pos for pos, mark in test_board.legal_moves()
+                              if test_board.creates_sos(pos, mark)})
+
+            test_board.make_move(test_board.get_random_legal_position(),
+                                 rng.choice((board.Mark.S, board.Mark.O)))
+
+    def test_gains_after_undo(self):
+        test_board = board.Board([3, 3])
+        test_board.make_move((0, 0), board.Mark.S)
+        test_board.make_move((2, 2), board.Mark.S)
+
+        self.assertEqual(test_board.get_gain((1, 1), board.Mark.O), 1)
+        self.assertEqual(list(test_board.scoring_moves()),
+                         [board.Move((1, 1), board.Mark.O, 1)])
+
+        test_board.undo_move()
+
+        self.assertEqual(test_board.get_gain((1, 1), board.Mark.O), 0)
+        self.assertEqual(test_board.scoring_cells, set())
+
+    def test_pack_state_round_trip(self):
+        test_board = board.Board([5, 4])
+        test_board.game_mode = "general"
+        test_board.make_move((0, 0), board.Mark.S)
+        test_board.make_move((1, 1), board.Mark.O)
+        test_board.make_move((2, 2), board.Mark.S)
+
+        copy = board.Board.unpack_state(test_board.pack_state())
+
+        self.assertEqual(copy.size, [5, 4])
+        self.assertEqual(copy.game_mode, "general")
+        self.assertEqual(copy.grid, test_board.grid)
+        self.assertEqual(copy.turn, 1)
+        self.assertEqual([player.score for player in copy.players], [1, 0])
+        self.assertEqual(copy.zobrist, test_board.zobrist)
+        self.assertEqual(copy.s_gain, test_board.s_gain)
+        self.assertEqual(sorted(copy.empty_cells), sorted(test_board.empty_cells))
+        self.assertEqual(len(test_board.pack_state()), 8 + 2*4 + 20)
+
+    def test_undo_move_keeps_earlier_sos(self):
+        test_board = board.Board([3, 3])
+        test_board.game_mode = "general"
+
+        test_board.make_move((0, 0), board.Mark.S)
+        test_board.make_move((1, 1), board.Mark.O)
+        test_board.make_move((2, 2), board.Mark.S)
+        test_board.make_move((0, 1), board.Mark.S)
+
+        test_board.undo_move()
+
+        self.assertEqual(len(test_board.sos_list), 1)
+        self.assertEqual(test_board.turn, 1)
+        self.assertEqual(test_board.move_future[-1].pos, (0, 1))
+
+    def test_pop_move_restores_end(self):
+        test_board = board.Board([3, 3])
+
+        test_board.make_move((0, 0), board.Mark.S)
+        test_board.make_move((1, 1), board.Mark.O)
+        test_board.push_move((2, 2), board.Mark.S)
+        self.assertTrue(test_board.end)
+
+        test_board.pop_move()
+
+        self.assertFalse(test_board.end)
+        self.assertEqual(test_board.turn, 0)
+        self.assertEqual(test_board.players[0].score, 0)
+        self.assertEqual(test_board.sos_list, [])
+        self.assertEqual(test_board.mark_count, 2)
+        self.assertEqual(test_board.move_future, [])
+
+    def test_get_optimal_move_leaves_board_unchanged(self):
+        test_board = board.Board([4, 4])
+        test_board.game_mode = "general"
+        test_board.make_move((0, 0), board.Mark.S)
+        test_board.make_move((1, 1), board.Mark.O)
+
+        grid = list(test_board.grid)
+        hist = list(test_board.move_hist)
+
+        test_board.get_optimal_move(2)
+
+        self.assertEqual(test_board.grid, grid)
+        self.assertEqual(test_board.move_hist, hist)
+        self.assertEqual(test_board.turn, 0)
+        self.assertEqual(test_board.mark_count, 2)
+
+    def test_get_optimal_move_takes_sos(self):
+        test_board = board.Board([3, 3])
+        test_board.make_move((0, 0), board.Mark.S)
+        test_board.make_move((1, 1), board.Mark.O)
+
+        move = test_board.get_optimal_move(1)
+
+        self.assertEqual((move.pos, move.mark), ((2, 2), board.Mark.S))
+
     """
     def test_creates_sos_s_off_edge(self):
         width, height = 3, 3
@@ -284,6 +585,184 @@ class TestBoard(unittest.TestCase):
     """
 
 
+class TestSaveFile(unittest.TestCase):
+    """tests for saving, recording and loading games"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "test.sav")
+
+        rng = random.Random(16)
+        self.board = board.Board([5, 4], [board.Player("Ada", 30, True, "mcts"),
+                                          board.Player("Bo", 200)])
+        self.board.game_mode = "general"
+        for _ in range(12):
+            pos = self.board.positions[rng.choice(self.board.empty_cells)]
+            self.board.make_move(pos, rng.choice((board.Mark.S, board.Mark.O)))
+        self.board.undo_move()
+        self.board.undo_move()
+
+    def assertSameGame(self, loaded, original):
+        self.assertEqual(loaded.size, original.size)
+        self.assertEqual(loaded.game_mode, original.game_mode)
+        self.assertEqual(repr(loaded.players), repr(original.players))
+        self.assertEqual([player.score for player in loaded.players],
+                         [player.score for player in original.players])
+        self.assertEqual(loaded.grid, original.grid)
+        self.assertEqual(loaded.move_hist, original.move_hist)
+        self.assertEqual(loaded.move_future, original.move_future)
+        self.assertEqual(loaded.sos_list, original.sos_list)
+        self.assertEqual(loaded.s_gain, original.s_gain)
+        self.assertEqual(loaded.o_gain, original.o_gain)
+        self.assertEqual(loaded.turn, original.turn)
+
+    def test_save_load_round_trip(self):
+        self.board.save(self.path)
+        loaded = board.Board()
+        loaded.load(self.path)
+
+        self.assertSameGame(loaded, self.board)
+
+        loaded.redo_move()
+        self.board.redo_move()
+        self.assertSameGame(loaded, self.board)
+
+    def test_record_appends_moves(self):
+        self.board.record(self.path)
+        self.board.redo_move()
+        pos = self.board.positions[self.board.empty_cells[0]]
+        self.board.make_move(pos, board.Mark.O)
+        self.board.undo_move()
+        self.board.stop_recording()
+
+        loaded = board.Board()
+        loaded.load(self.path)
+
+        self.assertSameGame(loaded, self.board)
+
+    def test_stream_records(self):
+        self.board.save(self.path)
+
+        with board.GameReader(self.path) as reader:
+            self.assertEqual(reader.size, [5, 4])
+            self.assertEqual(reader.players[0].strategy, "mcts")
+            records = list(reader)
+
+        self.assertEqual(len(records), 12 + 2)
+        self.assertEqual(records[-2:], [None, None])
+        self.assertEqual(records[0], board.Move(self.board.move_hist[0].pos,
+                                                self.board.move_hist[0].mark))
+
+    def test_cut_off_file(self):
+        self.board.record(self.path)
+        self.board.redo_move()
+
+        loaded = board.Board()
+        with self.assertRaises(board.SaveFileError):
+            loaded.load(self.path)
+        with board.GameReader(self.path, allow_partial=True) as reader:
+            self.assertEqual(len(list(reader)), 12 + 2 + 1)
+
+        self.board.stop_recording()
+
+    def test_damaged_file(self):
+        self.board.save(self.path)
+        with open(self.path, "r+b") as file:
+            file.seek(-8, os.SEEK_END)
+            file.write(b"\x02")
+
+        with self.assertRaises(board.SaveFileError) as caught:
+            board.Board().load(self.path)
+        self.assertEqual(str(caught.exception).count(self.path), 1)
+
+    def test_not_a_save_file(self):
+        with open(self.path, "w") as file:
+            file.write("[8, 8]\n'simple'\n")
+
+        with self.assertRaises(board.SaveFileError):
+            board.Board().load(self.path)
+
+
+class TestSymmetry(unittest.TestCase):
+    """tests for canonical keys over rotations and reflections"""
+
+    def setUp(self):
+        rng = random.Random(19)
+        self.board = board.Board([5, 5])
+        self.board.game_mode = "general"
+        for _ in range(9):
+            pos = self.board.positions[rng.choice(self.board.empty_cells)]
+            self.board.make_move(pos, rng.choice((board.Mark.S, board.Mark.O)))
+
+    def transformed(self, transform):
+        """A new board holding self.board's grid as seen through transform."""
+        new_board = board.Board(list(self.board.size))
+        for idx, value in enumerate(self.board.marks):
+            if value != board.EMPTY:
+                move = board.Move(self.board.positions[idx], board.MARKS[value])
+                new_board.set_mark(self.board.transform_move(move, transform).pos, move.mark)
+        return new_board
+
+    def test_transform_counts(self):
+        self.assertEqual(len(board.cell_symmetries((4, 4))), 8)
+        self.assertEqual(len(board.cell_symmetries((5, 3))), 4)
+        for size in ((4, 4), (5, 3)):
+            cells = size[0] * size[1]
+            for symmetry in board.cell_symmetries(size):
+                self.assertEqual(sorted(symmetry), list(range(cells)))
+            self.assertEqual(len(set(board.cell_symmetries(size))),
+                             len(board.cell_symmetries(size)))
+
+    def test_lines_map_onto_lines(self):
+        for size in ((4, 4), (5, 3)):
+            tables = board.line_tables(size)
+            lines = {line for cell_lines in tables.through for line in cell_lines}
+            for symmetry in board.cell_symmetries(size):
+                mapped = {tuple(symmetry[cell] for cell in line) for line in lines}
+                self.assertEqual({frozenset(line) for line in mapped},
+                                 {frozenset(line) for line in lines})
+
+    def test_symmetric_positions_share_key(self):
+        key, transform = self.board.canonical_key()
+        canonical = self.transformed(transform).marks
+
+        for symmetry in range(8):
+            other = self.transformed(symmetry)
+            other_key, other_transform = other.canonical_key()
+            self.assertEqual(other_key, key)
+            moved = board.Board([5, 5])
+            for idx, value in enumerate(other.marks):
+                if value != board.EMPTY:
+                    move = board.Move(other.positions[idx], board.MARKS[value])
+                    moved.set_mark(other.transform_move(move, other_transform).pos, move.mark)
+            self.assertEqual(moved.marks, canonical)
+
+    def test_key_follows_moves(self):
+        self.board.canonical_key()
+        self.board.undo_move()
+        self.board.undo_move()
+        self.board.make_move(self.board.positions[self.board.empty_cells[0]], board.Mark.O)
+
+        fresh = board.Board([5, 5])
+        fresh.marks[:] = self.board.marks
+        self.assertEqual(self.board.canonical_key(), fresh.canonical_key())
+        self.assertEqual(self.board.symmetry_hashes[0], self.board.zobrist)
+
+    def test_untransform_move(self):
+        move = board.Move((1, 3), board.Mark.S, 0)
+        for transform in range(8):
+            moved = self.board.transform_move(move, transform)
+            self.assertEqual(self.board.untransform_move(moved, transform), move)
+
+    def test_move_gains_survive_transform(self):
+        for transform in range(8):
+            other = self.transformed(transform)
+            for move in self.board.scoring_moves():
+                moved = self.board.transform_move(move, transform)
+                self.assertEqual(other.get_gain(moved.pos, moved.mark), move.sos_count)
+
+
 if __name__ == "__main__":
     unittest.main()
 
@@ -0,0 +1,88 @@
+# File: test_corpus.py
+# Project: 2023 Spring Semester SOS Project
+# Programmer: Ian Rowse <imrnnc@umsystem.edu>
+
+"""tests for the sharded game corpus"""
+
+import random
+import tempfile
+import unittest
+from src import board
+from src import corpus
+
+def play_game(size, game_mode, seed):
+    rng = random.Random(seed)
+    test_board = board.Board([size, size])
+    test_board.game_mode = game_mode
+    while not test_board.end:
+        pos = test_board.positions[rng.choice(test_board.empty_cells)]
+        test_board.make_move(pos, rng.choice((board.Mark.S, board.Mark.O)))
+    return test_board
+
+class TestCorpus(unittest.TestCase):
+    """tests for writing, reading and filtering a corpus"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+        self.boards = [play_game(3 + seed % 3, board.GAME_MODES[seed % 2], seed)
+                       for seed in range(11)]
+        with corpus.CorpusWriter(self.directory, shard_size=4) as writer:
+            self.ids = [writer.add(test_board) for test_board in self.boards]
+
+    def test_ids_span_shards(self):
+        self.assertEqual(self.ids, list(range(11)))
+        self.assertEqual(corpus.count_shards(self.directory), 3)
+
+    def test_random_access(self):
+        with corpus.Corpus(self.directory) as games:
+            self.assertEqual(len(games), 11)
+            for game_id in (0, 5, 10):
+                test_board = self.boards[game_id]
+                info = games.info(game_id)
+
+                self.assertEqual(info.size, tuple(test_board.size))
+                self.assertEqual(info.game_mode, test_board.game_mode)
+                self.assertEqual(info.num_moves, len(test_board.move_hist))
+                self.assertEqual(games.moves(game_id),
+                                 [board.Move(move.pos, move.mark)
+                                  for move in test_board.move_hist])
+
+            with self.assertRaises(IndexError):
+                games.info(11)
+
+    def test_replay(self):
+        with corpus.Corpus(self.directory) as games:
+            replayed = games.replay(7)
+
+        self.assertEqual(replayed.grid, self.boards[7].grid)
+        self.assertEqual(replayed.move_hist, self.boards[7].move_hist)
+        self.assertEqual(corpus.winner_of(replayed), corpus.winner_of(self.boards[7]))
+
+    def test_select(self):
+        with corpus.Corpus(self.directory) as games:
+            self.assertEqual(list(games.select(size=4)),
+                             [idx for idx, b in enumerate(self.boards) if b.size[0] == 4])
+            self.assertEqual(list(games.select(game_mode="general", size=(5, 5))),
+                             [idx for idx, b in enumerate(self.boards)
+                              if b.game_mode == "general" and b.size[0] == 5])
+            self.assertEqual(list(games.select(winner=corpus.DRAW)),
+                             [idx for idx, b in enumerate(self.boards)
+                              if len(b.victors()) > 1])
+
+    def test_append_later(self):
+        with corpus.CorpusWriter(self.directory) as writer: # keeps the corpus' shard size
+            game_id = writer.add(play_game(6, "general", 99))
+        with self.assertRaises(ValueError):
+            corpus.CorpusWriter(self.directory, shard_size=8)
+
+        self.assertEqual(game_id, 11)
+        with corpus.Corpus(self.directory) as games:
+            self.assertEqual(games.info(11).size, (6, 6))
+            self.assertEqual(len(list(games)), 12)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+# File: test_mcts.py
+# Project: 2023 Spring Semester SOS Project
+# Programmer: Ian Rowse <imrnnc@umsystem.edu>
+
+"""tests for the Monte Carlo tree search player"""
+
+import unittest
+from src import board
+from src import mcts
+
+class TestMCTSPlayer(unittest.TestCase):
+    """tests for MCTSPlayer"""
+
+    def test_takes_sos_in_simple(self):
+        test_board = board.Board([4, 4])
+        test_board.make_move((0, 0), board.Mark.S)
+        test_board.make_move((1, 1), board.Mark.O)
+
+        move = mcts.MCTSPlayer(playouts=300, seed=1).choose_move(test_board)
+
+        self.assertEqual((move.pos, move.mark), ((2, 2), board.Mark.S))
+
+    def test_board_unchanged(self):
+        test_board = board.Board([5, 5])
+        test_board.game_mode = "general"
+        test_board.make_move((2, 2), board.Mark.O)
+        grid = list(test_board.grid)
+
+        mcts.MCTSPlayer(playouts=200, seed=2).choose_move(test_board)
+
+        self.assertEqual(test_board.grid, grid)
+        self.assertEqual(len(test_board.move_hist), 1)
+        self.assertEqual(test_board.turn, 1)
+
+    def test_tree_reuse(self):
+        test_board = board.Board([4, 4])
+        test_board.game_mode = "general"
+        player = mcts.MCTSPlayer(playouts=500, seed=3)
+
+        move = player.choose_move(test_board)
+        test_board.make_move(move.pos, move.mark)
+        reply = max(player.root.children, key=lambda child: child.visits)
+        test_board.make_move(*reply.move)
+
+        self.assertIs(player.reuse_root(test_board), reply)
+
+    def test_no_reuse_for_other_game(self):
+        test_board = board.Board([4, 4])
+        player = mcts.MCTSPlayer(playouts=50, seed=4)
+        player.choose_move(test_board)
+
+        other_board = board.Board([4, 4])
+        other_board.make_move((3, 3), board.Mark.O)
+        other_board.make_move((0, 3), board.Mark.O)
+
+        self.assertIsNone(player.reuse_root(other_board))
+
+    def test_progressive_widening(self):
+        test_board = board.Board([6, 6])
+        player = mcts.MCTSPlayer(playouts=100, widening=1.0, seed=5)
+
+        root = player.search(test_board)
+
+        self.assertLessEqual(len(root.children), 11)
+        self.assertEqual(root.visits, 100)
+
+    def test_root_parallel(self):
+        test_board = board.Board([4, 4])
+        test_board.make_move((0, 0), board.Mark.S)
+        test_board.make_move((1, 1), board.Mark.O)
+
+        with mcts.MCTSPlayer(playouts=100, workers=2, seed=6) as player:
+            first = player.choose_move(test_board)
+        with mcts.MCTSPlayer(playouts=100, workers=2, seed=6) as player:
+            second = player.choose_move(test_board)
+
+        self.assertEqual((first.pos, first.mark), ((2, 2), board.Mark.S))
+        self.assertEqual(first, second)
+
+    def test_root_parallel_reuses_pool(self):
+        test_board = board.Board([4, 4])
+        test_board.game_mode = "general"
+
+        with mcts.MCTSPlayer(playouts=20, workers=2, seed=7) as player:
+            test_board.make_move(player.choose_move(test_board).pos, board.Mark.S)
+            executor = player.executor
+            player.choose_move(test_board)
+            self.assertIs(player.executor, executor)
+
+        self.assertIsNone(player.executor)
+
+    def test_game_over(self):
+        test_board = board.Board([3, 3])
+        test_board.make_move((0, 0), board.Mark.S)
+        test_board.make_move((1, 1), board.Mark.O)
+        test_board.make_move((2, 2), board.Mark.S)
+
+        self.assertIsNone(mcts.MCTSPlayer(playouts=10).choose_move(test_board))
+
+    def test_no_time_to_search(self):
+        test_board = board.Board([4, 4])
+        move = mcts.MCTSPlayer(time_limit=0, seed=10).choose_move(test_board)
+        self.assertIn(move.pos, test_board.get_empty_cells())
+
+        with self.assertRaises(ValueError):
+            mcts.MCTSPlayer(playouts=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
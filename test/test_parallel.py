@@ -0,0 +1,73 @@
+# File: test_parallel.py
+# Project: 2023 Spring Semester SOS Project
+# Programmer: Ian Rowse <imrnnc@umsystem.edu>
+
+"""tests for the process pool root search"""
+
+import unittest
+from src import board
+from src import parallel
+from src import search
+from test import helpers
+
+class TestParallelSearcher(unittest.TestCase):
+    """tests for ParallelSearcher"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.searcher = parallel.ParallelSearcher(depth=2, workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.searcher.close()
+
+    def test_matches_serial_score(self):
+        for seed in range(3):
+            test_board = helpers.random_board([5, 5], "general", 8, seed)
+            serial = search.Searcher(max_depth=2).search(test_board)
+            result = self.searcher.search(test_board)
+
+            self.assertEqual(result.score, serial.score)
+            self.assertIn(result.move.pos, test_board.get_empty_cells())
+
+    def test_takes_sos_in_simple(self):
+        test_board = board.Board([4, 4])
+        test_board.make_move((0, 0), board.Mark.S)
+        test_board.make_move((1, 1), board.Mark.O)
+
+        move = self.searcher.choose_move(test_board)
+
+        self.assertEqual((move.pos, move.mark), ((2, 2), board.Mark.S))
+
+    def test_one_worker_searches_in_process(self):
+        test_board = helpers.random_board([5, 5], "general", 6, 2)
+        with parallel.ParallelSearcher(depth=2, workers=1) as searcher:
+            result = searcher.search(test_board)
+            self.assertIsNone(searcher.executor)
+
+        self.assertEqual(result.score, search.Searcher(max_depth=2).search(test_board).score)
+
+    def test_seeded_is_repeatable(self):
+        test_board = helpers.random_board([5, 5], "general", 4, 7)
+        with parallel.ParallelSearcher(depth=2, workers=2, seed=11) as first:
+            first_move = first.choose_move(test_board)
+        with parallel.ParallelSearcher(depth=2, workers=3, seed=11) as second:
+            second_move = second.choose_move(test_board)
+
+        self.assertEqual(first_move, second_move)
+
+    def test_search_moves_keeps_ties_only(self):
+        test_board = board.Board([3, 3])
+        test_board.game_mode = "general"
+        test_board.make_move((0, 0), board.Mark.S)
+        test_board.make_move((2, 2), board.Mark.S)
+
+        moves = [(order, cell, mark) for order, (cell, mark)
+                 in enumerate([(4, board.Mark.S.value), (4, board.Mark.O.value)])]
+        scores = parallel.search_moves(test_board.pack_state(), moves, 1)
+
+        self.assertEqual(scores, [(1, 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
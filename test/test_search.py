@@ -0,0 +1,145 @@
+# File: test_search.py
+# Project: 2023 Spring Semester SOS Project
+# Programmer: Ian Rowse <imrnnc@umsystem.edu>
+
+"""tests for the alpha-beta SOS search"""
+
+import unittest
+from src import board
+from src import search
+from test import helpers
+
+def minimax(test_board, depth):
+    """Plain full-width negamax to check the pruned search against."""
+    if depth == 0 or test_board.end:
+        return 0
+
+    best = None
+    for pos in test_board.get_empty_cells():
+        for mark in (board.Mark.S, board.Mark.O):
+            gain = len(test_board.creates_sos(pos, mark))
+            if test_board.game_mode == "simple":
+                if gain > 0:
+                    return search.WIN
+                gain = 0
+            test_board.push_move(pos, mark)
+            value = gain - minimax(test_board, depth - 1)
+            test_board.pop_move()
+            if best is None or value > best:
+                best = value
+    return 0 if best is None else best
+
+
+class TestSearcher(unittest.TestCase):
+    """tests for the Searcher class"""
+
+    def test_matches_minimax_general(self):
+        for seed in range(8):
+            test_board = helpers.random_board([4, 4], "general", 8, seed)
+            result = search.Searcher(max_depth=3).search(test_board)
+            self.assertEqual(result.score, minimax(test_board, 3))
+
+    def test_matches_minimax_simple(self):
+        for seed in range(8):
+            test_board = helpers.random_board([4, 4], "simple", 6, seed)
+            if test_board.end:
+                continue
+            result = search.Searcher(max_depth=3).search(test_board)
+            self.assertEqual(result.score, minimax(test_board, 3))
+
+    def test_board_unchanged(self):
+        test_board = helpers.random_board([5, 5], "general", 10, 1)
+        grid = list(test_board.grid)
+        scores = [player.score for player in test_board.players]
+
+        search.Searcher(max_depth=3).search(test_board)
+
+        self.assertEqual(test_board.grid, grid)
+        self.assertEqual([player.score for player in test_board.players], scores)
+        self.assertEqual(len(test_board.move_hist), 10)
+
+    def test_takes_sos_in_simple(self):
+        test_board = board.Board([3, 3])
+        test_board.make_move((0, 0), board.Mark.S)
+        test_board.make_move((1, 1), board.Mark.O)
+
+        result = search.Searcher(max_depth=4).search(test_board)
+
+        self.assertEqual((result.move.pos, result.move.mark), ((2, 2), board.Mark.S))
+        self.assertEqual(result.score, search.WIN)
+
+    def test_node_limit(self):
+        test_board = board.Board([6, 6])
+        result = search.Searcher(node_limit=5000).search(test_board)
+
+        self.assertIsNotNone(result.move)
+        self.assertGreaterEqual(result.depth, 1)
+        self.assertLess(result.depth, 36)
+
+    def test_time_limit(self):
+        test_board = board.Board([8, 8])
+        result = search.Searcher(time_limit=0.05).search(test_board)
+
+        self.assertIsNotNone(result.move)
+        self.assertGreaterEqual(result.depth, 1)
+
+    def test_table_cuts_nodes(self):
+        test_board = helpers.random_board([5, 5], "general", 6, 3)
+
+        plain = search.Searcher(max_depth=4, table_size=0).search(test_board)
+        searcher = search.Searcher(max_depth=4)
+        hashed = searcher.search(test_board)
+
+        self.assertEqual(hashed.score, plain.score)
+        self.assertLess(hashed.nodes, plain.nodes)
+        self.assertGreater(searcher.table.hits, 0)
+
+    def test_game_over(self):
+        test_board = board.Board([3, 3])
+        test_board.make_move((0, 0), board.Mark.S)
+        test_board.make_move((1, 1), board.Mark.O)
+        test_board.make_move((2, 2), board.Mark.S)
+
+        self.assertIsNone(search.Searcher().search(test_board).move)
+
+
+class TestTranspositionTable(unittest.TestCase):
+    """tests for the two-tier transposition table"""
+
+    def test_size_power_of_two(self):
+        with self.assertRaises(ValueError):
+            search.TranspositionTable(1000)
+
+    def test_probe_hit(self):
+        table = search.TranspositionTable(16)
+        table.store(5, 2, 7, search.EXACT, ((0, 0), board.Mark.S))
+
+        self.assertEqual(table.probe(5)[2], 7)
+        self.assertEqual(table.hits, 1)
+
+    def test_probe_collision(self):
+        table = search.TranspositionTable(16)
+        table.store(5, 2, 7, search.EXACT, None)
+
+        self.assertIsNone(table.probe(5 + 16))
+        self.assertEqual(table.collisions, 1)
+
+    def test_depth_preferred(self):
+        table = search.TranspositionTable(16)
+        table.store(1, 5, 10, search.EXACT, None)
+        table.store(17, 2, 20, search.EXACT, None)
+        table.store(33, 1, 30, search.EXACT, None)
+
+        self.assertEqual(table.probe(1)[2], 10)
+        self.assertIsNone(table.probe(17))
+        self.assertEqual(table.probe(33)[2], 30)
+
+        table.store(49, 6, 40, search.EXACT, None)
+
+        self.assertEqual(table.probe(49)[2], 40)
+        self.assertEqual(table.probe(1)[2], 10)
+        self.assertEqual(len(table), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
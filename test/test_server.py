@@ -0,0 +1,223 @@
+# File: test_server.py
+# Project: 2023 Spring Semester SOS Project
+# Programmer: Ian Rowse <imrnnc@umsystem.edu>
+
+"""tests for the asyncio game server, through an in-process client"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import json
+import threading
+import unittest
+from src import server
+
+class TestServer(unittest.IsolatedAsyncioTestCase):
+    """tests for sessions, deltas and limits"""
+
+    async def asyncSetUp(self):
+        self.executor = ThreadPoolExecutor(1)
+        self.server = server.GameServer(self.executor, max_sessions=3,
+                                        max_subscribers=2, max_cells=25)
+        await self.server.start()
+        self.clients = []
+
+    async def asyncTearDown(self):
+        for client in self.clients:
+            await client.close()
+        await self.server.close()
+        self.executor.shutdown()
+
+    async def connect(self):
+        client = await server.Client.connect("127.0.0.1", self.server.port)
+        self.clients.append(client)
+        return client
+
+    async def test_new_game(self):
+        client = await self.connect()
+        reply = await client.request("new", size=[3, 4], mode="general")
+        self.assertTrue(reply["ok"])
+
+        state = await client.event()
+        self.assertEqual(state["event"], "state")
+        self.assertEqual(state["session"], reply["session"])
+        self.assertEqual(state["size"], [3, 4])
+        self.assertEqual(state["marks"], " " * 12)
+        self.assertEqual(state["seq"], 0)
+
+    async def test_subscribers_get_deltas(self):
+        first, second = await self.connect(), await self.connect()
+        session = (await first.request("new", size=[3, 3]))["session"]
+        await first.event()
+
+        self.assertTrue((await second.request("subscribe", session=session))["ok"])
+        self.assertEqual((await second.event())["event"], "state")
+
+        for pos, mark in (([0, 0], "S"), ([1, 0], "O"), ([2, 0], "S")):
+            reply = await first.request("move", session=session, pos=pos, mark=mark)
+            self.assertTrue(reply["ok"], reply)
+
+        events = [await second.event() for _ in range(3)]
+        self.assertEqual([event["seq"] for event in events], [1, 2, 3])
+        self.assertEqual([event["pos"] for event in events], [[0, 0], [1, 0], [2, 0]])
+        self.assertEqual(events[2]["sos"], [[2, 0, 0, 0, 0]])
+        self.assertTrue(events[2]["end"])
+        self.assertNotIn("marks", events[2])
+
+        undo = await first.request("undo", session=session)
+        self.assertTrue(undo["ok"])
+        event = await second.event()
+        self.assertEqual((event["event"], event["seq"], event["pos"]), ("undo", 4, [2, 0]))
+        self.assertEqual(event["sos"], [[2, 0, 0, 0, 0]])
+        self.assertFalse(event["end"])
+
+    async def test_computer_replies(self):
+        client = await self.connect()
+        reply = await client.request("new", size=[4, 4], players=[
+            {"name": "Human"}, {"name": "Bot", "computer": True, "strategy": "greedy"}])
+        session = reply["session"]
+        await client.event()
+
+        await client.request("move", session=session, pos=[0, 0], mark="S")
+        human, computer = await client.event(), await client.event()
+        self.assertEqual((human["player"], computer["player"]), (0, 1))
+        self.assertEqual(computer["seq"], 2)
+        self.assertEqual(computer["turn"], 0)
+
+        state = await client.request("state", session=session)
+        self.assertTrue(state["ok"])
+        self.assertEqual(sum(mark != " " for mark in (await client.event())["marks"]), 2)
+
+    async def test_waits_for_computer(self):
+        busy = threading.Event()
+        self.executor.submit(busy.wait) # keeps the computer from moving yet
+
+        client = await self.connect()
+        reply = await client.request("new", size=[4, 4], players=[
+            {"name": "Bot", "computer": True, "strategy": "random"}, {"name": "Human"}])
+        session = reply["session"]
+        await client.event()
+
+        reply = await client.request("move", session=session, pos=[3, 3], mark="O")
+        self.assertEqual(reply["error"], "waiting for a computer player")
+
+        busy.set()
+        computer = await client.event()
+        self.assertEqual(computer["player"], 0)
+        pos = [0, 0] if computer["pos"] == [3, 3] else [3, 3]
+        reply = await client.request("move", session=session, pos=pos, mark="O")
+        self.assertTrue(reply["ok"], reply)
+
+    async def test_stale_computer_move_dropped(self):
+        busy = threading.Event()
+        self.executor.submit(busy.wait)
+
+        client = await self.connect()
+        reply = await client.request("new", size=[4, 4], players=[
+            {"name": "Human"}, {"name": "Bot", "computer": True, "strategy": "random"}])
+        session = reply["session"]
+        await client.event()
+
+        await client.request("move", session=session, pos=[0, 0], mark="S")
+        await client.request("undo", session=session)
+        busy.set()
+
+        events = [await client.event() for _ in range(2)]
+        self.assertEqual([event["event"] for event in events], ["move", "undo"])
+        await asyncio.sleep(0.1)
+        state = await client.request("state", session=session)
+        self.assertTrue(state["ok"])
+        self.assertEqual((await client.event())["marks"], " " * 16)
+
+    async def test_bad_requests(self):
+        client = await self.connect()
+        session = (await client.request("new", size=[3, 3]))["session"]
+
+        self.assertIn("error", await client.request("fly"))
+        self.assertIn("error", await client.request("move", session=99, pos=[0, 0], mark="S"))
+        self.assertIn("error", await client.request("move", session=session, pos=[5, 0], mark="S"))
+        self.assertIn("error", await client.request("move", session=session, pos=[0, 0], mark="X"))
+        self.assertIn("error", await client.request("move", session=session))
+        self.assertIn("error", await client.request("undo", session=session))
+        self.assertIn("error", await client.request("new", size=[2, 2]))
+        self.assertIn("error", await client.request("new", players=[{"strategy": "oracle"}]))
+        self.assertIn("error", await client.request("new", players=[1]))
+        self.assertIn("error", await client.request("new", players="ab"))
+        self.assertIn("error", await client.request("new", players=[]))
+        self.assertIn("error", await client.request("new", players=[{"hue": 1e400}]))
+        self.assertIn("error", await client.request("new", size=[1e400, 3]))
+
+        await client.request("move", session=session, pos=[0, 0], mark="S")
+        self.assertIn("error", await client.request("move", session=session,
+                                                    pos=[0, 0], mark="O"))
+
+        client.writer.write(b"not json\n")
+        self.assertIn("error", await client.read())
+
+        other = await self.connect()
+        self.assertIn("error", await other.request("undo", session=session))
+
+    async def test_limits(self):
+        client = await self.connect()
+        self.assertIn("error", await client.request("new", size=[6, 5]))
+
+        sessions = [(await client.request("new", size=[3, 3]))["session"] for _ in range(3)]
+        self.assertIn("error", await client.request("new", size=[3, 3]))
+
+        second, third = await self.connect(), await self.connect()
+        self.assertTrue((await second.request("subscribe", session=sessions[0]))["ok"])
+        self.assertIn("error", await third.request("subscribe", session=sessions[0]))
+
+        await client.request("unsubscribe", session=sessions[1])
+        self.assertIn("error", await client.request("new", size=[3, 3], players=[{}] * 17))
+
+    async def test_computer_failure(self):
+        self.executor.shutdown() # every job submitted now fails
+        client = await self.connect()
+        reply = await client.request("new", size=[3, 3], players=[
+            {"name": "Bot", "computer": True, "strategy": "random"}, {"name": "Human"}])
+        session = reply["session"]
+        await client.event()
+
+        event = await client.event()
+        self.assertEqual(event["event"], "error")
+        self.assertEqual(event["session"], session)
+        reply = await client.request("move", session=session, pos=[0, 0], mark="S")
+        self.assertTrue(reply["ok"], reply)
+
+    async def test_sessions_end_with_their_clients(self):
+        client = await self.connect()
+        await client.request("new", size=[3, 3])
+        self.assertEqual(len(self.server.sessions), 1)
+
+        await client.close()
+        self.clients.remove(client)
+        for _ in range(100):
+            if not self.server.sessions:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(self.server.sessions, {})
+
+class Writer:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+class TestConnection(unittest.IsolatedAsyncioTestCase):
+    """tests for the outgoing queue"""
+
+    async def test_slow_client_dropped(self):
+        writer = Writer()
+        connection = server.Connection(None, writer, 2)
+        connection.send({"event": "move"})
+        connection.send({"event": "move"})
+        self.assertFalse(connection.closed)
+
+        connection.send({"event": "move"})
+        self.assertTrue(connection.closed)
+        self.assertTrue(writer.closed)
+        self.assertEqual(json.loads(connection.queue.get_nowait()), {"event": "move"})
+
+if __name__ == "__main__":
+    unittest.main()
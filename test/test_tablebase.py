@@ -0,0 +1,94 @@
+# File: test_tablebase.py
+# Project: 2023 Spring Semester SOS Project
+# Programmer: Ian Rowse <imrnnc@umsystem.edu>
+
+"""tests for the solved small board tables"""
+
+import os
+import tempfile
+import unittest
+from src import ai
+from src import board
+from src import search
+from src import tablebase
+from test import helpers
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+@unittest.skipIf(numpy is None, "solving tables needs numpy")
+class TestTablebase(unittest.TestCase):
+    """tests for solving and reading 3x3 tables"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+        self.tables = {}
+        for game_mode in board.GAME_MODES:
+            path = tablebase.table_path(self.directory, (3, 3), game_mode)
+            tablebase.write_table(path, (3, 3), game_mode)
+            self.tables[game_mode] = tablebase.Tablebase(path)
+            self.addCleanup(self.tables[game_mode].close)
+
+    def test_header(self):
+        table = self.tables["general"]
+        self.assertEqual(table.size, (3, 3))
+        self.assertEqual(table.game_mode, "general")
+        self.assertEqual(len(table.values), 3 ** 9)
+
+    def test_matches_search(self):
+        for seed in range(12):
+            for game_mode, table in self.tables.items():
+                test_board = helpers.random_board([3, 3], game_mode, 3 + seed % 4, seed)
+                if test_board.end:
+                    continue
+                score = search.Searcher().search(test_board).score
+                if game_mode == "simple":
+                    score = (score > 0) - (score < 0)
+                self.assertEqual(table.value(test_board), score, str(test_board))
+
+    def test_move_values(self):
+        test_board = helpers.random_board([3, 3], "general", 4, 3)
+        table = self.tables["general"]
+        best = max(value for value, _ in table.move_values(test_board))
+        self.assertEqual(best, table.value(test_board))
+
+    def test_perfect_player_never_loses(self):
+        for seed in range(6):
+            test_board = board.Board([3, 3])
+            test_board.game_mode = "simple"
+            perfect = seed % 2
+            agents = [ai.RandomPlayer(seed), ai.RandomPlayer(seed)]
+            agents[perfect] = tablebase.TablebasePlayer(self.directory, seed=seed)
+
+            while not test_board.end:
+                move = agents[test_board.turn].choose_move(test_board)
+                test_board.make_move(move.pos, move.mark)
+            self.assertIn(test_board.players[perfect], test_board.victors())
+
+    def test_rejects_bad_files(self):
+        path = os.path.join(self.directory, "bad.sost")
+        with open(tablebase.table_path(self.directory, (3, 3), "simple"), "rb") as file:
+            data = file.read()
+
+        for bad in (b"nonsense", data[:-1]):
+            with open(path, "wb") as file:
+                file.write(bad)
+            with self.assertRaises(ValueError):
+                tablebase.Tablebase(path)
+
+class TestTablebasePlayer(unittest.TestCase):
+    """tests for playing without a table"""
+
+    def test_searches_without_table(self):
+        with tempfile.TemporaryDirectory() as directory:
+            test_board = board.Board([5, 5])
+            move = tablebase.TablebasePlayer(directory, time_limit=0.1).choose_move(test_board)
+            self.assertIn(move.pos, test_board.get_empty_cells())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+# File: test_tournament.py
+# Project: 2023 Spring Semester SOS Project
+# Programmer: Ian Rowse <imrnnc@umsystem.edu>
+
+"""tests for the headless tournament runner"""
+
+import unittest
+from src import tournament
+
+class TestTournament(unittest.TestCase):
+    """tests for scheduling, playing and summarizing games"""
+
+    def test_parse_strategy(self):
+        self.assertEqual(tournament.parse_strategy("mcts:playouts=200,widening=2.5"),
+                         ("mcts", {"playouts": 200, "widening": 2.5}))
+        self.assertEqual(tournament.parse_strategy("greedy"), ("greedy", {}))
+
+    def test_parse_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            tournament.parse_strategy("oracle")
+
+    def test_schedule(self):
+        specs = tournament.schedule(["a", "b", "c"], [3, 4], ["simple"], 2)
+
+        self.assertEqual(len(specs), 3 * 2 * 2 * 2)
+        self.assertEqual(specs, tournament.schedule(["a", "b", "c"], [3, 4], ["simple"], 2))
+
+    def test_wilson_interval(self):
+        low, high = tournament.wilson_interval(50, 100)
+        self.assertAlmostEqual(low + high, 1.0)
+        self.assertLess(low, 0.5)
+        self.assertEqual(tournament.wilson_interval(10, 10)[1], 1.0)
+
+    def test_run(self):
+        report = tournament.run(["random", "greedy"], [3], ["simple", "general"], 3, workers=1)
+
+        self.assertEqual(report["games"], 12)
+        self.assertEqual(len(report["rows"]), 4)
+        for row in report["rows"]:
+            self.assertEqual(row["games"], 6)
+            self.assertEqual(row["wins"] + row["draws"] + row["losses"], 6)
+
+    def test_run_in_pool_matches(self):
+        serial = tournament.run(["random", "greedy"], [4], ["general"], 2, workers=1)
+        pooled = tournament.run(["random", "greedy"], [4], ["general"], 2, workers=2)
+
+        self.assertEqual(serial["rows"], pooled["rows"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,4 +5,68 @@
 """tests for my custom graphical user interface class"""
 
 import unittest
+import pygame
 from src import ui
+
+class TestTextCache(unittest.TestCase):
+    """tests for the shared font and rendered text caches"""
+
+    def setUp(self):
+        pygame.font.init()
+        ui.clear_text_cache()
+
+    def test_fonts_shared(self):
+        self.assertIs(ui.get_font(20), ui.get_font(20))
+
+    def test_rendered_text_reused(self):
+        text = ui.render_text("S", 30, pygame.Color("white"))
+        self.assertIs(ui.render_text("S", 30, (255, 255, 255, 255)), text)
+        self.assertIsNot(ui.render_text("O", 30, pygame.Color("white")), text)
+
+        ui.clear_text_cache()
+        self.assertIsNot(ui.render_text("S", 30, pygame.Color("white")), text)
+
+    def test_fitted_size(self):
+        rect = pygame.Rect(0, 0, 40, 40)
+        measured = ui.get_font(20).render("Victor", 1, (0, 0, 0)).get_rect()
+        self.assertEqual(ui.fitted_size("Victor", rect), int(measured.fit(rect).height))
+        self.assertEqual(ui.fitted_size("Victor", rect.move(100, 100)),
+                         ui.fitted_size("Victor", rect))
+
+class TestUIIndex(unittest.TestCase):
+    """tests for finding the button at a point"""
+
+    def setUp(self):
+        self.buttons = ui.UI({f"{x} {y}": ui.Button(pygame.Rect(x * 12, y * 12, 10, 10))
+                              for y in range(10) for x in range(10)})
+
+    def test_at(self):
+        self.assertEqual(self.buttons.at((0, 0)), "0 0")
+        self.assertEqual(self.buttons.at((37, 113)), "3 9")
+        self.assertIsNone(self.buttons.at((10, 5)))   # in the gap
+        self.assertIsNone(self.buttons.at((500, 5)))  # off the grid
+        self.assertIsNone(self.buttons.at((-3, -3)))
+
+    def test_matches_linear_scan(self):
+        self.buttons["wide"] = ui.Button(pygame.Rect(5, 5, 60, 3))
+        for x in range(-2, 125):
+            for y in range(-2, 125, 3):
+                expected = None
+                for key, button in self.buttons.items():
+                    if button.rect.collidepoint((x, y)):
+                        expected = key
+                        break
+                self.assertEqual(self.buttons.hover((x, y)), expected, (x, y))
+
+    def test_reindex(self):
+        self.assertEqual(self.buttons.at((5, 5)), "0 0")
+        self.buttons["0 0"].rect = pygame.Rect(200, 200, 10, 10)
+        self.buttons.reindex()
+        self.assertIsNone(self.buttons.at((5, 5)))
+        self.assertEqual(self.buttons.at((205, 205)), "0 0")
+
+        del self.buttons["0 0"]
+        self.assertIsNone(self.buttons.at((205, 205)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+# File: test_vectorized.py
+# Project: 2023 Spring Semester SOS Project
+# Programmer: Ian Rowse <imrnnc@umsystem.edu>
+
+"""tests for the numpy board kernels"""
+
+import unittest
+from src import board
+from test import helpers
+
+try:
+    import numpy
+    from src import vectorized
+except ImportError:
+    numpy = None
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestVectorized(unittest.TestCase):
+    """tests for the vectorized gain maps and SOS recount"""
+
+    def test_gain_maps_match_board(self):
+        for seed in range(5):
+            test_board = helpers.random_board([7, 5], "general", 20, seed)
+            s_gain, o_gain = vectorized.gain_maps(vectorized.to_array(test_board))
+
+            for pos in test_board.get_empty_cells():
+                self.assertEqual(s_gain[pos[1], pos[0]],
+                                 len(test_board.creates_sos(pos, board.Mark.S)))
+                self.assertEqual(o_gain[pos[1], pos[0]],
+                                 len(test_board.creates_sos(pos, board.Mark.O)))
+
+    def test_count_sos(self):
+        for seed in range(5):
+            test_board = helpers.random_board([6, 6], "general", 30, seed)
+            self.assertEqual(vectorized.count_sos(vectorized.to_array(test_board)),
+                             len(test_board.sos_list))
+
+    def test_count_sos_stack(self):
+        boards = [helpers.random_board([5, 5], "general", 20, seed) for seed in range(4)]
+        grids = numpy.stack([vectorized.to_array(b) for b in boards])
+
+        self.assertEqual(vectorized.count_sos(grids).tolist(),
+                         [len(b.sos_list) for b in boards])
+
+    def test_scored_moves(self):
+        test_board = helpers.random_board([8, 8], "general", 25, 3)
+        moves = vectorized.scored_moves(test_board)
+
+        self.assertEqual(len(moves), 2 * (64 - 25))
+        self.assertEqual(sorted(moves, key=lambda move: -move[0]), moves)
+        for gain, pos, mark in moves:
+            self.assertEqual(gain, test_board.get_gain(pos, mark))
+
+    def test_validate(self):
+        test_board = helpers.random_board([6, 6], "general", 30, 1)
+        self.assertTrue(vectorized.validate(test_board))
+
+        test_board.sos_list.append(board.SOS((0, 0), (2, 2), 0))
+        self.assertFalse(vectorized.validate(test_board))
+
+
+if __name__ == "__main__":
+    unittest.main()